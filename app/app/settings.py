@@ -45,6 +45,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.ServerTimingMiddleware',
+    'core.routers.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -54,6 +56,22 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Report per request SQL, serialization and rendering timings.
+REQUEST_TIMING = bool(int(os.environ.get('REQUEST_TIMING', 0)))
+
+# Load the application in app.wsgi before serving, for servers forking
+# workers after loading it, such as gunicorn --preload.
+PRELOAD_APP = bool(int(os.environ.get('PRELOAD_APP', 0)))
+# Modules imported lazily by requests, preloaded with the application.
+PRELOAD_MODULES = [
+    'PIL.Image',
+    'PIL.GifImagePlugin',
+    'PIL.JpegImagePlugin',
+    'PIL.PngImagePlugin',
+    'PIL.WebPImagePlugin',
+    'botocore.exceptions',
+]
+
 ROOT_URLCONF = 'app.urls'
 
 TEMPLATES = [
@@ -80,7 +98,7 @@ WSGI_APPLICATION = 'app.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'core.backends.postgresql',
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
@@ -88,6 +106,65 @@ DATABASES = {
     }
 }
 
+# Read replicas, e.g. DB_REPLICA_HOSTS=replica-a,replica-b. Safe requests
+# read from a healthy replica, see core.routers. Needs CACHE_LOCATION.
+DATABASE_REPLICAS = []
+for index, host in enumerate(
+        filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')), 1):
+    DATABASES[f'replica{index}'] = dict(
+        DATABASES['default'],
+        HOST=host.strip(),
+        TEST={'MIRROR': 'default'},
+    )
+    DATABASE_REPLICAS.append(f'replica{index}')
+
+# Shards holding the tags, ingredients and recipes of users, e.g.
+# DB_SHARD_NAMES=app_shard1,app_shard2 on the default server, added as
+# aliases shard1, shard2. The default database is always shard 0 and
+# keeps users, tokens and the shard map, see core.sharding.
+DATABASE_SHARDS = ['default']
+for index, name in enumerate(
+        filter(None, os.environ.get('DB_SHARD_NAMES', '').split(',')), 1):
+    DATABASES[f'shard{index}'] = dict(DATABASES['default'],
+                                      NAME=name.strip())
+    DATABASE_SHARDS.append(f'shard{index}')
+
+# Ids of sharded tables are allocated a stride apart, offset by the
+# index of the shard, see `manage.py configure_shards`. It bounds the
+# number of shards.
+SHARD_ID_STRIDE = 64
+# Seconds processes keep the shard of a user. Moving a user waits this
+# long between each step.
+SHARD_MAP_CACHE_SECONDS = 5
+
+DATABASE_ROUTERS = ['core.routers.ShardRouter', 'core.routers.ReplicaRouter']
+
+# Seconds a client reads from the primary after a write.
+REPLICA_PIN_SECONDS = 5
+# Replicas lagging more seconds than this are skipped.
+REPLICA_MAX_LAG = 5
+REPLICA_CHECK_INTERVAL = 5
+
+
+# Logging
+# https://docs.djangoproject.com/en/2.1/topics/logging/
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'core': {
+            'handlers': ['console'],
+            'level': os.environ.get('CORE_LOG_LEVEL', 'INFO'),
+        },
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
@@ -131,4 +208,126 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = '/vol/web/media'
 STATIC_ROOT = '/vol/web/static'
 
+# Media files are served by core.media.serve. Set MEDIA_SENDFILE to
+# 'x-accel-redirect' (nginx, with an internal location at
+# MEDIA_SENDFILE_PREFIX aliased to MEDIA_ROOT) or 'x-sendfile' (Apache,
+# lighttpd) to have the web server send the bytes.
+MEDIA_SENDFILE = os.environ.get('MEDIA_SENDFILE', '')
+MEDIA_SENDFILE_PREFIX = os.environ.get('MEDIA_SENDFILE_PREFIX',
+                                       '/protected-media/')
+
+# Resized recipe images served from /media/recipe/<id>/<w>x<h>.<format>
+IMAGE_RENDITION_ROOT = os.path.join(MEDIA_ROOT, 'renditions')
+IMAGE_RENDITION_CACHE_SIZE = int(
+    os.environ.get('IMAGE_RENDITION_CACHE_SIZE', 512 * 1024 * 1024)
+)
+# Only these (width, height) are rendered, so the cache cannot be filled
+# with every size a client asks for.
+IMAGE_RENDITION_SIZES = [(160, 160), (320, 320), (640, 640), (1280, 1280)]
+IMAGE_RENDITION_MAX_AGE = 30 * 24 * 60 * 60
+
+# Media is stored in an S3 compatible bucket (AWS S3, MinIO) when
+# AWS_STORAGE_BUCKET_NAME is set. Credentials are read by boto3 from the
+# environment. Clients can then upload recipe images straight to the
+# bucket with presigned URLs.
+AWS_STORAGE_BUCKET_NAME = os.environ.get('AWS_STORAGE_BUCKET_NAME')
+if AWS_STORAGE_BUCKET_NAME:
+    DEFAULT_FILE_STORAGE = 'core.storage.MediaStorage'
+    AWS_S3_ENDPOINT_URL = os.environ.get('AWS_S3_ENDPOINT_URL')
+    AWS_S3_REGION_NAME = os.environ.get('AWS_S3_REGION_NAME')
+    AWS_DEFAULT_ACL = None
+    AWS_S3_FILE_OVERWRITE = False
+IMAGE_UPLOAD_MAX_SIZE = 10 * 1024 * 1024
+IMAGE_UPLOAD_URL_EXPIRY = 15 * 60
+
 AUTH_USER_MODEL = 'core.User'
+
+# Upper bounds of the recipe price histogram buckets. Run
+# `manage.py rebuild_recipe_stats` after changing them.
+STATS_PRICE_BUCKETS = ('5', '10', '20', '50')
+
+# MinHash signatures of recipe ingredients for similar recipe lookups.
+# PERMUTATIONS must be a multiple of BANDS. Run
+# `manage.py rebuild_recipe_signatures` after changing them.
+MINHASH_PERMUTATIONS = 64
+MINHASH_BANDS = 16
+MINHASH_SEED = 0
+MINHASH_MAX_CANDIDATES = 1000
+
+# Changes returned per page of the delta sync feed.
+SYNC_PAGE_SIZE = int(os.environ.get('SYNC_PAGE_SIZE', 500))
+
+# Server-sent event streams of recipe changes. Streams send a heartbeat
+# comment when idle and end after EVENT_STREAM_MAX_SECONDS, clients
+# reconnect after EVENT_RETRY_MS. Streams whose EVENT_QUEUE_SIZE queue
+# fills up catch up from the sync log.
+EVENT_HEARTBEAT = int(os.environ.get('EVENT_HEARTBEAT', 15))
+EVENT_STREAM_MAX_SECONDS = int(os.environ.get('EVENT_STREAM_MAX_SECONDS',
+                                              300))
+EVENT_RETRY_MS = 3000
+EVENT_QUEUE_SIZE = 100
+
+# Admin changelists estimate the row count of larger tables.
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 100000
+
+
+# Django REST framework
+
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'core.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+    'DEFAULT_THROTTLE_CLASSES': (
+        'core.throttling.AnonRateThrottle',
+        'core.throttling.UserRateThrottle',
+    ),
+    'DEFAULT_THROTTLE_RATES': {
+        'anon': os.environ.get('THROTTLE_RATE_ANON', '100/min'),
+        'user': os.environ.get('THROTTLE_RATE_USER', '1000/min'),
+        'login': os.environ.get('THROTTLE_RATE_LOGIN', '20/min'),
+    },
+    # Number of trusted proxies in front of the API. Throttles key on the
+    # client address they appended to X-Forwarded-For, or on REMOTE_ADDR
+    # when there are none, never on addresses sent by clients.
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 0)),
+}
+
+# Shared by every worker when CACHE_LOCATION lists memcached servers,
+# e.g. memcached-a:11211,memcached-b:11211. Token lookups and replica
+# pins need it; the local memory fallback only suits a single process.
+CACHE_LOCATION = os.environ.get('CACHE_LOCATION')
+if CACHE_LOCATION:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+            'LOCATION': CACHE_LOCATION.split(','),
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+    }
+
+# Use 'core.throttling.CacheCounterStore' with a shared CACHES backend
+# when several workers serve the API.
+THROTTLE_COUNTER_STORE = os.environ.get(
+    'THROTTLE_COUNTER_STORE',
+    'core.throttling.LocalCounterStore'
+)
+
+
+# Authentication tokens
+
+# Token keys and signed token users are only cached in a shared cache.
+AUTH_TOKEN_CACHE_TIMEOUT = 60 * 5
+
+AUTH_SIGNED_TOKENS = bool(int(os.environ.get('AUTH_SIGNED_TOKENS', 0)))
+AUTH_SIGNED_TOKEN_MAX_AGE = 60 * 60 * 24
@@ -1,7 +1,127 @@
+from django.conf import settings
 from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelectMultiple
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.core.paginator import Paginator
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.functional import cached_property
+from django.utils.http import urlencode
 
-from core import models
+from core import models, partitioning, sharding
+
+
+def table_estimate(model) -> int:
+    """Return the planner estimate of the number of rows of a table."""
+    with connections['default'].cursor() as cursor:
+        return partitioning.estimate_rows(cursor, model._meta.db_table)
+
+
+def plan_estimate(queryset) -> int:
+    """Return the planner estimate of the number of rows of a queryset."""
+    sql, params = queryset.query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator estimating counts of tables above a size threshold.
+
+    COUNT(*) reads the whole table, so above ADMIN_ESTIMATED_COUNT_THRESHOLD
+    rows the changelist uses the pg_class estimate, or the query plan
+    estimate when filtered.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        estimate = table_estimate(queryset.model)
+        if estimate < settings.ADMIN_ESTIMATED_COUNT_THRESHOLD:
+            return super().count
+        if not queryset.query.where:
+            return estimate
+
+        return plan_estimate(queryset)
+
+
+class UserScopedAutocomplete(AutocompleteSelectMultiple):
+    """Autocomplete widget only offering objects of one user."""
+
+    def __init__(self, *args, user_id=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.user_id = user_id
+
+    def get_url(self):
+        url = super().get_url()
+        if self.user_id is None:
+            return url
+
+        return f'{url}?{urlencode({"user_id": self.user_id})}'
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Admin for user owned objects, fast on large tables.
+
+    Only the rows of the default shard are listed and edited: reads
+    outside of a shard go to the default database, and the views
+    writing rows run on it.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
+
+    def changelist_view(self, request, extra_context=None):
+        with sharding.using_shard(DEFAULT_DB_ALIAS):
+            return super().changelist_view(request, extra_context)
+
+    def changeform_view(self, request, object_id=None, form_url='',
+                        extra_context=None):
+        with sharding.using_shard(DEFAULT_DB_ALIAS):
+            return super().changeform_view(request, object_id, form_url,
+                                           extra_context)
+
+    def delete_view(self, request, object_id, extra_context=None):
+        with sharding.using_shard(DEFAULT_DB_ALIAS):
+            return super().delete_view(request, object_id, extra_context)
+
+
+class UserOwnedAttrAdmin(LargeTableAdmin):
+    """Admin for tags and ingredients."""
+    list_display = ('name', 'user')
+    # Prefix searches use the index on UPPER(name).
+    search_fields = ('^name',)
+
+    def get_search_results(self, request, queryset, search_term):
+        """Limit autocomplete results to one user when asked to."""
+        user_id = request.GET.get('user_id')
+        if user_id and user_id.isdigit():
+            queryset = queryset.filter(user_id=user_id)
+
+        return super().get_search_results(request, queryset, search_term)
+
+
+class RecipeAdmin(LargeTableAdmin):
+    list_display = ('title', 'user', 'time_minutes', 'price')
+    search_fields = ('^title',)
+    autocomplete_fields = ('tags', 'ingredients')
+
+    def get_form(self, request, obj=None, **kwargs):
+        """Scope the tag and ingredient fields to the recipe owner."""
+        form = super().get_form(request, obj, **kwargs)
+        if obj is not None:
+            for name in ('tags', 'ingredients'):
+                field = form.base_fields[name]
+                field.queryset = field.queryset.filter(user_id=obj.user_id)
+                widget = field.widget.widget
+                field.widget.widget = UserScopedAutocomplete(
+                    widget.rel, widget.admin_site, widget.attrs,
+                    widget.choices, widget.db, user_id=obj.user_id
+                )
+
+        return form
 
 
 class UserAdmin(BaseUserAdmin):
@@ -26,6 +146,6 @@ class UserAdmin(BaseUserAdmin):
 
 
 admin.site.register(models.User, UserAdmin)
-admin.site.register(models.Tag)
-admin.site.register(models.Ingredient)
-admin.site.register(models.Recipe)
+admin.site.register(models.Tag, UserOwnedAttrAdmin)
+admin.site.register(models.Ingredient, UserOwnedAttrAdmin)
+admin.site.register(models.Recipe, RecipeAdmin)
@@ -3,3 +3,35 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from django.db.models.signals import m2m_changed, post_delete, \
+            post_save, pre_delete, pre_save
+
+        from django.contrib.auth import get_user_model
+
+        from core import indexing, pantry, sharding, stats, sync
+        from core.models import Ingredient, Recipe, Tag
+
+        post_save.connect(sharding.user_post_save, sender=get_user_model())
+
+        pre_save.connect(stats.recipe_pre_save, sender=Recipe)
+        post_save.connect(stats.recipe_post_save, sender=Recipe)
+        pre_delete.connect(stats.recipe_pre_delete, sender=Recipe)
+        m2m_changed.connect(stats.links_changed, sender=Recipe.tags.through)
+        m2m_changed.connect(stats.links_changed,
+                            sender=Recipe.ingredients.through)
+        m2m_changed.connect(indexing.recipe_ingredients_changed,
+                            sender=Recipe.ingredients.through)
+        pre_delete.connect(stats.tag_pre_delete, sender=Tag)
+        pre_delete.connect(stats.ingredient_pre_delete, sender=Ingredient)
+        pre_delete.connect(indexing.ingredient_pre_delete, sender=Ingredient)
+        post_delete.connect(indexing.ingredient_post_delete,
+                            sender=Ingredient)
+        post_save.connect(pantry.ingredient_post_save, sender=Ingredient)
+        for model in (Recipe, Tag, Ingredient):
+            post_save.connect(sync.object_post_save, sender=model)
+            pre_delete.connect(sync.object_pre_delete, sender=model)
+        m2m_changed.connect(sync.links_changed, sender=Recipe.tags.through)
+        m2m_changed.connect(sync.links_changed,
+                            sender=Recipe.ingredients.through)
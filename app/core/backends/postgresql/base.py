@@ -0,0 +1,28 @@
+from django.db.backends.base.introspection import TableInfo
+from django.db.backends.postgresql import base, introspection
+
+
+class DatabaseIntrospection(introspection.DatabaseIntrospection):
+    """Introspection listing partitioned tables, as Django 2.2 does.
+
+    Otherwise flushing the test database skips them and fails on their
+    foreign keys.
+    """
+
+    def get_table_list(self, cursor):
+        """Return a list of table and view names in the current database."""
+        cursor.execute("""
+            SELECT c.relname, c.relkind
+            FROM pg_catalog.pg_class c
+            LEFT JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+            WHERE c.relkind IN ('p', 'r', 'v')
+                AND n.nspname NOT IN ('pg_catalog', 'pg_toast')
+                AND pg_catalog.pg_table_is_visible(c.oid)""")
+        return [TableInfo(row[0], {'p': 't', 'r': 't', 'v': 'v'}.get(row[1]))
+                for row in cursor.fetchall()
+                if row[0] not in self.ignored_tables]
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL backend aware of partitioned tables."""
+    introspection_class = DatabaseIntrospection
@@ -0,0 +1,349 @@
+import time
+from collections import namedtuple
+from contextlib import ExitStack
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.db import connections
+from django.test import RequestFactory
+from django.utils import timezone
+
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core import pantry, sharding, similarity
+from core.models import Ingredient, Recipe
+from core.renderers import ORJSONRenderer
+from core.seeding import Seeder
+from core.throttling import AnonRateThrottle, LocalCounterStore
+from recipe.serializers import RecipeSerializer
+from recipe.views import RecipeViewSet
+from user.authentication import TokenAuthentication
+
+
+SCENARIOS = {}
+
+Dataset = namedtuple('Dataset', ('size', 'user', 'token'))
+
+
+def scenario(name: str):
+    """Register a benchmark scenario.
+
+    A scenario receives a Dataset and returns the operation to time.
+    """
+    def register(func):
+        SCENARIOS[name] = func
+        return func
+
+    return register
+
+
+def build_dataset(size: int) -> Dataset:
+    """Create a user owning `size` recipes with tags and ingredients."""
+    seeder = Seeder(seed=size, prefix=f'benchmark{time.time_ns()}-',
+                    tags_per_user=10, ingredients_per_user=20)
+    seeder.seed_users(1, size)
+    user = get_user_model().objects.get(email=seeder.email(0))
+    token = Token.objects.create(user=user)
+
+    return Dataset(size=size, user=user, token=token)
+
+
+class QueryCounter:
+    """Database execute wrapper counting the queries run."""
+
+    def __init__(self):
+        self.queries = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+
+def percentile(samples, fraction: float) -> float:
+    """Return the nearest-rank percentile of sorted samples."""
+    index = min(len(samples) - 1, int(round(fraction * (len(samples) - 1))))
+    return samples[index]
+
+
+def run(operation, iterations: int) -> dict:
+    """Time an operation and return its statistics."""
+    operation()
+
+    counter = QueryCounter()
+    samples = []
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(counter))
+        for _ in range(iterations):
+            start = time.perf_counter()
+            operation()
+            samples.append(time.perf_counter() - start)
+    samples.sort()
+
+    return {
+        'ops_per_sec': round(iterations / sum(samples), 2),
+        'p50_ms': round(percentile(samples, 0.5) * 1e3, 4),
+        'p99_ms': round(percentile(samples, 0.99) * 1e3, 4),
+        'queries': counter.queries / iterations,
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float):
+    """Return the regressions of results against a baseline.
+
+    A scenario regresses when its median latency grows by more than
+    `threshold` or when it runs more queries.
+    """
+    regressions = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if expected is None:
+            continue
+        if result['p50_ms'] > expected['p50_ms'] * (1 + threshold):
+            regressions.append(
+                f'{name}: p50 {result["p50_ms"]}ms, '
+                f'baseline {expected["p50_ms"]}ms'
+            )
+        if result['queries'] > expected['queries']:
+            regressions.append(
+                f'{name}: {result["queries"]} queries, '
+                f'baseline {expected["queries"]}'
+            )
+
+    return regressions
+
+
+def relations(table: str) -> list:
+    """Return the partitions of a table, or the table without any."""
+    with sharding.db_connection().cursor() as cursor:
+        cursor.execute(
+            'SELECT inhrelid::regclass::text FROM pg_inherits '
+            'WHERE inhparent = %s::regclass ORDER BY 1',
+            [table]
+        )
+        return [row[0] for row in cursor.fetchall()] or [table]
+
+
+def vacuum(table: str, dead_fraction: float) -> dict:
+    """Time vacuuming a table after updating a fraction of its rows.
+
+    Relations are vacuumed one at a time, as autovacuum does, so the
+    longest one bounds how long maintenance works on a single relation.
+    Runs outside of transactions only.
+    """
+    samples = []
+    with sharding.db_connection().cursor() as cursor:
+        cursor.execute(f'UPDATE {table} SET id = id WHERE random() < %s',
+                       [dead_fraction])
+        dead_rows = cursor.rowcount
+        for relation in relations(table):
+            start = time.perf_counter()
+            cursor.execute(f'VACUUM {relation}')
+            samples.append(time.perf_counter() - start)
+
+    return {
+        'relations': len(samples),
+        'dead_rows': dead_rows,
+        'total_ms': round(sum(samples) * 1e3, 2),
+        'max_ms': round(max(samples) * 1e3, 2),
+    }
+
+
+def _recipe_view_request(dataset: Dataset):
+    """Return an authenticated request for the recipe list."""
+    request = APIRequestFactory().get('/api/recipe/recipes/')
+    force_authenticate(request, user=dataset.user)
+    return request
+
+
+@scenario('recipe_serializer')
+def recipe_serializer(dataset: Dataset):
+    """Serialize prefetched recipes with RecipeSerializer."""
+    def operation():
+        recipes = Recipe.objects.filter(
+            user=dataset.user
+        ).prefetch_related('tags', 'ingredients')
+        return RecipeSerializer(recipes, many=True).data
+
+    return operation
+
+
+@scenario('recipe_list_queryset')
+def recipe_list_queryset(dataset: Dataset):
+    """Evaluate the queryset of the recipe list action."""
+    view = RecipeViewSet(action='list')
+    view.request = Request(RequestFactory().get('/'))
+    view.request.user = dataset.user
+
+    return lambda: list(view.get_queryset())
+
+
+@scenario('recipe_list_api')
+def recipe_list_api(dataset: Dataset):
+    """Serve and render the recipe list endpoint."""
+    view = RecipeViewSet.as_view({'get': 'list'}, throttle_classes=())
+
+    return lambda: view(_recipe_view_request(dataset)).render()
+
+
+@scenario('similar_recipes')
+def similar_recipes(dataset: Dataset):
+    """Find the recipes most similar to one with the LSH index."""
+    recipe = Recipe.objects.filter(
+        user=dataset.user,
+        signature__isnull=False
+    ).order_by('pk').first()
+
+    return lambda: similarity.similar_recipes(recipe, 10)
+
+
+@scenario('similar_recipes_exact')
+def similar_recipes_exact(dataset: Dataset):
+    """Find the recipes most similar to one by exact Jaccard in SQL."""
+    recipe = Recipe.objects.filter(
+        user=dataset.user,
+        signature__isnull=False
+    ).order_by('pk').first()
+    table = Recipe.ingredients.through._meta.db_table
+    sql = f'''
+        WITH mine AS (
+            SELECT ingredient_id FROM {table} WHERE recipe_id = %s
+        ), shared AS (
+            SELECT l.recipe_id, COUNT(*) AS size,
+                   COUNT(*) FILTER (
+                       WHERE l.ingredient_id IN (SELECT * FROM mine)
+                   ) AS common
+            FROM {table} l
+            JOIN {Recipe._meta.db_table} r ON r.id = l.recipe_id
+            WHERE r.user_id = %s AND l.recipe_id != %s
+            GROUP BY l.recipe_id
+        )
+        SELECT recipe_id,
+               common::float / ((SELECT COUNT(*) FROM mine) + size - common)
+        FROM shared
+        ORDER BY 2 DESC, 1
+        LIMIT 10
+    '''
+
+    def operation():
+        with sharding.db_connection().cursor() as cursor:
+            cursor.execute(sql, [recipe.pk, dataset.user.pk, recipe.pk])
+            return cursor.fetchall()
+
+    return operation
+
+
+def _pantry(dataset: Dataset):
+    """Return the ids of half of the ingredients of the dataset user."""
+    ids = list(Ingredient.objects.filter(
+        user=dataset.user
+    ).order_by('pk').values_list('pk', flat=True))
+    return ids[::2]
+
+
+@scenario('cookable_recipes')
+def cookable_recipes(dataset: Dataset):
+    """Find the recipes lacking at most one ingredient with the masks."""
+    ingredient_ids = _pantry(dataset)
+
+    return lambda: list(pantry.cookable(
+        Recipe.objects.filter(user=dataset.user), dataset.user,
+        ingredient_ids, 1
+    ).order_by('missing_ingredients', '-id').values_list('id', flat=True))
+
+
+@scenario('cookable_recipes_join')
+def cookable_recipes_join(dataset: Dataset):
+    """Find the recipes lacking at most one ingredient by joining links."""
+    ingredient_ids = _pantry(dataset)
+    table = Recipe.ingredients.through._meta.db_table
+    sql = f'''
+        SELECT l.recipe_id
+        FROM {table} l
+        JOIN {Recipe._meta.db_table} r ON r.id = l.recipe_id
+        WHERE r.user_id = %s
+        GROUP BY l.recipe_id
+        HAVING COUNT(*) FILTER (WHERE l.ingredient_id != ALL(%s)) <= 1
+        ORDER BY COUNT(*) FILTER (WHERE l.ingredient_id != ALL(%s)),
+                 l.recipe_id DESC
+    '''
+
+    def operation():
+        with sharding.db_connection().cursor() as cursor:
+            cursor.execute(sql, [dataset.user.pk, ingredient_ids,
+                                 ingredient_ids])
+            return cursor.fetchall()
+
+    return operation
+
+
+@scenario('token_authentication')
+def token_authentication(dataset: Dataset):
+    """Authenticate a request with a database token."""
+    authentication = TokenAuthentication()
+    request = Request(RequestFactory().get(
+        '/',
+        HTTP_AUTHORIZATION=f'Token {dataset.token.key}'
+    ))
+
+    return lambda: authentication.authenticate(request)
+
+
+@scenario('throttle_check')
+def throttle_check(dataset: Dataset):
+    """Check the anonymous throttle for `size` distinct clients."""
+    throttle = AnonRateThrottle()
+    throttle.counter_store = LocalCounterStore()
+    throttle.num_requests = 10 ** 9
+
+    factory = RequestFactory()
+    requests = []
+    for i in range(dataset.size):
+        request = Request(factory.get(
+            '/',
+            REMOTE_ADDR=f'10.0.{i // 256 % 256}.{i % 256}'
+        ))
+        request.user = AnonymousUser()
+        requests.append(request)
+
+    def operation():
+        for request in requests:
+            throttle.allow_request(request, None)
+
+    return operation
+
+
+def _recipe_listing(size: int):
+    """Return recipe representations shaped like the list endpoint."""
+    now = timezone.now()
+    return [
+        {
+            'id': i,
+            'title': f'Recipe {i}',
+            'ingredients': list(range(i % 12)),
+            'tags': list(range(i % 5)),
+            'time_minutes': i % 120,
+            'price': Decimal(i % 10000) / 100,
+            'link': f'https://example.com/recipes/{i}',
+            'created': now,
+        }
+        for i in range(size)
+    ]
+
+
+@scenario('render_json')
+def render_json(dataset: Dataset):
+    """Render a recipe listing with DRF's stdlib JSONRenderer."""
+    data = _recipe_listing(dataset.size)
+    return lambda: JSONRenderer().render(data)
+
+
+@scenario('render_orjson')
+def render_orjson(dataset: Dataset):
+    """Render a recipe listing with ORJSONRenderer."""
+    data = _recipe_listing(dataset.size)
+    return lambda: ORJSONRenderer().render(data)
@@ -0,0 +1,17 @@
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+
+# Backends whose entries are only seen by the process writing them.
+LOCAL_BACKENDS = (LocMemCache, DummyCache)
+
+
+def shared_cache(alias: str = 'default'):
+    """Return a cache shared by every worker, or None.
+
+    Entries written by a worker into a local cache cannot be invalidated
+    by the others, so callers caching across requests skip the cache.
+    """
+    cache = caches[alias]
+    return None if isinstance(cache, LOCAL_BACKENDS) else cache
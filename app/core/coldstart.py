@@ -0,0 +1,118 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+
+
+# Scripts run in a fresh interpreter, printing their timings as the last
+# line of their output.
+COMMAND_SCRIPT = '''
+import json, sys, time
+start = time.perf_counter()
+from django.core.management import execute_from_command_line
+execute_from_command_line(['manage.py'] + sys.argv[1:])
+print()
+print(json.dumps({'run_ms': (time.perf_counter() - start) * 1e3}))
+'''
+
+REQUEST_SCRIPT = '''
+import json, sys, time
+from wsgiref.util import setup_testing_defaults
+start = time.perf_counter()
+from app.wsgi import application
+booted = time.perf_counter()
+environ = {'PATH_INFO': sys.argv[1], 'HTTP_HOST': sys.argv[2]}
+setup_testing_defaults(environ)
+response = application(environ, lambda status, headers: None)
+b''.join(response)
+response.close()
+print(json.dumps({
+    'boot_ms': (booted - start) * 1e3,
+    'first_request_ms': (time.perf_counter() - booted) * 1e3,
+}))
+'''
+
+
+def parse_importtime(output: str) -> list:
+    """Return the modules reported by `python -X importtime`.
+
+    Returns:
+        list: (module, self_us, cumulative_us) in import order.
+    """
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split(
+            '|'
+        )
+        modules.append((module.strip(), int(self_us), int(cumulative_us)))
+
+    return modules
+
+
+def summarize(modules, top: int) -> dict:
+    """Aggregate the import time of modules by top level package."""
+    packages = {}
+    for module, self_us, _ in modules:
+        package = module.split('.')[0]
+        packages[package] = packages.get(package, 0) + self_us
+
+    return {
+        'modules': len(modules),
+        'import_ms': round(sum(row[1] for row in modules) / 1e3, 2),
+        'packages': {
+            package: round(self_us / 1e3, 2)
+            for package, self_us in sorted(packages.items(),
+                                           key=lambda item: -item[1])[:top]
+        },
+    }
+
+
+def _host() -> str:
+    """Return a host name the application accepts."""
+    for host in settings.ALLOWED_HOSTS:
+        if host != '*' and not host.startswith('.'):
+            return host
+    return 'localhost'
+
+
+def profile(entry_point: str, argument: str, top: int = 15,
+            env: dict = None) -> dict:
+    """Time an entry point in a fresh interpreter, with its imports.
+
+    Args:
+        entry_point (str): 'command' to run a management command, or
+            'request' to load the WSGI application and serve a request.
+        argument (str): command name, or path of the request.
+        top (int): number of packages reported.
+        env (dict): extra environment variables, such as PRELOAD_APP.
+
+    Returns:
+        dict: wall time of the process, timings reported by the script
+        and import times by package.
+    """
+    if entry_point == 'command':
+        args = [COMMAND_SCRIPT, *argument.split()]
+    else:
+        args = [REQUEST_SCRIPT, argument, _host()]
+    start = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', *args],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        universal_newlines=True, cwd=settings.BASE_DIR,
+        env=dict(os.environ, **(env or {})),
+    )
+    wall_ms = (time.perf_counter() - start) * 1e3
+    if process.returncode:
+        raise RuntimeError(process.stderr.strip().splitlines()[-1])
+
+    result = {'wall_ms': round(wall_ms, 2)}
+    timings = json.loads(process.stdout.strip().splitlines()[-1])
+    result.update((key, round(value, 2)) for key, value in timings.items())
+    result.update(summarize(parse_importtime(process.stderr), top))
+
+    return result
@@ -0,0 +1,183 @@
+import logging
+import queue
+import threading
+
+from django.core.files.storage import default_storage
+from django.db import DEFAULT_DB_ALIAS, router, transaction
+
+from core import indexing, sharding, stats, sync
+from core.models import Ingredient, Recipe, RecipeIngredientMask, \
+    RecipeSignature, RecipeStatsBucket, SyncChange, Tag
+
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+_files = queue.Queue()
+_worker_lock = threading.Lock()
+_worker = None
+
+
+def _remove_files():
+    """Delete queued files from storage, forever.
+
+    Storage errors are logged, whatever the backend raises, so that the
+    queue keeps draining.
+    """
+    global _worker
+
+    try:
+        while True:
+            name = _files.get()
+            try:
+                default_storage.delete(name)
+            except Exception:
+                logger.warning('Unable to remove file %s', name,
+                               exc_info=True)
+            finally:
+                _files.task_done()
+    finally:
+        with _worker_lock:
+            _worker = None
+
+
+def queue_file_removal(names):
+    """Remove files from storage in a background thread."""
+    global _worker
+
+    for name in names:
+        _files.put(name)
+
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_remove_files, daemon=True,
+                                       name='file-removal')
+            _worker.start()
+
+
+def wait_for_file_removal():
+    """Block until every queued file is removed."""
+    _files.join()
+
+
+def _delete_in_batches(queryset, delete_batch, batch_size: int) -> int:
+    """Delete the rows of a queryset a batch of primary keys at a time.
+
+    Rows are never loaded as model instances and each batch runs in its
+    own short transaction, so memory use and lock time stay constant.
+    """
+    deleted = 0
+    queryset = queryset.order_by('pk').values_list('pk', flat=True)
+    while True:
+        ids = list(set(queryset[:batch_size]))
+        if not ids:
+            return deleted
+        with transaction.atomic(using=router.db_for_write(queryset.model)):
+            batch_deleted = delete_batch(ids)
+        if not batch_deleted:
+            return deleted
+        deleted += batch_deleted
+
+
+def _raw_delete(queryset) -> int:
+    """Delete a queryset with one DELETE statement, without signals."""
+    return queryset._raw_delete(router.db_for_write(queryset.model))
+
+
+def delete_recipes(queryset, batch_size: int = BATCH_SIZE) -> int:
+    """Delete recipes, their tag and ingredient links and their images.
+
+    Args:
+        queryset (QuerySet): recipes to delete.
+        batch_size (int): recipes deleted per transaction.
+
+    Returns:
+        int: number of recipes deleted.
+    """
+    def delete_batch(ids):
+        images = [
+            image for image in Recipe.objects.filter(
+                pk__in=ids
+            ).exclude(image='').values_list('image', flat=True)
+            if image
+        ]
+        stats.remove_recipes(ids)
+        sync.record(SyncChange.RECIPE, ids, deleted=True)
+        _raw_delete(RecipeSignature.objects.filter(recipe_id__in=ids))
+        _raw_delete(
+            RecipeIngredientMask.objects.filter(recipe_id__in=ids)
+        )
+        _raw_delete(Recipe.tags.through.objects.filter(recipe_id__in=ids))
+        _raw_delete(
+            Recipe.ingredients.through.objects.filter(recipe_id__in=ids)
+        )
+        deleted = _raw_delete(Recipe.objects.filter(pk__in=ids))
+        if images:
+            transaction.on_commit(lambda: queue_file_removal(images))
+        return deleted
+
+    return _delete_in_batches(queryset, delete_batch, batch_size)
+
+
+def delete_tags(queryset, batch_size: int = BATCH_SIZE) -> int:
+    """Delete tags and unlink them from recipes."""
+    def delete_batch(ids):
+        links = Recipe.tags.through.objects.filter(tag_id__in=ids)
+        stats.forget_keys(RecipeStatsBucket.TAG, ids)
+        sync.record(SyncChange.RECIPE,
+                    set(links.values_list('recipe_id', flat=True)))
+        sync.record(SyncChange.TAG, ids, deleted=True)
+        _raw_delete(links)
+        return _raw_delete(Tag.objects.filter(pk__in=ids))
+
+    return _delete_in_batches(queryset, delete_batch, batch_size)
+
+
+def delete_ingredients(queryset, batch_size: int = BATCH_SIZE) -> int:
+    """Delete ingredients and unlink them from recipes."""
+    def delete_batch(ids):
+        links = Recipe.ingredients.through.objects.filter(
+            ingredient_id__in=ids
+        )
+        recipe_ids = set(links.values_list('recipe_id', flat=True))
+        stats.forget_keys(RecipeStatsBucket.INGREDIENT, ids)
+        sync.record(SyncChange.RECIPE, recipe_ids)
+        sync.record(SyncChange.INGREDIENT, ids, deleted=True)
+        _raw_delete(links)
+        deleted = _raw_delete(Ingredient.objects.filter(pk__in=ids))
+        indexing.index_recipes(recipe_ids)
+        return deleted
+
+    return _delete_in_batches(queryset, delete_batch, batch_size)
+
+
+def delete_user(user, batch_size: int = BATCH_SIZE) -> dict:
+    """Delete a user and everything it owns in batches.
+
+    Args:
+        user (User): user to delete.
+        batch_size (int): rows deleted per transaction.
+
+    Returns:
+        dict: number of rows deleted per model.
+    """
+    user_id, alias = user.pk, sharding.shard_for(user.pk)
+    with sharding.using_shard(alias):
+        counts = {
+            'recipes': delete_recipes(Recipe.objects.filter(user=user),
+                                      batch_size),
+            'tags': delete_tags(Tag.objects.filter(user=user), batch_size),
+            'ingredients': delete_ingredients(
+                Ingredient.objects.filter(user=user), batch_size
+            ),
+        }
+    # Only small related rows, such as the auth token, are left for the
+    # collector.
+    user.delete()
+    if alias != DEFAULT_DB_ALIAS:
+        # The stub of the user, with its stats and tombstones.
+        type(user).objects.using(alias).filter(pk=user_id).delete()
+    counts['users'] = 1
+
+    return counts
@@ -0,0 +1,257 @@
+import json
+import logging
+import queue
+import select
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+
+from core import sharding, sync
+
+
+logger = logging.getLogger(__name__)
+
+# Seconds a listener waits for notifications before checking again.
+POLL_INTERVAL = 5
+
+
+class Subscription:
+    """Change events of a user waiting to be sent on one stream.
+
+    The queue is bounded: events arriving while it is full are dropped
+    and `overflowed` is set, so the stream catches up from the sync log
+    instead of the broker blocking or buffering without limit.
+    """
+
+    def __init__(self, user_id: int, size: int):
+        self.user_id = user_id
+        self.events = queue.Queue(maxsize=size)
+        self.overflowed = False
+
+    def put(self, event: dict):
+        """Queue an event, or mark the subscription overflowed."""
+        try:
+            self.events.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True
+
+    def clear(self):
+        """Drop the queued events and the overflow mark."""
+        self.overflowed = False
+        while True:
+            try:
+                self.events.get_nowait()
+            except queue.Empty:
+                return
+
+
+class Broker:
+    """Hand the change notifications of Postgres to the subscriptions.
+
+    A single thread per process listens on sync.CHANNEL of every shard,
+    with its own connections, however many streams are open.
+    """
+
+    def __init__(self, poll_interval: float = POLL_INTERVAL):
+        self.poll_interval = poll_interval
+        self.listening = threading.Event()
+        self._stopping = threading.Event()
+        self._subscriptions = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def subscribe(self, user_id: int) -> Subscription:
+        """Return a new subscription to the changes of a user."""
+        subscription = Subscription(user_id, settings.EVENT_QUEUE_SIZE)
+        with self._lock:
+            self._subscriptions.setdefault(user_id, set()).add(subscription)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._listen,
+                                                daemon=True,
+                                                name='event-broker')
+                self._thread.start()
+
+        return subscription
+
+    def stop(self):
+        """Stop listening, within `poll_interval` seconds."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stopping.set()
+            thread.join()
+            self._stopping.clear()
+
+    def unsubscribe(self, subscription: Subscription):
+        """Stop queueing events for a subscription."""
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id,
+                                                    set())
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self._subscriptions.pop(subscription.user_id, None)
+
+    def publish(self, event: dict):
+        """Queue an event for every subscription of its user."""
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(event['user'], ()))
+        for subscription in subscriptions:
+            subscription.put(event)
+
+    def _overflow_all(self):
+        """Make every subscription catch up from the sync log."""
+        with self._lock:
+            for subscriptions in self._subscriptions.values():
+                for subscription in subscriptions:
+                    subscription.overflowed = True
+
+    def _listen(self):
+        """Publish notifications until stopped, reconnecting after errors."""
+        while not self._stopping.is_set():
+            try:
+                self._receive()
+            except Exception:
+                logger.warning('Event listener failed, reconnecting',
+                               exc_info=True)
+                self._stopping.wait(1)
+            self.listening.clear()
+
+    def _receive(self):
+        """Listen on new connections and publish their notifications."""
+        conns = []
+        try:
+            for alias in sharding.shards():
+                wrapper = connections[alias]
+                conn = wrapper.get_new_connection(
+                    wrapper.get_connection_params()
+                )
+                conns.append(conn)
+                conn.autocommit = True
+                with conn.cursor() as cursor:
+                    cursor.execute(f'LISTEN {sync.CHANNEL}')
+            # Changes committed before listening were never notified.
+            self._overflow_all()
+            self.listening.set()
+            while not self._stopping.is_set():
+                ready, _, _ = select.select(conns, [], [],
+                                            self.poll_interval)
+                for conn in ready:
+                    conn.poll()
+                    while conn.notifies:
+                        self.publish(
+                            json.loads(conn.notifies.pop(0).payload)
+                        )
+        finally:
+            for conn in conns:
+                conn.close()
+
+
+broker = Broker()
+
+
+def format_event(event: str, data: dict, event_id: int = None) -> str:
+    """Return a server-sent event."""
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event}')
+    lines.append(f'data: {json.dumps(data, separators=(",", ":"))}')
+
+    return '\n'.join(lines) + '\n\n'
+
+
+def _change_event(kind: str, object_id: int, action: str,
+                  sequence: int) -> str:
+    """Return the server-sent event of a change."""
+    return format_event(action, {'kind': kind, 'id': object_id},
+                        event_id=sequence)
+
+
+def _release(alias: str):
+    """Close the connection of this thread to a shard between queries.
+
+    Streams stay open for minutes, mostly waiting on their queue, so
+    they do not hold a database connection meanwhile. A connection in a
+    transaction is left open.
+    """
+    connection = connections[alias]
+    if not connection.in_atomic_block:
+        connection.close()
+
+
+def _replay(user, alias: str, since: int, until: int):
+    """Yield the events of the changes in (since, until] from the sync log
+    of a shard.
+
+    Created objects are replayed as updated: the log only keeps the
+    latest change of each object. Objects changed again after `until`
+    are left to the live events.
+    """
+    while since < until:
+        with sharding.using_shard(alias):
+            rows = sync.changes_after(user, since, settings.SYNC_PAGE_SIZE)
+        for kind, object_id, deleted, sequence in rows:
+            if sequence > until:
+                return
+            yield _change_event(kind, object_id,
+                                'deleted' if deleted else 'updated',
+                                sequence)
+            since = sequence
+        if len(rows) < settings.SYNC_PAGE_SIZE:
+            return
+
+
+def stream(user, last_event_id: int = None):
+    """Yield the server-sent events of the changes of a user.
+
+    The stream starts with a `ready` event carrying a cursor, so a
+    reconnecting client always sends a Last-Event-ID. Changes after
+    `last_event_id` are replayed first. A comment is sent when nothing
+    happened for EVENT_HEARTBEAT seconds, and the stream ends after
+    EVENT_STREAM_MAX_SECONDS to let the client reconnect elsewhere.
+    """
+    # Not entered for the whole stream: the thread runs other code while
+    # the generator is suspended.
+    alias = sharding.shard_for(user.pk)
+    subscription = broker.subscribe(user.pk)
+    try:
+        with sharding.using_shard(alias):
+            cursor = sync.last_sequence(user)
+        _release(alias)
+        yield f'retry: {settings.EVENT_RETRY_MS}\n' + format_event(
+            'ready', {},
+            event_id=cursor if last_event_id is None else last_event_id
+        )
+        if last_event_id is not None:
+            yield from _replay(user, alias, last_event_id, cursor)
+            _release(alias)
+
+        deadline = time.monotonic() + settings.EVENT_STREAM_MAX_SECONDS
+        while True:
+            if subscription.overflowed:
+                subscription.clear()
+                with sharding.using_shard(alias):
+                    since, cursor = cursor, sync.last_sequence(user)
+                yield from _replay(user, alias, since, cursor)
+                _release(alias)
+                continue
+
+            timeout = min(settings.EVENT_HEARTBEAT,
+                          deadline - time.monotonic())
+            if timeout <= 0:
+                return
+            try:
+                event = subscription.events.get(timeout=timeout)
+            except queue.Empty:
+                yield ': heartbeat\n\n'
+                continue
+            if event['sequence'] <= cursor:
+                continue
+            cursor = event['sequence']
+            yield _change_event(event['kind'], event['id'],
+                                event['action'], event['sequence'])
+    finally:
+        broker.unsubscribe(subscription)
+        _release(alias)
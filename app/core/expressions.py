@@ -0,0 +1,16 @@
+from django.contrib.postgres.fields import ArrayField
+from django.db.models import IntegerField, Subquery
+
+
+class ArraySubquery(Subquery):
+    """Collect the single column returned by a subquery into an array.
+
+    Compiles to ``ARRAY(SELECT ...)``, which keeps the ordering of the
+    subquery and returns an empty array when it has no rows.
+    """
+    template = 'ARRAY(%(subquery)s)'
+
+    def __init__(self, queryset, output_field=None, **extra):
+        if output_field is None:
+            output_field = ArrayField(IntegerField())
+        super().__init__(queryset, output_field=output_field, **extra)
@@ -0,0 +1,10 @@
+from django.db import models
+
+
+class BitStringField(models.Field):
+    """Postgres ``varbit`` column, as a string of 0 and 1 characters."""
+
+    description = 'Bit string'
+
+    def db_type(self, connection):
+        return 'varbit'
@@ -0,0 +1,46 @@
+from core import pantry, sharding, similarity
+
+
+# Indexes derived from the ingredients of recipes.
+INDEXES = (similarity, pantry)
+
+
+def index_recipes(recipe_ids):
+    """Recompute the ingredient indexes of recipes."""
+    recipe_ids = list(recipe_ids)
+    for index in INDEXES:
+        index.index_recipes(recipe_ids)
+
+
+@sharding.on_shard
+def recipe_ingredients_changed(sender, instance, action, reverse, pk_set,
+                               **kwargs):
+    """Reindex the recipes whose ingredients changed."""
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            index_recipes([instance.pk])
+        return
+
+    # An ingredient was added to or removed from recipes.
+    if action == 'pre_clear':
+        instance._indexed_recipe_ids = list(
+            instance.recipe_set.values_list('pk', flat=True)
+        )
+    elif action == 'post_clear':
+        index_recipes(instance._indexed_recipe_ids)
+    elif action in ('post_add', 'post_remove'):
+        index_recipes(pk_set)
+
+
+@sharding.on_shard
+def ingredient_pre_delete(sender, instance, **kwargs):
+    """Remember the recipes using an ingredient about to be deleted."""
+    instance._indexed_recipe_ids = list(
+        instance.recipe_set.values_list('pk', flat=True)
+    )
+
+
+@sharding.on_shard
+def ingredient_post_delete(sender, instance, **kwargs):
+    """Reindex the recipes of a deleted ingredient."""
+    index_recipes(getattr(instance, '_indexed_recipe_ids', []))
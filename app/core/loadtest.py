@@ -0,0 +1,266 @@
+import asyncio
+import io
+import json
+import time
+import uuid
+from collections import Counter
+from urllib.parse import urlsplit
+
+from core.benchmarks import percentile
+
+
+class HTTPClient:
+    """Minimal asyncio HTTP/1.1 client reusing its connection when allowed.
+
+    Only implements what the load test needs, so the harness runs without
+    extra dependencies.
+    """
+
+    def __init__(self, base_url: str):
+        url = urlsplit(base_url)
+        self.host = url.hostname
+        self.port = url.port or 80
+        self.reader = None
+        self.writer = None
+
+    async def close(self):
+        """Close the connection, if open."""
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+    async def request(self, method: str, path: str, body: bytes = b'',
+                      headers: dict = None):
+        """Send a request and return its status, headers and body."""
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(
+                self.host, self.port
+            )
+
+        lines = [f'{method} {path} HTTP/1.1', f'Host: {self.host}',
+                 f'Content-Length: {len(body)}']
+        lines += [f'{name}: {value}' for name, value in
+                  (headers or {}).items()]
+        self.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode() + body)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError('Connection closed by the server')
+        status = int(status_line.split()[1])
+        response_headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            response_headers[name.strip().lower()] = value.strip()
+
+        response_body = await self._read_body(response_headers)
+        if response_headers.get('connection', '').lower() == 'close':
+            await self.close()
+
+        return status, response_headers, response_body
+
+    async def _read_body(self, headers: dict) -> bytes:
+        """Read a body delimited by length, chunks or end of stream."""
+        if 'content-length' in headers:
+            return await self.reader.readexactly(
+                int(headers['content-length'])
+            )
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await self.reader.readline()).split(b';')[0], 16)
+                if size == 0:
+                    await self.reader.readline()
+                    return b''.join(chunks)
+                chunks.append(await self.reader.readexactly(size))
+                await self.reader.readline()
+
+        body = await self.reader.read()
+        await self.close()
+        return body
+
+
+class EndpointStats:
+    """Latencies and errors recorded for one endpoint."""
+
+    def __init__(self):
+        self.latencies = []
+        self.statuses = Counter()
+        self.errors = 0
+
+    def record(self, latency: float, status: int = None):
+        """Record one request, failed when it has no 2xx status."""
+        self.latencies.append(latency)
+        self.statuses[status or 'error'] += 1
+        if status is None or not 200 <= status < 300:
+            self.errors += 1
+
+    def summary(self, elapsed: float) -> dict:
+        """Return the throughput, latency percentiles and error rate."""
+        latencies = sorted(self.latencies)
+        count = len(latencies)
+        return {
+            'requests': count,
+            'errors': self.errors,
+            'error_rate': round(self.errors / count, 4) if count else 0,
+            'rps': round(count / elapsed, 2) if elapsed else 0,
+            'p50_ms': round(percentile(latencies, 0.5) * 1e3, 2),
+            'p95_ms': round(percentile(latencies, 0.95) * 1e3, 2),
+            'p99_ms': round(percentile(latencies, 0.99) * 1e3, 2),
+            'statuses': {str(key): value
+                         for key, value in self.statuses.items()},
+        }
+
+
+class ScenarioFailed(Exception):
+    """Raised when a step fails and the rest of the session depends on it."""
+
+
+class Session:
+    """One scripted user going through the API."""
+
+    def __init__(self, base_url: str, stats: dict, image: bytes):
+        self.client = HTTPClient(base_url)
+        self.stats = stats
+        self.image = image
+        self.token = None
+
+    async def call(self, label: str, method: str, path: str,
+                   data=None, body: bytes = b'', content_type: str = None):
+        """Send a request and record it under the endpoint label."""
+        headers = {'Accept': 'application/json'}
+        if data is not None:
+            body = json.dumps(data).encode()
+            content_type = 'application/json'
+        if content_type:
+            headers['Content-Type'] = content_type
+        if self.token:
+            headers['Authorization'] = f'Token {self.token}'
+
+        stats = self.stats.setdefault(label, EndpointStats())
+        start = time.perf_counter()
+        try:
+            status, _, response = await self.client.request(
+                method, path, body, headers
+            )
+        except (OSError, asyncio.IncompleteReadError, ValueError) as exc:
+            stats.record(time.perf_counter() - start)
+            await self.client.close()
+            raise ScenarioFailed(f'{label}: {exc}')
+        stats.record(time.perf_counter() - start, status)
+
+        if not 200 <= status < 300:
+            raise ScenarioFailed(f'{label}: HTTP {status}')
+
+        return json.loads(response) if response else None
+
+    async def run(self, email: str, recipes: int):
+        """Sign up, log in, create data, browse it and upload an image."""
+        password = 'loadtest123'
+        await self.call('POST /api/user/create/', 'POST',
+                        '/api/user/create/',
+                        {'email': email, 'password': password,
+                         'name': 'Load test'})
+        self.token = (await self.call(
+            'POST /api/user/token/', 'POST', '/api/user/token/',
+            {'email': email, 'password': password}
+        ))['token']
+
+        tag_ids = [
+            (await self.call('POST /api/recipe/tags/', 'POST',
+                             '/api/recipe/tags/', {'name': name}))['id']
+            for name in ('Vegan', 'Dessert')
+        ]
+        ingredient_ids = [
+            (await self.call('POST /api/recipe/ingredients/', 'POST',
+                             '/api/recipe/ingredients/',
+                             {'name': name}))['id']
+            for name in ('Flour', 'Sugar', 'Butter')
+        ]
+        recipe_ids = [
+            (await self.call(
+                'POST /api/recipe/recipes/', 'POST', '/api/recipe/recipes/',
+                {'title': f'Cake {i}', 'time_minutes': 30, 'price': '5.00',
+                 'tags': tag_ids[:i % 2 + 1], 'ingredients': ingredient_ids}
+            ))['id']
+            for i in range(recipes)
+        ]
+
+        await self.call('GET /api/recipe/recipes/', 'GET',
+                        '/api/recipe/recipes/')
+        await self.call('GET /api/recipe/recipes/?tags=', 'GET',
+                        f'/api/recipe/recipes/?tags={tag_ids[0]}')
+        await self.call('GET /api/recipe/tags/', 'GET', '/api/recipe/tags/')
+
+        if recipe_ids:
+            boundary = uuid.uuid4().hex
+            body = (
+                f'--{boundary}\r\nContent-Disposition: form-data; '
+                f'name="image"; filename="image.png"\r\n'
+                f'Content-Type: image/png\r\n\r\n'
+            ).encode() + self.image + f'\r\n--{boundary}--\r\n'.encode()
+            await self.call(
+                'POST /api/recipe/recipes/<id>/upload-image/', 'POST',
+                f'/api/recipe/recipes/{recipe_ids[0]}/upload-image/',
+                body=body,
+                content_type=f'multipart/form-data; boundary={boundary}'
+            )
+
+
+def sample_image() -> bytes:
+    """Return a small PNG to upload."""
+    from PIL import Image
+
+    output = io.BytesIO()
+    Image.new('RGB', (64, 64), (200, 120, 40)).save(output, format='PNG')
+    return output.getvalue()
+
+
+async def _run(base_url: str, users: int, concurrency: int, recipes: int):
+    """Run user sessions with at most `concurrency` of them at once."""
+    stats = {}
+    failures = []
+    image = sample_image()
+    run_id = uuid.uuid4().hex[:8]
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def session(index: int):
+        async with semaphore:
+            user = Session(base_url, stats, image)
+            try:
+                await user.run(f'load-{run_id}-{index}@example.com', recipes)
+            except ScenarioFailed as exc:
+                failures.append(str(exc))
+            finally:
+                await user.client.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(session(index) for index in range(users)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        'elapsed_s': round(elapsed, 3),
+        'sessions': users,
+        'failed_sessions': len(failures),
+        'endpoints': {label: endpoint.summary(elapsed)
+                      for label, endpoint in sorted(stats.items())},
+        'failures': failures[:20],
+    }
+
+
+def run(base_url: str, users: int, concurrency: int, recipes: int) -> dict:
+    """Replay the user scenario against a running server.
+
+    Args:
+        base_url (str): server root, e.g. http://127.0.0.1:8000.
+        users (int): number of scripted user sessions.
+        concurrency (int): sessions running at the same time.
+        recipes (int): recipes created by every user.
+
+    Returns:
+        dict: throughput, latency percentiles and errors per endpoint.
+    """
+    return asyncio.run(_run(base_url, users, concurrency, recipes))
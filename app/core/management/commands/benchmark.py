@@ -0,0 +1,80 @@
+import json
+from contextlib import ExitStack
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core import benchmarks, sharding
+
+
+class Command(BaseCommand):
+    """Django command to run the performance benchmark suite."""
+    help = ('Time serializers, querysets, authentication, throttling and '
+            'rendering over datasets of several sizes.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scenario',
+            action='append',
+            dest='scenarios',
+            choices=sorted(benchmarks.SCENARIOS),
+            help='Scenario to run, may be repeated. Defaults to all.'
+        )
+        parser.add_argument('--sizes', type=int, nargs='+',
+                            default=[10, 100, 1000])
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--output', help='Write the results as JSON.')
+        parser.add_argument('--baseline',
+                            help='Fail on regressions against this JSON.')
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help='Allowed p50 slowdown against the baseline.')
+
+    def handle(self, *args, **options):
+        names = options['scenarios'] or sorted(benchmarks.SCENARIOS)
+        results = {}
+
+        for size in options['sizes']:
+            # Datasets only live for the duration of the run.
+            with ExitStack() as stack:
+                for alias in sharding.shards():
+                    stack.enter_context(transaction.atomic(using=alias))
+                dataset = benchmarks.build_dataset(size)
+                stack.enter_context(sharding.using_shard(
+                    sharding.shard_for(dataset.user.pk)
+                ))
+                for name in names:
+                    operation = benchmarks.SCENARIOS[name](dataset)
+                    key = f'{name}[{size}]'
+                    results[key] = benchmarks.run(
+                        operation,
+                        options['iterations']
+                    )
+                    self.stdout.write(self._format(key, results[key]))
+                for alias in sharding.shards():
+                    transaction.set_rollback(True, using=alias)
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2, sort_keys=True)
+
+        if options['baseline']:
+            with open(options['baseline']) as baseline:
+                regressions = benchmarks.compare(
+                    results,
+                    json.load(baseline),
+                    options['threshold']
+                )
+            if regressions:
+                raise CommandError(
+                    'Performance regressions:\n' + '\n'.join(regressions)
+                )
+
+        self.stdout.write(self.style.SUCCESS('Benchmarks finished!'))
+
+    def _format(self, key: str, result: dict) -> str:
+        """Return a one line summary of a scenario result."""
+        return (
+            f'{key}: {result["ops_per_sec"]} ops/s, '
+            f'p50 {result["p50_ms"]}ms, p99 {result["p99_ms"]}ms, '
+            f'{result["queries"]} queries'
+        )
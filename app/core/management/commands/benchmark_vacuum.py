@@ -0,0 +1,37 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from core import benchmarks
+from core.models import Recipe
+
+
+class Command(BaseCommand):
+    """Django command to time the vacuum of the recipe tables."""
+    help = ('Update a fraction of the rows of the recipe and recipe link '
+            'tables, then time vacuuming them relation by relation.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dead-fraction', type=float, default=0.1,
+                            help='Fraction of the rows to update first.')
+        parser.add_argument('--output', help='Write the results as JSON.')
+
+    def handle(self, *args, **options):
+        results = {}
+        for model in (Recipe, Recipe.tags.through,
+                      Recipe.ingredients.through):
+            table = model._meta.db_table
+            results[table] = benchmarks.vacuum(table,
+                                               options['dead_fraction'])
+            self.stdout.write(
+                f'{table}: {results[table]["total_ms"]}ms in '
+                f'{results[table]["relations"]} relations, longest '
+                f'{results[table]["max_ms"]}ms, '
+                f'{results[table]["dead_rows"]} dead rows'
+            )
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2, sort_keys=True)
+
+        self.stdout.write(self.style.SUCCESS('Vacuum benchmark finished!'))
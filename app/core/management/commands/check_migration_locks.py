@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core import migration_locks
+
+
+class Command(BaseCommand):
+    """Django command to report the locks of the pending migrations."""
+    help = ('List the statements of the pending migrations that lock large '
+            'tables, with the traffic they block.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument('--min-rows', type=int, default=100000,
+                            help='Estimated rows from which a table is '
+                                 'large.')
+        parser.add_argument('--check', action='store_true',
+                            help='Fail when a statement blocks traffic.')
+
+    def handle(self, *args, **options):
+        findings = migration_locks.pending_findings(
+            connections[options['database']], options['min_rows']
+        )
+        blocking = 0
+        migration = None
+        for finding in findings:
+            if finding.migration != migration:
+                migration = finding.migration
+                self.stdout.write(migration)
+            if finding.table is None and finding.lock is None:
+                self.stdout.write(self.style.WARNING(
+                    f'  not analyzed: {finding.statement}'
+                ))
+                continue
+            if finding.table is None:
+                blocking += 1
+                self.stdout.write(self.style.ERROR(
+                    f'  needs a maintenance window: {finding.statement}'
+                ))
+                continue
+
+            summary = (f'  {finding.table} ({finding.rows} rows): '
+                       f'{finding.lock} lock')
+            if finding.long:
+                summary += ' held while it scans or rewrites the table'
+            if finding.guarded:
+                summary += ', under a lock timeout'
+            if migration_locks.is_blocking(finding):
+                blocking += 1
+                summary += (f', blocks '
+                            f'{migration_locks.BLOCKS[finding.lock]}')
+                summary = self.style.ERROR(summary)
+            self.stdout.write(summary)
+            self.stdout.write(f'    {finding.statement}')
+
+        if options['check'] and blocking:
+            raise CommandError(
+                f'{blocking} statements block traffic to large tables'
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{blocking} statements block traffic to large tables.'
+        ))
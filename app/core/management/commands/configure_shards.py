@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from core import sharding
+
+
+class Command(BaseCommand):
+    """Django command to make the shards allocate distinct ids."""
+    help = ('Restart the id sequences of the sharded tables so each shard '
+            'allocates its own ids. Run after adding a shard, while the '
+            'shards are not written to.')
+
+    def handle(self, *args, **options):
+        sharding.configure_sequences()
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(sharding.shards())} shards configured!'
+        ))
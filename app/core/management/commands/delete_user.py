@@ -0,0 +1,26 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.deletion import BATCH_SIZE, delete_user, wait_for_file_removal
+
+
+class Command(BaseCommand):
+    """Django command to delete a user and its data in batches."""
+    help = 'Delete a user with its recipes, tags and ingredients.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('email')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(email=options['email'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'User {options["email"]} does not exist.')
+
+        counts = delete_user(user, options['batch_size'])
+        wait_for_file_removal()
+
+        for model, count in counts.items():
+            self.stdout.write(f'{model}: {count}')
+        self.stdout.write(self.style.SUCCESS('User deleted!'))
@@ -0,0 +1,47 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from core import loadtest
+
+
+class Command(BaseCommand):
+    """Django command to replay scripted user sessions against a server."""
+    help = ('Sign up, log in, create tags, ingredients and recipes, filter '
+            'and upload images at a target concurrency, then report '
+            'throughput, latency and errors per endpoint. Raise the '
+            'THROTTLE_RATE_* settings of the target server first.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000')
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--concurrency', type=int, default=10)
+        parser.add_argument('--recipes', type=int, default=5,
+                            help='Recipes created by every user.')
+        parser.add_argument('--output', help='Write the report as JSON.')
+
+    def handle(self, *args, **options):
+        report = loadtest.run(
+            options['url'],
+            options['users'],
+            options['concurrency'],
+            options['recipes']
+        )
+
+        self.stdout.write(
+            f'{report["sessions"]} sessions in {report["elapsed_s"]}s, '
+            f'{report["failed_sessions"]} failed'
+        )
+        for label, summary in report['endpoints'].items():
+            self.stdout.write(
+                f'{label}: {summary["requests"]} requests, '
+                f'{summary["rps"]} req/s, p50 {summary["p50_ms"]}ms, '
+                f'p95 {summary["p95_ms"]}ms, p99 {summary["p99_ms"]}ms, '
+                f'{summary["error_rate"]:.1%} errors'
+            )
+        for failure in report['failures']:
+            self.stdout.write(self.style.WARNING(failure))
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2, sort_keys=True)
@@ -0,0 +1,32 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.resharding import BATCH_SIZE, move_user
+
+
+class Command(BaseCommand):
+    """Django command to move a user to another shard."""
+    help = ('Copy the tags, ingredients and recipes of a user to another '
+            'shard, switch the user over and delete the old rows.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('email')
+        parser.add_argument('shard', help='Database alias of the shard.')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(email=options['email'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'User {options["email"]} does not exist.')
+
+        try:
+            counts = move_user(user, options['shard'], options['batch_size'])
+        except (ValueError, RuntimeError) as error:
+            raise CommandError(str(error))
+
+        for model, count in counts.items():
+            self.stdout.write(f'{model}: {count}')
+        self.stdout.write(self.style.SUCCESS(
+            f'User moved to {options["shard"]}!'
+        ))
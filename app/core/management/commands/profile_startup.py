@@ -0,0 +1,67 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from core import coldstart
+
+
+class Command(BaseCommand):
+    """Django command to profile the cold start of the entry points."""
+    help = ('Time management commands and the first request of the WSGI '
+            'application in fresh interpreters, with their import times '
+            'by package.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--command',
+            action='append',
+            dest='commands',
+            help='Management command to time, may be repeated. Defaults '
+                 'to wait_for_db.'
+        )
+        parser.add_argument(
+            '--path',
+            action='append',
+            dest='paths',
+            help='Path of the first request to time, may be repeated. '
+                 'Defaults to the recipe list.'
+        )
+        parser.add_argument('--preload', action='store_true',
+                            help='Also time requests with PRELOAD_APP.')
+        parser.add_argument('--top', type=int, default=10,
+                            help='Number of packages reported.')
+        parser.add_argument('--output', help='Write the results as JSON.')
+
+    def handle(self, *args, **options):
+        runs = [(f'command {command}', 'command', command, {})
+                for command in options['commands'] or ['wait_for_db']]
+        for path in options['paths'] or ['/api/recipe/recipes/']:
+            runs.append((f'request {path}', 'request', path,
+                         {'PRELOAD_APP': '0'}))
+            if options['preload']:
+                runs.append((f'request {path} preloaded', 'request', path,
+                             {'PRELOAD_APP': '1'}))
+
+        results = {}
+        for key, entry_point, argument, env in runs:
+            results[key] = coldstart.profile(entry_point, argument,
+                                             options['top'], env)
+            self.stdout.write(self._format(key, results[key]))
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2, sort_keys=True)
+
+        self.stdout.write(self.style.SUCCESS('Profiling finished!'))
+
+    def _format(self, key: str, result: dict) -> str:
+        """Return a summary of a run, with its slowest packages."""
+        timings = ', '.join(
+            f'{name} {result[name]}ms'
+            for name in ('wall_ms', 'run_ms', 'boot_ms', 'first_request_ms')
+            if name in result
+        )
+        packages = ', '.join(f'{package} {ms}ms'
+                             for package, ms in result['packages'].items())
+        return (f'{key}: {timings}, {result["modules"]} modules imported '
+                f'in {result["import_ms"]}ms\n  {packages}')
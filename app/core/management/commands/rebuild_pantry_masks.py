@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import pantry, sharding
+
+
+class Command(BaseCommand):
+    """Django command to rebuild the cookable recipes index."""
+    help = 'Recompute the ingredient mask of every recipe.'
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        for alias in sharding.shards():
+            with sharding.using_shard(alias):
+                pantry.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Pantry masks rebuilt in {time.perf_counter() - start:.1f}s!'
+        ))
@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import sharding, similarity
+
+
+class Command(BaseCommand):
+    """Django command to rebuild the similar recipes index."""
+    help = 'Recompute the MinHash signature of every recipe.'
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        for alias in sharding.shards():
+            with sharding.using_shard(alias):
+                similarity.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Recipe signatures rebuilt in '
+            f'{time.perf_counter() - start:.1f}s!'
+        ))
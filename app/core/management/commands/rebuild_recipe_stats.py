@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core import sharding, stats
+
+
+class Command(BaseCommand):
+    """Django command to rebuild or check the recipe stats."""
+    help = ('Recompute the per user recipe stats from the recipes, or with '
+            '--check only report where they differ.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true')
+
+    def handle(self, *args, **options):
+        if options['check']:
+            mismatches = []
+            for alias in sharding.shards():
+                with sharding.using_shard(alias):
+                    mismatches.extend(stats.check())
+            for mismatch in mismatches:
+                self.stdout.write(mismatch)
+            if mismatches:
+                raise CommandError(
+                    f'{len(mismatches)} recipe stats differ from a recompute.'
+                )
+            self.stdout.write(self.style.SUCCESS('Recipe stats are valid!'))
+            return
+
+        for alias in sharding.shards():
+            with sharding.using_shard(alias), transaction.atomic(using=alias):
+                stats.rebuild()
+        self.stdout.write(self.style.SUCCESS('Recipe stats rebuilt!'))
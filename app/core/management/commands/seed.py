@@ -0,0 +1,47 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.seeding import Seeder
+
+
+class Command(BaseCommand):
+    """Django command to fill the database with synthetic recipes."""
+    help = ('Generate users, tags, ingredients, recipes and their links '
+            'deterministically from a seed.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--recipes-per-user', type=int, default=50)
+        parser.add_argument('--tags-per-user', type=int, default=20)
+        parser.add_argument('--ingredients-per-user', type=int, default=100)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        seeder = Seeder(
+            seed=options['seed'],
+            tags_per_user=options['tags_per_user'],
+            ingredients_per_user=options['ingredients_per_user'],
+            batch_size=options['batch_size']
+        )
+        if get_user_model().objects.filter(email=seeder.email(0)).exists():
+            raise CommandError(
+                f'The database is already seeded with seed {seeder.seed}.'
+            )
+
+        start = time.perf_counter()
+        counts = seeder.seed_users(
+            options['users'],
+            options['recipes_per_user']
+        )
+        elapsed = time.perf_counter() - start
+
+        for table, count in counts.items():
+            self.stdout.write(f'{table}: {count}')
+        rows = sum(counts.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {rows} rows in {elapsed:.1f}s '
+            f'({rows / elapsed * 60:.0f} rows per minute).'
+        ))
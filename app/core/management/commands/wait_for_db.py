@@ -6,6 +6,10 @@ from django.core.management.base import BaseCommand
 
 class Command(BaseCommand):
     """Django command to pause execution until database is available."""
+    # The checks import every URLconf, view and model field library, and
+    # run again in the command started once the database is up.
+    requires_system_checks = False
+
     def handle(self, *args, **options):
         self.stdout.write('Waiting for database...')
         db_conn = None
@@ -0,0 +1,216 @@
+import hashlib
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, \
+    HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date
+
+from core import sharding
+from core.models import Recipe
+from recipe.renditions import source_hash
+
+
+RECIPE_IMAGE_PREFIX = 'uploads/recipe/'
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+# Renditions are named <recipe id>/<source hash>-<w>x<h>.<format>.
+RENDITION_RE = re.compile(
+    r'^(?P<recipe>\d+)/(?P<source>[0-9a-f]{16})-\d+x\d+\.\w+$'
+)
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+
+class FileRange:
+    """File object reading only a byte range of a file.
+
+    `fileno()` is exposed with the file positioned at the start of the
+    range, so WSGI servers with a sendfile() based `wsgi.file_wrapper`
+    (such as gunicorn) send the range without copying it through Python.
+    """
+
+    def __init__(self, file, start: int, length: int):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size: int = -1) -> bytes:
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self) -> int:
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def can_access(request, name: str) -> bool:
+    """Tell whether a request may download a media file.
+
+    Recipe images and their renditions are public, but only while a
+    recipe uses the image. Other files are not served.
+    """
+    if name.startswith(RECIPE_IMAGE_PREFIX):
+        return sharding.exists(Recipe.objects.filter(image=name))
+
+    prefix = _rendition_prefix()
+    match = prefix and name.startswith(prefix) and \
+        RENDITION_RE.match(name[len(prefix):])
+    if match:
+        # Shards may reuse recipe ids, so every recipe with the id is
+        # checked for the source image.
+        return any(
+            image and source_hash(image) == match.group('source')
+            for alias in sharding.shards()
+            for image in Recipe.objects.using(alias).filter(
+                pk=match.group('recipe')
+            ).values_list('image', flat=True)
+        )
+
+    return False
+
+
+def _rendition_prefix():
+    """Return the media name prefix of renditions, or None when they are
+    stored outside the media root."""
+    prefix = os.path.relpath(settings.IMAGE_RENDITION_ROOT,
+                             settings.MEDIA_ROOT).replace(os.sep, '/')
+    if prefix == '..' or prefix.startswith('../'):
+        return None
+    return f'{prefix}/'
+
+
+def is_immutable(name: str) -> bool:
+    """Tell whether a media file is never rewritten under its name."""
+    # Uploads are named after a random UUID when saved.
+    return name.startswith(RECIPE_IMAGE_PREFIX)
+
+
+def file_etag(name: str, stat) -> str:
+    """Return a strong ETag for a media file."""
+    digest = hashlib.sha256(
+        f'{name}:{stat.st_size}:{stat.st_mtime_ns}'.encode()
+    ).hexdigest()[:32]
+    return f'"{digest}"'
+
+
+def parse_range(header: str, size: int):
+    """Return the (start, length) of a single byte range header.
+
+    Returns None when the header is malformed or asks for several
+    ranges, in which case the whole file is sent, and raises ValueError
+    when the range cannot be satisfied.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+
+    first, last = match.groups()
+    if not first:
+        length = min(int(last), size)
+        if not length:
+            raise ValueError(header)
+        return size - length, length
+
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError(header)
+
+    return start, end - start + 1
+
+
+def _sendfile_response(name: str, path: str) -> HttpResponse:
+    """Return an empty response telling the web server to send a file."""
+    response = HttpResponse()
+    if settings.MEDIA_SENDFILE == 'x-accel-redirect':
+        response['X-Accel-Redirect'] = (
+            settings.MEDIA_SENDFILE_PREFIX + name
+        )
+    else:
+        response['X-Sendfile'] = path
+    # Let the web server set the type from the file.
+    del response['Content-Type']
+
+    return response
+
+
+def _file_response(request, path: str, stat, etag: str):
+    """Return a response streaming the file, or the requested range."""
+    content_type = mimetypes.guess_type(path)[0] or \
+        'application/octet-stream'
+    header = request.META.get('HTTP_RANGE')
+    if_range = request.META.get('HTTP_IF_RANGE')
+    byte_range = None
+    if header and (if_range is None or if_range == etag):
+        try:
+            byte_range = parse_range(header, stat.st_size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+            return response
+
+    file = open(path, 'rb')
+    if byte_range is None:
+        response = FileResponse(file, content_type=content_type)
+    else:
+        start, length = byte_range
+        response = FileResponse(FileRange(file, start, length),
+                                status=206, content_type=content_type)
+        response['Content-Length'] = length
+        response['Content-Range'] = \
+            f'bytes {start}-{start + length - 1}/{stat.st_size}'
+    response['Accept-Ranges'] = 'bytes'
+
+    return response
+
+
+def serve(request, path: str):
+    """Serve a media file once the request is allowed to read it.
+
+    With MEDIA_SENDFILE set, the bytes are sent by the web server in
+    front of Django through X-Accel-Redirect (nginx) or X-Sendfile
+    (Apache, lighttpd). Otherwise the file is streamed with support for
+    single byte ranges.
+    """
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    name = os.path.relpath(full_path, settings.MEDIA_ROOT).replace(
+        os.sep, '/'
+    )
+    if not can_access(request, name):
+        raise Http404
+    try:
+        stat = os.stat(full_path)
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+
+    etag = file_etag(name, stat)
+    if request.META.get('HTTP_IF_NONE_MATCH') == etag:
+        response = HttpResponseNotModified()
+    elif settings.MEDIA_SENDFILE:
+        response = _sendfile_response(name, full_path)
+    else:
+        response = _file_response(request, full_path, stat, etag)
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    if is_immutable(name):
+        patch_cache_control(response, public=True, immutable=True,
+                            max_age=IMMUTABLE_MAX_AGE)
+    else:
+        patch_cache_control(response, public=True, no_cache=True)
+
+    return response
@@ -0,0 +1,116 @@
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+
+logger = logging.getLogger(__name__)
+
+
+class RequestTimings:
+    """Query count and timings collected while serving a request.
+
+    Instances are installed as a database execute wrapper, so every
+    query run during the request is counted and timed.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.view = None
+        self.action = None
+        self.view_start = None
+        self.view_db_time = 0.0
+        self.view_time = None
+        self.render_start = None
+        self.render_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+
+    def start_view(self, view: str, action: str):
+        """Mark the start of the view."""
+        self.view = view
+        self.action = action
+        self.view_db_time = self.db_time
+        self.view_start = time.perf_counter()
+
+    def start_render(self, response):
+        """Mark the end of the view and the start of rendering."""
+        self.render_start = time.perf_counter()
+        if self.view_start is not None:
+            self.view_time = self.render_start - self.view_start
+            self.view_db_time = self.db_time - self.view_db_time
+
+    def end_render(self, response):
+        """Mark the end of rendering."""
+        self.render_time = time.perf_counter() - self.render_start
+
+    @property
+    def serialize_time(self) -> float:
+        """Return the time spent in the view outside of SQL queries."""
+        if self.view_time is None:
+            return 0.0
+
+        return max(self.view_time - self.view_db_time, 0.0)
+
+
+class ServerTimingMiddleware:
+    """Report SQL, serialization and rendering time of every request.
+
+    Timings are exposed in a ``Server-Timing`` header and logged, tagged
+    with the view and action serving the request. Enabled by the
+    REQUEST_TIMING setting.
+    """
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_TIMING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = request.timings = RequestTimings()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timings))
+            response = self.get_response(request)
+        total_time = time.perf_counter() - timings.start
+
+        response['Server-Timing'] = ', '.join((
+            f'db;dur={timings.db_time * 1e3:.2f};'
+            f'desc="{timings.queries} queries"',
+            f'serialize;dur={timings.serialize_time * 1e3:.2f}',
+            f'render;dur={timings.render_time * 1e3:.2f}',
+            f'total;dur={total_time * 1e3:.2f}',
+        ))
+        logger.info(
+            'view=%s action=%s method=%s status=%s queries=%d db_ms=%.2f '
+            'serialize_ms=%.2f render_ms=%.2f total_ms=%.2f',
+            timings.view, timings.action, request.method,
+            response.status_code, timings.queries, timings.db_time * 1e3,
+            timings.serialize_time * 1e3, timings.render_time * 1e3,
+            total_time * 1e3
+        )
+
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'cls', None)
+        view = view_class.__name__ if view_class else view_func.__name__
+        method = request.method.lower()
+        actions = getattr(view_func, 'actions', None) or {}
+        request.timings.start_view(view, actions.get(method, method))
+
+    def process_template_response(self, request, response):
+        request.timings.start_render(response)
+        response.add_post_render_callback(request.timings.end_render)
+        return response
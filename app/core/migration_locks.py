@@ -0,0 +1,136 @@
+import re
+from collections import namedtuple
+
+from django.db.migrations.executor import MigrationExecutor
+
+from core import partitioning
+
+
+# What each table lock blocks: only ACCESS EXCLUSIVE conflicts with the
+# ACCESS SHARE lock of reads, and these four with the ROW EXCLUSIVE lock
+# of writes.
+BLOCKS = {
+    'ACCESS EXCLUSIVE': 'reads and writes',
+    'EXCLUSIVE': 'writes',
+    'SHARE ROW EXCLUSIVE': 'writes',
+    'SHARE': 'writes',
+}
+
+_TABLE = r'(?:ONLY )?"?(?P<table>\w+)"?'
+# The lock each kind of statement takes, and whether it is held for a
+# time growing with the table, to scan, rewrite or update it. The first
+# matching rule applies.
+RULES = [
+    (rf'CREATE (UNIQUE )?INDEX CONCURRENTLY .*? ON {_TABLE}',
+     'SHARE UPDATE EXCLUSIVE', True),
+    (rf'CREATE (UNIQUE )?INDEX .*? ON {_TABLE}', 'SHARE', True),
+    (rf'ALTER TABLE {_TABLE} .*\bVALIDATE CONSTRAINT\b',
+     'SHARE UPDATE EXCLUSIVE', True),
+    (rf'ALTER TABLE {_TABLE} .*\bNOT VALID\b', 'ACCESS EXCLUSIVE', False),
+    (rf'ALTER TABLE {_TABLE} .*\bUSING INDEX\b', 'ACCESS EXCLUSIVE', False),
+    (rf'ALTER TABLE {_TABLE} .*\bFOREIGN KEY\b', 'SHARE ROW EXCLUSIVE',
+     True),
+    (rf'ALTER TABLE {_TABLE} .*\b(TYPE|SET NOT NULL|ADD CONSTRAINT|'
+     rf'PRIMARY KEY|UNIQUE)\b', 'ACCESS EXCLUSIVE', True),
+    (rf'ALTER TABLE {_TABLE}', 'ACCESS EXCLUSIVE', False),
+    (rf'DROP TABLE (IF EXISTS )?{_TABLE}', 'ACCESS EXCLUSIVE', False),
+    (rf'(UPDATE|DELETE FROM) {_TABLE}', 'ROW EXCLUSIVE', True),
+]
+RULES = [(re.compile(pattern, re.IGNORECASE | re.DOTALL), lock, long)
+         for pattern, lock, long in RULES]
+LOCK_TIMEOUT_SET = re.compile(
+    r"SET (LOCAL )?lock_timeout\s*(=|TO)\s*(?!DEFAULT)", re.IGNORECASE
+)
+LOCK_TIMEOUT_RESET = re.compile(
+    r"(SET (LOCAL )?lock_timeout\s*(=|TO)\s*DEFAULT|RESET lock_timeout)",
+    re.IGNORECASE
+)
+NOT_SQL = '-- MIGRATION NOW PERFORMS OPERATION THAT CANNOT BE WRITTEN AS SQL:'
+
+Finding = namedtuple('Finding', ('migration', 'statement', 'table', 'rows',
+                                 'lock', 'long', 'guarded'))
+
+
+def statement_lock(statement: str):
+    """Return the table, lock and duration of a statement, or None."""
+    for pattern, lock, long in RULES:
+        match = pattern.match(statement.lstrip())
+        if match:
+            return match.group('table'), lock, long
+
+    return None
+
+
+def is_blocking(finding: Finding) -> bool:
+    """Tell whether a finding holds a lock blocking the traffic for long.
+
+    Short locks are fine when a lock timeout bounds how long the
+    statement can queue the traffic behind it.
+    """
+    return finding.lock in BLOCKS and (finding.long or not finding.guarded)
+
+
+def _statement_findings(label: str, statements, rows) -> list:
+    """Return the findings of the statements of a migration."""
+    findings = []
+    guarded = False
+    statements = iter(statements)
+    for statement in statements:
+        if statement == NOT_SQL:
+            findings.append(Finding(label, next(statements)[3:], None, None,
+                                    None, None, False))
+        elif LOCK_TIMEOUT_RESET.match(statement):
+            guarded = False
+        elif LOCK_TIMEOUT_SET.match(statement):
+            guarded = True
+        elif not statement.startswith('--'):
+            lock = statement_lock(statement)
+            if lock:
+                table, lock, long = lock
+                findings.append(Finding(label, statement, table,
+                                        rows(table), lock, long, guarded))
+
+    return findings
+
+
+def pending_findings(connection, min_rows: int) -> list:
+    """Return the statements of the pending migrations locking large
+    tables, and the operations that cannot be analyzed.
+
+    Args:
+        connection: connection of the database to migrate.
+        min_rows (int): estimated rows from which a table is large.
+
+    Returns:
+        list: Finding of each statement, in migration order. Migrations
+        needing a maintenance window get a first finding without a table,
+        holding the reason.
+    """
+    executor = MigrationExecutor(connection)
+    plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+    estimates = {}
+    findings = []
+
+    with connection.cursor() as cursor:
+        def rows(table):
+            if table not in estimates:
+                estimates[table] = partitioning.estimate_rows(cursor, table)
+            return estimates[table]
+
+        for migration, backwards in plan:
+            label = f'{migration.app_label}.{migration.name}'
+            # Migrations locking tables for long whatever their size set
+            # maintenance_window to the reason.
+            reason = getattr(migration, 'maintenance_window', None)
+            if reason:
+                findings.append(Finding(label, reason, None, None,
+                                        'ACCESS EXCLUSIVE', True, False))
+            statements = executor.collect_sql([(migration, backwards)])
+            findings.extend(
+                finding for finding in _statement_findings(
+                    label, statements, rows
+                )
+                if finding.table is None or finding.rows >= min_rows
+            )
+
+    return findings
@@ -0,0 +1,42 @@
+# Generated by Django 2.1.15 on 2026-10-19 08:44
+
+import core.models
+from django.db import migrations, models
+
+
+# The indexes AlterField creates for db_index, under the same names, built
+# concurrently so writes to core_recipe go on meanwhile. Indexes left
+# invalid by an interrupted build are dropped first.
+INDEXES = (
+    ('core_recipe_image_38a95112', '("image")'),
+    ('core_recipe_image_38a95112_like', '("image" varchar_pattern_ops)'),
+)
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('core', '0005_recipe_image'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    [f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"',
+                     f'CREATE INDEX CONCURRENTLY "{name}" '
+                     f'ON "core_recipe" {columns}'],
+                    f'DROP INDEX CONCURRENTLY "{name}"'
+                )
+                for name, columns in INDEXES
+            ],
+            state_operations=[
+                migrations.AlterField(
+                    model_name='recipe',
+                    name='image',
+                    field=models.ImageField(db_index=True, null=True, upload_to=core.models.recipe_image_file_path),
+                ),
+            ],
+        ),
+    ]
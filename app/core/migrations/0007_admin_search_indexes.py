@@ -0,0 +1,30 @@
+from django.db import migrations
+
+
+# Indexes for the case insensitive prefix searches of the admin, which
+# filter on UPPER(column) LIKE 'TERM%'. They are built concurrently, so
+# writes to the tables go on meanwhile. An index left invalid by an
+# interrupted build is dropped first.
+INDEXES = (
+    ('core_recipe', 'title'),
+    ('core_tag', 'name'),
+    ('core_ingredient', 'name'),
+)
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('core', '0006_recipe_image_index'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            [f'DROP INDEX CONCURRENTLY IF EXISTS {table}_{column}_upper_like',
+             f'CREATE INDEX CONCURRENTLY {table}_{column}_upper_like '
+             f'ON {table} (UPPER({column}) varchar_pattern_ops)'],
+            f'DROP INDEX CONCURRENTLY {table}_{column}_upper_like'
+        )
+        for table, column in INDEXES
+    ]
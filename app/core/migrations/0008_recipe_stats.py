@@ -0,0 +1,74 @@
+# Generated by Django 2.1.15 on 2026-10-19 08:50
+
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# The stats as computed by core.stats when this migration was written.
+STATS_SQL = '''
+    INSERT INTO core_recipestats (user_id, recipe_count, time_minutes_total,
+                                  price_total)
+    SELECT user_id, COUNT(*), SUM(time_minutes), SUM(price)
+    FROM core_recipe
+    GROUP BY user_id
+'''
+
+BUCKETS_SQL = '''
+    INSERT INTO core_recipestatsbucket (user_id, dimension, key, count)
+    SELECT user_id, 'price', width_bucket(price, %s::numeric[]), COUNT(*)
+    FROM core_recipe
+    GROUP BY 1, 3
+    UNION ALL
+    SELECT r.user_id, 'tag', l.tag_id, COUNT(*)
+    FROM core_recipe_tags l JOIN core_recipe r ON r.id = l.recipe_id
+    GROUP BY 1, 3
+    UNION ALL
+    SELECT r.user_id, 'ingredient', l.ingredient_id, COUNT(*)
+    FROM core_recipe_ingredients l JOIN core_recipe r ON r.id = l.recipe_id
+    GROUP BY 1, 3
+'''
+
+
+def build_stats(apps, schema_editor):
+    """Compute the stats of the existing recipes."""
+    bounds = [Decimal(bound) for bound in settings.STATS_PRICE_BUCKETS]
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(STATS_SQL)
+        cursor.execute(BUCKETS_SQL, [bounds])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_admin_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='recipe_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('recipe_count', models.IntegerField(default=0)),
+                ('time_minutes_total', models.BigIntegerField(default=0)),
+                ('price_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RecipeStatsBucket',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(choices=[('price', 'Price'), ('tag', 'Tag'), ('ingredient', 'Ingredient')], max_length=10)),
+                ('key', models.IntegerField()),
+                ('count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='recipestatsbucket',
+            unique_together={('user', 'dimension', 'key')},
+        ),
+        migrations.RunPython(build_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 2.1.15 on 2026-10-19 08:53
+
+import random
+
+from django.conf import settings
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+PRIME = 2 ** 31 - 1
+
+# The signatures as computed by core.similarity when this migration was
+# written, see it for the details.
+SIGNATURES_SQL = '''
+    WITH signatures AS (
+        SELECT recipe_id, array_agg(minhash ORDER BY position) AS minhashes
+        FROM (
+            SELECT l.recipe_id, h.position,
+                   MIN((h.a * l.ingredient_id + h.b) %% {prime}) AS minhash
+            FROM core_recipe_ingredients l,
+                 unnest(%s::bigint[], %s::bigint[])
+                     WITH ORDINALITY AS h (a, b, position)
+            GROUP BY l.recipe_id, h.position
+        ) m
+        GROUP BY recipe_id
+    )
+    INSERT INTO core_recipesignature (recipe_id, minhashes, bands)
+    SELECT recipe_id, minhashes, ARRAY(
+        SELECT ('x' || substr(md5(
+            band || ':' || array_to_string(
+                minhashes[band * {rows} + 1:(band + 1) * {rows}], ','
+            )
+        ), 1, 16))::bit(64)::bigint
+        FROM generate_series(0, {bands} - 1) AS band
+        ORDER BY band
+    )
+    FROM signatures
+'''
+
+
+def build_signatures(apps, schema_editor):
+    """Compute the signatures of the existing recipes."""
+    rand = random.Random(settings.MINHASH_SEED)
+    functions = [(rand.randrange(1, PRIME), rand.randrange(PRIME))
+                 for _ in range(settings.MINHASH_PERMUTATIONS)]
+    sql = SIGNATURES_SQL.format(
+        prime=PRIME, bands=settings.MINHASH_BANDS,
+        rows=settings.MINHASH_PERMUTATIONS // settings.MINHASH_BANDS
+    )
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(sql, [[a for a, _ in functions],
+                             [b for _, b in functions]])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_recipe_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeSignature',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='signature', serialize=False, to='core.Recipe')),
+                ('minhashes', django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), size=None)),
+                ('bands', django.contrib.postgres.fields.ArrayField(base_field=models.BigIntegerField(), size=None)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='recipesignature',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['bands'], name='core_recipe_bands_67cde2_gin'),
+        ),
+        migrations.RunPython(build_signatures, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,93 @@
+# Generated by Django 2.1.15 on 2026-10-19 09:02
+
+import core.fields
+import core.operations
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# The positions and masks as computed by core.pantry when this migration
+# was written: positions number the ingredients of each user from 0, in
+# creation order.
+POSITIONS_SQL = '''
+    UPDATE core_ingredient i SET position = n.position
+    FROM (
+        SELECT id, row_number() OVER (
+            PARTITION BY user_id ORDER BY id
+        ) - 1 AS position
+        FROM core_ingredient
+    ) n
+    WHERE i.id = n.id
+'''
+
+MASKS_SQL = '''
+    INSERT INTO core_recipeingredientmask (recipe_id, mask)
+    SELECT recipe_id, bit_or(bits)
+    FROM (
+        SELECT l.recipe_id, overlay(
+            repeat('0', MAX(i.position) OVER w + 1)
+            PLACING '1' FROM i.position + 1
+        )::varbit AS bits
+        FROM core_recipe_ingredients l
+        JOIN core_ingredient i ON i.id = l.ingredient_id
+        WINDOW w AS (PARTITION BY l.recipe_id)
+    ) b
+    GROUP BY recipe_id
+'''
+
+# The unique constraint of (user, position) is added from an index built
+# concurrently, so only attaching it locks core_ingredient.
+UNIQUE_NAME = 'core_ingredient_user_id_position_d010c3a8_uniq'
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('core', '0009_recipe_signature'),
+    ]
+
+    operations = [
+        core.operations.LockTimeoutRetry(
+            migrations.CreateModel(
+                name='RecipeIngredientMask',
+                fields=[
+                    ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ingredient_mask', serialize=False, to='core.Recipe')),
+                    ('mask', core.fields.BitStringField()),
+                ],
+            ),
+        ),
+        core.operations.LockTimeoutRetry(
+            migrations.AddField(
+                model_name='ingredient',
+                name='position',
+                field=models.IntegerField(editable=False, null=True),
+            ),
+        ),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    [f'DROP INDEX CONCURRENTLY IF EXISTS "{UNIQUE_NAME}"',
+                     f'CREATE UNIQUE INDEX CONCURRENTLY "{UNIQUE_NAME}" '
+                     f'ON "core_ingredient" ("user_id", "position")'],
+                    f'DROP INDEX CONCURRENTLY IF EXISTS "{UNIQUE_NAME}"'
+                ),
+                core.operations.LockTimeoutRetry(
+                    migrations.RunSQL(
+                        f'ALTER TABLE "core_ingredient" ADD CONSTRAINT '
+                        f'"{UNIQUE_NAME}" UNIQUE USING INDEX "{UNIQUE_NAME}"',
+                        f'ALTER TABLE "core_ingredient" DROP CONSTRAINT '
+                        f'"{UNIQUE_NAME}"'
+                    ),
+                ),
+            ],
+            state_operations=[
+                migrations.AlterUniqueTogether(
+                    name='ingredient',
+                    unique_together={('user', 'position')},
+                ),
+            ],
+        ),
+        migrations.RunSQL([POSITIONS_SQL, MASKS_SQL],
+                          migrations.RunSQL.noop),
+    ]
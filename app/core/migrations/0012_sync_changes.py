@@ -0,0 +1,55 @@
+# Generated by Django 2.1.15 on 2026-10-19 09:06
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# Every existing object is recorded, for clients syncing from scratch,
+# as core.sync did when this migration was written.
+RECORD_SQL = '''
+    INSERT INTO core_syncchange (user_id, kind, object_id, sequence, deleted)
+    SELECT user_id, '{kind}', id, nextval('core_syncchange_sequence'), FALSE
+    FROM (SELECT user_id, id FROM {table} ORDER BY id) o
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_recipe_list_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncChange',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('recipe', 'Recipe'), ('tag', 'Tag'), ('ingredient', 'Ingredient')], max_length=10)),
+                ('object_id', models.IntegerField()),
+                ('sequence', models.BigIntegerField()),
+                ('deleted', models.BooleanField(default=False)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='syncchange',
+            index=models.Index(fields=['user', 'sequence'], name='core_syncch_user_id_634b12_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='syncchange',
+            unique_together={('kind', 'object_id')},
+        ),
+        migrations.RunSQL(
+            'CREATE SEQUENCE core_syncchange_sequence',
+            'DROP SEQUENCE core_syncchange_sequence'
+        ),
+        migrations.RunSQL(
+            [RECORD_SQL.format(kind=kind, table=table) for kind, table in (
+                ('recipe', 'core_recipe'),
+                ('tag', 'core_tag'),
+                ('ingredient', 'core_ingredient'),
+            )],
+            migrations.RunSQL.noop
+        ),
+    ]
@@ -0,0 +1,150 @@
+# Generated by Django 2.1.15 on 2026-10-19 09:29
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+PARTITIONS = 16
+# Unique constraints of partitioned tables must include the partition
+# key. The links are split by recipe: the auto-created through tables
+# have no user column, and recipe_id is what the ORM filters them on.
+TABLES = (
+    ('core_recipe', 'user_id'),
+    ('core_recipe_tags', 'recipe_id'),
+    ('core_recipe_ingredients', 'recipe_id'),
+)
+FK_SUFFIX = '_fk_%(to_table)s_%(to_column)s'
+# Hash partitioning and primary keys on partitioned tables.
+MIN_SERVER_VERSION = 110000
+
+# The table rebuild of core.partitioning when this migration was
+# written.
+INDEXES_SQL = '''
+    SELECT pg_get_indexdef(i.indexrelid)
+    FROM pg_index i
+    WHERE i.indrelid = %s::regclass AND NOT EXISTS (
+        SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid
+    )
+'''
+
+CONSTRAINTS_SQL = '''
+    SELECT conname, pg_get_constraintdef(oid)
+    FROM pg_constraint
+    WHERE conrelid = %s::regclass AND contype IN ('c', 'f', 'u')
+    ORDER BY conname
+'''
+
+REFERENCES_SQL = '''
+    SELECT conrelid::regclass, conname
+    FROM pg_constraint
+    WHERE confrelid = %s::regclass AND contype = 'f'
+'''
+
+PARTITIONS_SQL = '''
+    SELECT count(*) FROM pg_inherits WHERE inhparent = %s::regclass
+'''
+
+
+def rebuild_table(cursor, table, partition_by, primary_key, partitions):
+    """Replace a table by a copy with the same rows, columns, indexes and
+    constraints, partitioned or not.
+
+    Foreign keys referencing the table are dropped: a partitioned table
+    has no unique constraint on the id alone for them to reference.
+    """
+    cursor.execute(INDEXES_SQL, [table])
+    # Indexes of partitioned tables are defined ON ONLY the parent.
+    indexes = [row[0].replace(' ON ONLY ', ' ON ', 1)
+               for row in cursor.fetchall()]
+    cursor.execute(CONSTRAINTS_SQL, [table])
+    constraints = cursor.fetchall()
+    cursor.execute(REFERENCES_SQL, [table])
+    for referencing, name in cursor.fetchall():
+        cursor.execute(f'ALTER TABLE {referencing} DROP CONSTRAINT {name}')
+    cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [table])
+    sequence = cursor.fetchone()[0]
+
+    new_table = f'{table}_new'
+    cursor.execute(f'CREATE TABLE {new_table} (LIKE {table} INCLUDING '
+                   f'DEFAULTS) {partition_by}')
+    for name, bounds in partitions:
+        cursor.execute(f'CREATE TABLE {name} PARTITION OF {new_table} '
+                       f'{bounds}')
+    cursor.execute(f'INSERT INTO {new_table} SELECT * FROM {table}')
+    if sequence:
+        cursor.execute(f'ALTER SEQUENCE {sequence} OWNED BY {new_table}.id')
+    cursor.execute(f'DROP TABLE {table}')
+    cursor.execute(f'ALTER TABLE {new_table} RENAME TO {table}')
+    cursor.execute(f'ALTER TABLE {table} ADD CONSTRAINT {table}_pkey '
+                   f'PRIMARY KEY ({", ".join(primary_key)})')
+    for name, definition in constraints:
+        cursor.execute(f'ALTER TABLE {table} ADD CONSTRAINT {name} '
+                       f'{definition}')
+    for definition in indexes:
+        cursor.execute(definition)
+    cursor.execute(f'ANALYZE {table}')
+
+
+def partition_tables(apps, schema_editor):
+    """Hash partition the recipes and their links, rows included.
+
+    The primary keys become (id, key). Servers without hash partitioning
+    keep plain tables, which the ORM uses the same way.
+    """
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql' or \
+            connection.pg_version < MIN_SERVER_VERSION:
+        return
+    with connection.cursor() as cursor:
+        for table, key in TABLES:
+            rebuild_table(
+                cursor, table, f'PARTITION BY HASH ({key})', ('id', key),
+                [(f'{table}_p{remainder}',
+                  f'FOR VALUES WITH (MODULUS {PARTITIONS}, '
+                  f'REMAINDER {remainder})')
+                 for remainder in range(PARTITIONS)]
+            )
+
+
+def unpartition_tables(apps, schema_editor):
+    """Restore plain tables, with the foreign keys of the links."""
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(PARTITIONS_SQL, ['core_recipe'])
+        if not cursor.fetchone()[0]:
+            return
+        for table, _ in reversed(TABLES):
+            rebuild_table(cursor, table, '', ('id',), [])
+
+    recipe = apps.get_model('core', 'Recipe')
+    for name in ('tags', 'ingredients'):
+        through = recipe._meta.get_field(name).remote_field.through
+        schema_editor.execute(schema_editor._create_fk_sql(
+            through, through._meta.get_field('recipe'), FK_SUFFIX
+        ))
+
+
+class Migration(migrations.Migration):
+    # Listed by check_migration_locks: writes made during the copy would
+    # be lost, and the swap blocks every query on the tables.
+    maintenance_window = (
+        'copies core_recipe and its links into partitioned tables, stop '
+        'writes to them first'
+    )
+
+    dependencies = [
+        ('core', '0013_user_shards'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipeingredientmask',
+            name='recipe',
+            field=models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ingredient_mask', serialize=False, to='core.Recipe'),
+        ),
+        migrations.AlterField(
+            model_name='recipesignature',
+            name='recipe',
+            field=models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='signature', serialize=False, to='core.Recipe'),
+        ),
+        migrations.RunPython(partition_tables, unpartition_tables),
+    ]
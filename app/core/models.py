@@ -1,11 +1,15 @@
 import uuid
 import os
 
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, \
                                         PermissionsMixin
 from django.conf import settings
 
+from core.fields import BitStringField
+
 
 def recipe_image_file_path(instance, file_name):
     """Generate file path for new recipe image."""
@@ -15,6 +19,19 @@ def recipe_image_file_path(instance, file_name):
     return os.path.join('uploads/recipe/', file_name)
 
 
+class ShardedQuerySet(models.QuerySet):
+    """Queryset of rows living on the shard of their user."""
+
+    def create(self, **kwargs):
+        """Create an object on the shard of its user, or on the database
+        chosen with using().
+        """
+        obj = self.model(**kwargs)
+        self._for_write = True
+        obj.save(force_insert=True, using=self._db)
+        return obj
+
+
 class UserManager(BaseUserManager):
 
     def create_user(self, email: str, password: str = None, **extra_fields):
@@ -72,24 +89,41 @@ class Tag(models.Model):
         on_delete=models.CASCADE,
     )
 
+    objects = ShardedQuerySet.as_manager()
+
     def __str__(self):
         return self.name
 
 
 class Ingredient(models.Model):
-    """Ingredient to be used in a recipe."""
+    """Ingredient to be used in a recipe.
+
+    `position` is the bit of the ingredient in the pantry masks of its
+    user, assigned by core.pantry.
+    """
     name = models.CharField(max_length=255)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
     )
+    position = models.IntegerField(null=True, editable=False)
+
+    objects = ShardedQuerySet.as_manager()
+
+    class Meta:
+        unique_together = ('user', 'position')
 
     def __str__(self):
         return self.name
 
 
 class Recipe(models.Model):
-    """Recipe object."""
+    """Recipe object.
+
+    The table is hash partitioned by user, and the tag and ingredient
+    links by recipe, see migration 0014. No foreign key constraint can
+    reference recipes: Django cascades their deletion.
+    """
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
@@ -100,7 +134,144 @@ class Recipe(models.Model):
     link = models.CharField(max_length=255, blank=True)
     ingredients = models.ManyToManyField('Ingredient')
     tags = models.ManyToManyField('Tag')
-    image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    image = models.ImageField(null=True, upload_to=recipe_image_file_path,
+                              db_index=True)
+
+    objects = ShardedQuerySet.as_manager()
+
+    class Meta:
+        # Range filters and orderings of the recipe list, with id as the
+        # tie breaker, are index scans within a user.
+        indexes = [
+            models.Index(fields=['user', 'time_minutes', 'id']),
+            models.Index(fields=['user', 'price', 'id']),
+            models.Index(fields=['user', 'title', 'id']),
+        ]
 
     def __str__(self):
         return self.title
+
+
+class RecipeStats(models.Model):
+    """Recipe aggregates of a user, kept up to date by core.stats."""
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='recipe_stats'
+    )
+    recipe_count = models.IntegerField(default=0)
+    time_minutes_total = models.BigIntegerField(default=0)
+    price_total = models.DecimalField(max_digits=14, decimal_places=2,
+                                      default=0)
+
+
+class RecipeStatsBucket(models.Model):
+    """Number of recipes of a user in a histogram bucket.
+
+    Price buckets are keyed by their index in STATS_PRICE_BUCKETS, tag
+    and ingredient buckets by the tag or ingredient id.
+    """
+    PRICE = 'price'
+    TAG = 'tag'
+    INGREDIENT = 'ingredient'
+    DIMENSIONS = (
+        (PRICE, 'Price'),
+        (TAG, 'Tag'),
+        (INGREDIENT, 'Ingredient'),
+    )
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE
+    )
+    dimension = models.CharField(max_length=10, choices=DIMENSIONS)
+    key = models.IntegerField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('user', 'dimension', 'key')
+
+
+class RecipeSignature(models.Model):
+    """MinHash signature of the ingredients of a recipe.
+
+    Kept up to date by core.similarity. `bands` holds the LSH band
+    hashes, which share values with recipes having similar ingredients.
+    """
+    recipe = models.OneToOneField(
+        'Recipe',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='signature',
+        # Recipes are partitioned, see migration 0014.
+        db_constraint=False
+    )
+    minhashes = ArrayField(models.IntegerField())
+    bands = ArrayField(models.BigIntegerField())
+
+    class Meta:
+        indexes = [GinIndex(fields=['bands'])]
+
+
+class RecipeIngredientMask(models.Model):
+    """Bit mask of the ingredient positions of a recipe.
+
+    Kept up to date by core.pantry. The mask ends with the bit of the
+    last ingredient, so its length is the highest position plus one.
+    """
+    recipe = models.OneToOneField(
+        'Recipe',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='ingredient_mask',
+        # Recipes are partitioned, see migration 0014.
+        db_constraint=False
+    )
+    mask = BitStringField()
+
+
+class SyncChange(models.Model):
+    """Latest change of a recipe, tag or ingredient, for delta sync.
+
+    Kept up to date by core.sync. Every change of an object replaces its
+    row with a new `sequence`, so a feed only returns objects changed
+    since a cursor, and deleted objects as tombstones.
+    """
+    RECIPE = 'recipe'
+    TAG = 'tag'
+    INGREDIENT = 'ingredient'
+    KINDS = (
+        (RECIPE, 'Recipe'),
+        (TAG, 'Tag'),
+        (INGREDIENT, 'Ingredient'),
+    )
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE
+    )
+    kind = models.CharField(max_length=10, choices=KINDS)
+    object_id = models.IntegerField()
+    sequence = models.BigIntegerField()
+    deleted = models.BooleanField(default=False)
+
+    class Meta:
+        unique_together = ('kind', 'object_id')
+        indexes = [models.Index(fields=['user', 'sequence'])]
+
+
+class UserShard(models.Model):
+    """Database alias holding the recipes of a user, see core.sharding.
+
+    Users without a row are on the default database. `moving` is set
+    while the data of the user is copied to another shard.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='shard'
+    )
+    alias = models.CharField(max_length=100)
+    moving = models.BooleanField(default=False)
@@ -0,0 +1,282 @@
+import time
+
+from django.db import NotSupportedError, OperationalError, transaction
+from django.db.backends.ddl_references import Statement, Table
+from django.db.migrations.operations import AddIndex
+from django.db.migrations.operations.base import Operation
+
+
+# SQLSTATE of statements cancelled by lock_timeout.
+LOCK_NOT_AVAILABLE = '55P03'
+LOCK_TIMEOUT = '2s'
+BACKFILL_BATCH_SIZE = 5000
+
+INVALID_INDEX_SQL = '''
+    SELECT 1 FROM pg_index
+    WHERE indexrelid = to_regclass(%s) AND NOT indisvalid
+'''
+
+
+def _check_not_atomic(schema_editor, operation):
+    """Raise NotSupportedError when running inside a transaction."""
+    if not schema_editor.collect_sql and \
+            schema_editor.connection.in_atomic_block:
+        raise NotSupportedError(
+            f'{type(operation).__name__} cannot run inside a transaction, '
+            f'set atomic = False on the migration.'
+        )
+
+
+class AddIndexConcurrently(AddIndex):
+    """Create an index without blocking writes to its table.
+
+    Partitioned tables get the index on each partition, attached to an
+    index on the parent. Indexes left invalid by an interrupted run are
+    rebuilt. The migration must set atomic = False.
+    """
+
+    def describe(self):
+        return (f'Concurrently create index {self.index.name} on field(s) '
+                f'{", ".join(self.index.fields)} of model {self.model_name}')
+
+    def database_forwards(self, app_label, schema_editor, from_state,
+                          to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias,
+                                        model):
+            return
+        _check_not_atomic(schema_editor, self)
+
+        statement = self.index.create_sql(model, schema_editor)
+        table = model._meta.db_table
+        partitions = self._partitions(schema_editor, table)
+        if not partitions:
+            self._drop_invalid(schema_editor, self.index.name)
+            self._create(schema_editor, statement, table, self.index.name,
+                         'CREATE INDEX CONCURRENTLY')
+            return
+
+        # The parent index stays invalid until every partition has one.
+        quote_name = schema_editor.quote_name
+        self._create(schema_editor, statement, table, self.index.name,
+                     'CREATE INDEX IF NOT EXISTS', ' ON ONLY ')
+        for partition in partitions:
+            name = f'{self.index.name}{partition[len(table):]}'
+            self._drop_invalid(schema_editor, name)
+            self._create(schema_editor, statement, partition, name,
+                         'CREATE INDEX CONCURRENTLY IF NOT EXISTS')
+            schema_editor.execute(
+                f'ALTER INDEX {quote_name(self.index.name)} '
+                f'ATTACH PARTITION {quote_name(name)}'
+            )
+
+    def database_backwards(self, app_label, schema_editor, from_state,
+                           to_state):
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias,
+                                        model):
+            return
+        _check_not_atomic(schema_editor, self)
+
+        # Indexes of partitioned tables cannot be dropped concurrently.
+        concurrently = '' if self._partitions(
+            schema_editor, model._meta.db_table
+        ) else ' CONCURRENTLY'
+        schema_editor.execute(
+            f'DROP INDEX{concurrently} IF EXISTS '
+            f'{schema_editor.quote_name(self.index.name)}'
+        )
+
+    def _partitions(self, schema_editor, table: str) -> list:
+        """Return the partitions of a table, sorted by name."""
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT inhrelid::regclass::text FROM pg_inherits '
+                'WHERE inhparent = to_regclass(%s) ORDER BY 1',
+                [table]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def _create(self, schema_editor, statement, table: str, name: str,
+                command: str, on: str = ' ON '):
+        """Run the index statement on a table, under another name."""
+        quote_name = schema_editor.quote_name
+        template = schema_editor.sql_create_index.replace(
+            'CREATE INDEX', command, 1
+        ).replace(' ON ', on, 1)
+        schema_editor.execute(Statement(template, **dict(
+            statement.parts, table=Table(table, quote_name),
+            name=quote_name(name)
+        )))
+
+    def _drop_invalid(self, schema_editor, name: str):
+        """Drop an index left invalid by an interrupted concurrent build."""
+        if schema_editor.collect_sql:
+            return
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(INVALID_INDEX_SQL,
+                           [schema_editor.quote_name(name)])
+            invalid = cursor.fetchone()
+        if invalid:
+            schema_editor.execute(
+                f'DROP INDEX CONCURRENTLY {schema_editor.quote_name(name)}'
+            )
+
+
+class LockTimeoutRetry(Operation):
+    """Run an operation with a lock timeout, retrying when it times out.
+
+    DDL waiting for a lock queues every query on the table behind it. The
+    timeout bounds that wait, and the operation is retried after a
+    pause, in its own transaction when the migration is not atomic.
+    Statements the operation defers, such as foreign keys, run under the
+    same timeout.
+    """
+    reduces_to_sql = True
+
+    def __init__(self, operation, lock_timeout: str = LOCK_TIMEOUT,
+                 attempts: int = 5, pause: float = 1.0):
+        self.operation = operation
+        self.lock_timeout = lock_timeout
+        self.attempts = attempts
+        self.pause = pause
+
+    @property
+    def reversible(self):
+        return self.operation.reversible
+
+    def deconstruct(self):
+        kwargs = {}
+        if self.lock_timeout != LOCK_TIMEOUT:
+            kwargs['lock_timeout'] = self.lock_timeout
+        if self.attempts != 5:
+            kwargs['attempts'] = self.attempts
+        if self.pause != 1.0:
+            kwargs['pause'] = self.pause
+        return (self.__class__.__name__, [self.operation], kwargs)
+
+    def describe(self):
+        return (f'{self.operation.describe()}, with a {self.lock_timeout} '
+                f'lock timeout')
+
+    def state_forwards(self, app_label, state):
+        self.operation.state_forwards(app_label, state)
+
+    def database_forwards(self, app_label, schema_editor, from_state,
+                          to_state):
+        self._run(schema_editor, self.operation.database_forwards,
+                  app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state,
+                           to_state):
+        self._run(schema_editor, self.operation.database_backwards,
+                  app_label, schema_editor, from_state, to_state)
+
+    def references_model(self, name, app_label=None):
+        return self.operation.references_model(name, app_label)
+
+    def _attempt(self, schema_editor, method, *args):
+        """Run the operation and its deferred statements once."""
+        deferred = len(schema_editor.deferred_sql)
+        schema_editor.execute(
+            f"SET LOCAL lock_timeout = '{self.lock_timeout}'"
+        )
+        method(*args)
+        for sql in schema_editor.deferred_sql[deferred:]:
+            schema_editor.execute(sql)
+        del schema_editor.deferred_sql[deferred:]
+        schema_editor.execute('SET LOCAL lock_timeout TO DEFAULT')
+
+    def _run(self, schema_editor, method, *args):
+        """Retry the operation until it gets its locks in time."""
+        if schema_editor.collect_sql:
+            self._attempt(schema_editor, method, *args)
+            return
+
+        for attempt in range(1, self.attempts + 1):
+            deferred = list(schema_editor.deferred_sql)
+            try:
+                with transaction.atomic(using=schema_editor.connection.alias):
+                    self._attempt(schema_editor, method, *args)
+                return
+            except OperationalError as error:
+                if getattr(error.__cause__, 'pgcode', None) != \
+                        LOCK_NOT_AVAILABLE or attempt == self.attempts:
+                    raise
+            schema_editor.deferred_sql[:] = deferred
+            time.sleep(self.pause)
+
+
+class BackfillField(Operation):
+    """Fill the empty values of a column in batches of ids.
+
+    Each batch is its own transaction, so rows are locked for one batch
+    at a time and the column can be added nullable beforehand without a
+    table rewrite. The migration must set atomic = False. Backwards, the
+    values are left in place.
+    """
+    reduces_to_sql = False
+    reversible = True
+
+    def __init__(self, model_name: str, name: str, sql: str,
+                 batch_size: int = BACKFILL_BATCH_SIZE, pause: float = 0):
+        self.model_name = model_name
+        self.name = name
+        self.sql = sql
+        self.batch_size = batch_size
+        self.pause = pause
+
+    def deconstruct(self):
+        kwargs = {
+            'model_name': self.model_name,
+            'name': self.name,
+            'sql': self.sql,
+        }
+        if self.batch_size != BACKFILL_BATCH_SIZE:
+            kwargs['batch_size'] = self.batch_size
+        if self.pause:
+            kwargs['pause'] = self.pause
+        return (self.__class__.__name__, [], kwargs)
+
+    def describe(self):
+        return (f'Backfill field {self.name} on {self.model_name} with '
+                f'{self.sql}')
+
+    def state_forwards(self, app_label, state):
+        pass
+
+    def database_forwards(self, app_label, schema_editor, from_state,
+                          to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        alias = schema_editor.connection.alias
+        if not self.allow_migrate_model(alias, model):
+            return
+        _check_not_atomic(schema_editor, self)
+
+        quote_name = schema_editor.quote_name
+        table = quote_name(model._meta.db_table)
+        column = quote_name(model._meta.get_field(self.name).column)
+        pk = quote_name(model._meta.pk.column)
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(f'SELECT MIN({pk}), MAX({pk}) FROM {table}')
+            start, end = cursor.fetchone()
+        if start is None:
+            return
+
+        for low in range(start, end + 1, self.batch_size):
+            with transaction.atomic(using=alias), \
+                    schema_editor.connection.cursor() as cursor:
+                cursor.execute(
+                    f'UPDATE {table} SET {column} = {self.sql} '
+                    f'WHERE {pk} >= %s AND {pk} < %s AND {column} IS NULL',
+                    [low, low + self.batch_size]
+                )
+            if self.pause:
+                time.sleep(self.pause)
+
+    def database_backwards(self, app_label, schema_editor, from_state,
+                           to_state):
+        pass
+
+    def references_model(self, name, app_label=None):
+        return name.lower() == self.model_name.lower()
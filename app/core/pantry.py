@@ -0,0 +1,165 @@
+from django.contrib.auth import get_user_model
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.db import transaction
+from django.db.models import Max, Q
+from django.db.models.expressions import RawSQL
+
+from core import sharding
+from core.models import Ingredient, Recipe, RecipeIngredientMask
+
+
+INGREDIENT = Ingredient._meta.db_table
+RECIPE = Recipe._meta.db_table
+RECIPE_INGREDIENTS = Recipe.ingredients.through._meta.db_table
+MASKS = RecipeIngredientMask._meta.db_table
+BATCH_SIZE = 5000
+
+# Number the ingredients without a position after the last position of
+# their user, in creation order.
+ASSIGN_SQL = f'''
+    UPDATE {INGREDIENT} i SET position = n.position
+    FROM (
+        SELECT u.id, COALESCE(p.last, -1) + row_number() OVER (
+            PARTITION BY u.user_id ORDER BY u.id
+        ) AS position
+        FROM {INGREDIENT} u
+        LEFT JOIN (
+            SELECT user_id, MAX(position) AS last
+            FROM {INGREDIENT}
+            GROUP BY user_id
+        ) p ON p.user_id = u.user_id
+        WHERE u.position IS NULL AND {{where}}
+    ) n
+    WHERE i.id = n.id
+    RETURNING i.id, i.position
+'''
+
+# The bits of a recipe are ORed together from one string per ingredient,
+# all as long as the highest position of the recipe.
+INDEX_SQL = f'''
+    INSERT INTO {MASKS} (recipe_id, mask)
+    SELECT recipe_id, bit_or(bits)
+    FROM (
+        SELECT l.recipe_id, overlay(
+            repeat('0', MAX(i.position) OVER w + 1)
+            PLACING '1' FROM i.position + 1
+        )::varbit AS bits
+        FROM {RECIPE_INGREDIENTS} l
+        JOIN {INGREDIENT} i ON i.id = l.ingredient_id
+        WHERE l.recipe_id = ANY(%s)
+        WINDOW w AS (PARTITION BY l.recipe_id)
+    ) b
+    GROUP BY recipe_id
+'''
+
+# Number of bits set in both the recipe mask and the mask of the lacking
+# ingredients. Casting to bit({width}) pads the recipe mask with zeros.
+MISSING_SQL = f'''
+    SELECT length(replace(
+        (m.mask::bit({{width}}) & %s::bit({{width}}))::text, '0', ''
+    ))
+    FROM {MASKS} m
+    WHERE m.recipe_id = {RECIPE}.id
+'''
+
+
+def assign_positions(user_ids=None) -> dict:
+    """Give a pantry bit to the ingredients without one.
+
+    The users are locked first, so concurrent ingredient creations get
+    consecutive positions instead of conflicting ones.
+
+    Returns:
+        dict: the new position of each ingredient, by id.
+    """
+    where, params = 'TRUE', []
+    with transaction.atomic(using=sharding.current_shard()):
+        if user_ids is not None:
+            user_ids = sorted(set(user_ids))
+            list(get_user_model().objects.using(
+                sharding.current_shard()
+            ).filter(
+                pk__in=user_ids
+            ).order_by('pk').select_for_update().values_list('pk'))
+            where, params = 'u.user_id = ANY(%s)', [user_ids]
+        with sharding.db_connection().cursor() as cursor:
+            cursor.execute(ASSIGN_SQL.format(where=where), params)
+            return dict(cursor.fetchall())
+
+
+def index_recipes(recipe_ids):
+    """Compute the ingredient masks of recipes."""
+    recipe_ids = list(recipe_ids)
+    with transaction.atomic(using=sharding.current_shard()):
+        stale = RecipeIngredientMask.objects.filter(recipe_id__in=recipe_ids)
+        stale._raw_delete(stale.db)
+        with sharding.db_connection().cursor() as cursor:
+            cursor.execute(INDEX_SQL, [recipe_ids])
+
+
+def rebuild():
+    """Assign missing positions and compute every mask, a batch at a time."""
+    assign_positions()
+    RecipeIngredientMask.objects.all()._raw_delete(
+        RecipeIngredientMask.objects.db
+    )
+    last_id = 0
+    while True:
+        recipe_ids = list(Recipe.objects.filter(
+            pk__gt=last_id
+        ).order_by('pk').values_list('pk', flat=True)[:BATCH_SIZE])
+        if not recipe_ids:
+            return
+        index_recipes(recipe_ids)
+        last_id = recipe_ids[-1]
+
+
+def lacking_mask(user, ingredient_ids) -> str:
+    """Return the bit string of the ingredients a user does not have.
+
+    The string covers every position of the user, so it is as long as
+    the longest recipe mask.
+    """
+    positions = Ingredient.objects.filter(user=user).aggregate(
+        last=Max('position'),
+        have=ArrayAgg('position', filter=Q(id__in=list(ingredient_ids)))
+    )
+    have = set(positions['have'] or [])
+    width = (positions['last'] or 0) + 1
+    return ''.join('0' if position in have else '1'
+                   for position in range(width))
+
+
+def missing_ingredients(user, ingredient_ids) -> RawSQL:
+    """Return an expression counting the ingredients of a recipe missing
+    from a set of ingredients.
+
+    Recipes without ingredients have no mask and count as NULL.
+    """
+    lacking = lacking_mask(user, ingredient_ids)
+    return RawSQL(MISSING_SQL.format(width=len(lacking)), [lacking])
+
+
+def cookable(queryset, user, ingredient_ids, max_missing: int = 0):
+    """Filter recipes to the ones cookable with a set of ingredients.
+
+    Args:
+        queryset (QuerySet): recipes of the user.
+        user (User): owner of the ingredients.
+        ingredient_ids (list): ids of the ingredients at hand.
+        max_missing (int): number of ingredients a recipe may lack.
+
+    Returns:
+        QuerySet: recipes annotated with `missing_ingredients`.
+    """
+    return queryset.annotate(
+        missing_ingredients=missing_ingredients(user, ingredient_ids)
+    ).filter(missing_ingredients__lte=max_missing)
+
+
+@sharding.on_shard
+def ingredient_post_save(sender, instance, created, **kwargs):
+    """Give a position to a new ingredient."""
+    if instance.position is None:
+        positions = assign_positions([instance.user_id])
+        instance.position = positions.get(instance.pk, instance.position)
@@ -0,0 +1,37 @@
+from django.db import connections
+
+
+# Hash partitioning and primary keys on partitioned tables.
+MIN_SERVER_VERSION = 110000
+
+PARTITIONS_SQL = '''
+    SELECT count(*) FROM pg_inherits WHERE inhparent = %s::regclass
+'''
+
+# Partitioned tables are estimated from their partitions.
+ESTIMATE_SQL = '''
+    SELECT COALESCE(SUM(GREATEST(c.reltuples, 0)), 0)
+    FROM pg_class c
+    WHERE c.oid IN (
+        SELECT inhrelid FROM pg_inherits WHERE inhparent = to_regclass(%s)
+    ) OR (c.oid = to_regclass(%s) AND c.relkind != 'p')
+'''
+
+
+def is_supported(alias: str = 'default') -> bool:
+    """Tell whether the server of a database can hash partition tables."""
+    connection = connections[alias]
+    return connection.vendor == 'postgresql' and \
+        connection.pg_version >= MIN_SERVER_VERSION
+
+
+def partition_count(cursor, table: str) -> int:
+    """Return the number of partitions of a table, 0 when not partitioned."""
+    cursor.execute(PARTITIONS_SQL, [table])
+    return cursor.fetchone()[0]
+
+
+def estimate_rows(cursor, table: str) -> int:
+    """Return the planner estimate of the number of rows of a table."""
+    cursor.execute(ESTIMATE_SQL, [table, table])
+    return int(cursor.fetchone()[0])
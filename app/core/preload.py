@@ -0,0 +1,20 @@
+from importlib import import_module
+
+from django.conf import settings
+from django.db import connections
+from django.urls import get_resolver
+
+
+def preload():
+    """Import the code requests need before a pre-fork server forks.
+
+    Workers share the modules imported by the master process instead of
+    each importing them on their first requests. Connections opened
+    while loading are closed, as forked workers must not share them.
+    """
+    resolver = get_resolver()
+    # Imports the URLconfs and views, and builds the reverse lookups.
+    resolver.reverse_dict
+    for module in settings.PRELOAD_MODULES:
+        import_module(module)
+    connections.close_all()
@@ -0,0 +1,67 @@
+from rest_framework import renderers
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class ORJSONRenderer(renderers.JSONRenderer):
+    """Renderer which serializes to JSON with orjson when it is installed.
+
+    Types orjson does not know, such as ``Decimal`` or lazy
+    translations, go through DRF's encoder. Data orjson rejects, such as
+    integers wider than 64 bits, and indented, ASCII-only or non-compact
+    output fall back to DRF's JSONRenderer. The output otherwise matches
+    JSONRenderer's, except for floats: orjson writes small ones as
+    ``0.00001`` or ``1.5e-7`` where the stdlib writes ``1e-05`` or
+    ``1.5e-07``, and NaN and infinities as ``null`` where JSONRenderer
+    fails. The values parse back the same.
+    """
+    encoder = encoders.JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Render `data` into JSON, returning a bytestring."""
+        if data is None:
+            return bytes()
+
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if (orjson is None or indent is not None or self.ensure_ascii
+                or not self.compact):
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.encoder.default,
+                option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+
+        # Same escaping as JSONRenderer, keeping the output a strict
+        # javascript subset.
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028')
+            ret = ret.replace(b'\xe2\x80\xa9', b'\\u2029')
+
+        return ret
+
+
+class EventStreamRenderer(renderers.BaseRenderer):
+    """Renderer accepting text/event-stream requests.
+
+    Streams are returned as StreamingHttpResponse. Only errors, such as
+    authentication failures, are rendered, as an `error` event.
+    """
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Render `data` as the JSON payload of an error event."""
+        payload = ORJSONRenderer().render(data).decode()
+        return f'event: error\ndata: {payload}\n\n'.encode()
@@ -0,0 +1,173 @@
+import itertools
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from core import indexing, sharding, stats, sync
+from core.models import Ingredient, Recipe, RecipeIngredientMask, \
+    RecipeSignature, RecipeStats, RecipeStatsBucket, SyncChange, Tag, \
+    UserShard
+
+
+BATCH_SIZE = 2000
+
+
+def _copy(queryset, target: str, make, batch_size: int) -> int:
+    """Insert a row built by `make` on a shard for every queried row."""
+    rows = queryset.order_by('pk').values().iterator(chunk_size=batch_size)
+    copied = 0
+    while True:
+        batch = [make(row) for row in itertools.islice(rows, batch_size)]
+        if not batch:
+            return copied
+        queryset.model.objects.using(target).bulk_create(batch)
+        copied += len(batch)
+
+
+def _links(through, column: str, recipe_ids, source: str):
+    """Return the recipe links of a through model, without their ids."""
+    return through.objects.using(source).filter(
+        recipe_id__in=recipe_ids
+    ).values_list('recipe_id', column)
+
+
+def _copy_user(user, source: str, target: str, batch_size: int) -> dict:
+    """Copy the rows of a user from a shard to another.
+
+    Returns:
+        dict: number of rows copied per model, and the last sync sequence
+        of the user on the source.
+    """
+    counts = {}
+    with transaction.atomic(using=source), \
+            transaction.atomic(using=target):
+        with connections[source].cursor() as cursor:
+            # Waits for the writes of the user in progress, which record
+            # their changes under the same lock, and blocks new ones.
+            cursor.execute('SELECT pg_advisory_xact_lock(%s, %s)',
+                           [sync.LOCK_CLASS, user.pk])
+        sharding.mirror_users([user], target)
+        for name, model in (('tags', Tag), ('ingredients', Ingredient),
+                            ('recipes', Recipe)):
+            counts[name] = _copy(model.objects.using(source).filter(
+                user=user
+            ), target, lambda row, model=model: model(**row), batch_size)
+
+        recipe_ids = list(Recipe.objects.using(target).filter(
+            user=user
+        ).values_list('pk', flat=True))
+        for name, through, column in (
+            ('recipe_tags', Recipe.tags.through, 'tag_id'),
+            ('recipe_ingredients', Recipe.ingredients.through,
+             'ingredient_id'),
+        ):
+            links = [through(**{'recipe_id': recipe_id, column: key})
+                     for recipe_id, key in _links(through, column,
+                                                  recipe_ids, source)]
+            through.objects.using(target).bulk_create(links,
+                                                      batch_size=batch_size)
+            counts[name] = len(links)
+
+        # Cursors of clients stay valid: the changes keep their sequence,
+        # and the target sequence continues after the source one.
+        changes = SyncChange.objects.using(source).filter(user=user)
+        last_sequence = max(changes.values_list('sequence', flat=True),
+                            default=0)
+        with connections[target].cursor() as cursor:
+            cursor.execute(
+                f"SELECT setval('{sync.SEQUENCE}', GREATEST(%s, "
+                f"(SELECT last_value FROM {sync.SEQUENCE})))",
+                [last_sequence]
+            )
+        counts['sync_changes'] = _copy(
+            changes, target,
+            lambda row: SyncChange(**dict(row, id=None)), batch_size
+        )
+
+        with sharding.using_shard(target):
+            stats.rebuild([user.pk])
+            for start in range(0, len(recipe_ids), batch_size):
+                indexing.index_recipes(recipe_ids[start:start + batch_size])
+
+    counts['last_sequence'] = last_sequence
+    return counts
+
+
+def _delete_user_rows(user, alias: str):
+    """Delete the rows of a user from a shard, without signals or events.
+
+    The changes are not recorded: the rows live on in another shard.
+    """
+    recipes = Recipe.objects.using(alias).filter(user=user)
+    with transaction.atomic(using=alias):
+        for queryset in (
+            RecipeSignature.objects.filter(recipe__in=recipes),
+            RecipeIngredientMask.objects.filter(recipe__in=recipes),
+            Recipe.tags.through.objects.filter(recipe__in=recipes),
+            Recipe.ingredients.through.objects.filter(recipe__in=recipes),
+            recipes,
+            Tag.objects.filter(user=user),
+            Ingredient.objects.filter(user=user),
+            RecipeStats.objects.filter(user=user),
+            RecipeStatsBucket.objects.filter(user=user),
+            SyncChange.objects.filter(user=user),
+        ):
+            queryset.using(alias)._raw_delete(alias)
+        if alias != DEFAULT_DB_ALIAS:
+            type(user).objects.using(alias).filter(pk=user.pk)._raw_delete(
+                alias
+            )
+
+
+def _set_shard(user, alias: str, moving: bool, wait):
+    """Update the shard map, then wait until every process sees it."""
+    UserShard.objects.using(DEFAULT_DB_ALIAS).update_or_create(
+        user=user, defaults={'alias': alias, 'moving': moving}
+    )
+    sharding.forget(user.pk)
+    wait(settings.SHARD_MAP_CACHE_SECONDS)
+
+
+def move_user(user, target: str, batch_size: int = BATCH_SIZE,
+              wait=time.sleep) -> dict:
+    """Move the tags, ingredients and recipes of a user to another shard.
+
+    The user keeps reading from the source while its rows are copied,
+    and writes are refused with 503 until the shard map points to the
+    target. The source rows are deleted last. Writes committed to the
+    source during the copy, by requests started before the user was
+    marked moving, abort the move.
+
+    Args:
+        user (User): user to move.
+        target (str): alias of the shard to move to.
+        batch_size (int): rows copied per query.
+        wait (callable): sleeps for a number of seconds.
+
+    Returns:
+        dict: number of rows copied per model.
+    """
+    if target not in sharding.shards():
+        raise ValueError(f'{target} is not a shard')
+    sharding.forget(user.pk)
+    source = sharding.shard_for(user.pk)
+    if source == target:
+        raise ValueError(f'The user is already on {target}')
+
+    _set_shard(user, source, True, wait)
+    try:
+        counts = _copy_user(user, source, target, batch_size)
+        with sharding.using_shard(source):
+            changed = sync.last_sequence(user) != counts.pop('last_sequence')
+        if changed:
+            _delete_user_rows(user, target)
+            raise RuntimeError('The user changed during the move, try again')
+    except Exception:
+        _set_shard(user, source, False, lambda seconds: None)
+        raise
+
+    _set_shard(user, target, False, wait)
+    _delete_user_rows(user, source)
+
+    return counts
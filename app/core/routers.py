@@ -0,0 +1,179 @@
+import hashlib
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, \
+    MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+from core import sharding
+from core.caching import shared_cache
+
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Replication lag in seconds, 0 when the replica replayed everything it
+# received (an idle primary) or when the database is not a replica.
+REPLICA_LAG_SQL = '''
+    SELECT COALESCE(
+        CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn()
+            THEN 0
+            ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+        END,
+        0
+    )
+'''
+
+_local = threading.local()
+_health = {}
+
+
+@contextmanager
+def read_from(alias: str):
+    """Send the ORM reads of the current thread to a database alias."""
+    previous = getattr(_local, 'read_alias', None)
+    _local.read_alias = alias
+    try:
+        yield
+    finally:
+        _local.read_alias = previous
+
+
+def current_read_alias():
+    """Return the alias reads are sent to, None for the primary."""
+    return getattr(_local, 'read_alias', None)
+
+
+def replica_lag(alias: str) -> float:
+    """Return the replication lag of a replica in seconds."""
+    with connections[alias].cursor() as cursor:
+        cursor.execute(REPLICA_LAG_SQL)
+        return float(cursor.fetchone()[0])
+
+
+def is_healthy(alias: str) -> bool:
+    """Tell whether a replica is reachable and not lagging too far behind.
+
+    The result is kept for REPLICA_CHECK_INTERVAL seconds, so the check
+    costs one query per replica and interval, not per request.
+    """
+    now = time.monotonic()
+    checked_at, healthy = _health.get(alias, (None, False))
+    if checked_at is not None and \
+            now - checked_at < settings.REPLICA_CHECK_INTERVAL:
+        return healthy
+
+    try:
+        healthy = replica_lag(alias) <= settings.REPLICA_MAX_LAG
+    except DatabaseError:
+        healthy = False
+    _health[alias] = (now, healthy)
+
+    return healthy
+
+
+def choose_replica():
+    """Return a healthy replica alias, or None to read from the primary."""
+    replicas = [alias for alias in settings.DATABASE_REPLICAS
+                if is_healthy(alias)]
+    return random.choice(replicas) if replicas else None
+
+
+class ShardRouter:
+    """Route the rows owned by users to the shard of their user.
+
+    The shard comes from the user of the instance the query is about,
+    such as the object saved or the owner of a related manager, else
+    from the shard the current thread is on. Other models, and the
+    default shard, which has the replicas, are left to the next router.
+    Reads outside of any shard go to the default database, while writes
+    raise ShardUnknown when there are several shards.
+    """
+
+    def _db(self, model, hints: dict, write: bool = False):
+        if not sharding.is_sharded_model(model):
+            return None
+        user_id = sharding.user_id_of(hints.get('instance'))
+        if user_id is not None:
+            alias = sharding.shard_for(user_id)
+        else:
+            alias = sharding.active_shard()
+        if alias is None and write and len(sharding.shards()) > 1:
+            raise sharding.ShardUnknown(
+                f'Write to {model._meta.label} outside of a shard, use '
+                f'sharding.using_shard()'
+            )
+        return None if alias == DEFAULT_DB_ALIAS else alias
+
+    def db_for_read(self, model, **hints):
+        return self._db(model, hints)
+
+    def db_for_write(self, model, **hints):
+        return self._db(model, hints, write=True)
+
+
+class ReplicaRouter:
+    """Route reads to the replica chosen for the current request.
+
+    Writes, migrations and reads outside of a replica context go to the
+    primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        return current_read_alias()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
+
+
+class ReplicaRoutingMiddleware:
+    """Serve safe requests from a replica, with read-your-writes.
+
+    A client sending a write is pinned to the primary for
+    REPLICA_PIN_SECONDS, so its following reads see the change. Pins are
+    kept in the shared cache, for every worker to see them.
+    """
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.cache = shared_cache()
+        if self.cache is None:
+            raise ImproperlyConfigured(
+                'DATABASE_REPLICAS needs a cache shared by every worker, '
+                'set CACHE_LOCATION.'
+            )
+        self.get_response = get_response
+
+    def _pin_key(self, request) -> str:
+        """Return the cache key pinning the client of a request."""
+        ident = (
+            request.META.get('HTTP_AUTHORIZATION')
+            or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+            or request.META.get('REMOTE_ADDR', '')
+        )
+        digest = hashlib.sha256(ident.encode()).hexdigest()
+        return f'replica_pin:{digest}'
+
+    def __call__(self, request):
+        pin_key = self._pin_key(request)
+        if request.method not in SAFE_METHODS:
+            response = self.get_response(request)
+            self.cache.set(pin_key, True, settings.REPLICA_PIN_SECONDS)
+            return response
+
+        alias = None if self.cache.get(pin_key) else choose_replica()
+        if alias is None:
+            return self.get_response(request)
+
+        with read_from(alias):
+            return self.get_response(request)
@@ -0,0 +1,208 @@
+import itertools
+import random
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from core import indexing, pantry, sharding, stats, sync
+from core.models import Ingredient, Recipe, SyncChange, Tag
+
+
+TAG_NAMES = (
+    'Vegan', 'Vegetarian', 'Dessert', 'Breakfast', 'Lunch', 'Dinner',
+    'Snack', 'Quick', 'Comfort food', 'Spicy', 'Gluten free', 'Healthy',
+    'Kids', 'Party', 'Soup', 'Salad', 'Baking', 'Grill', 'Seafood', 'Curry',
+)
+INGREDIENT_NAMES = (
+    'Salt', 'Pepper', 'Olive oil', 'Garlic', 'Onion', 'Butter', 'Flour',
+    'Sugar', 'Egg', 'Milk', 'Tomato', 'Lemon', 'Chicken', 'Rice', 'Basil',
+    'Ginger', 'Cinnamon', 'Potato', 'Carrot', 'Cheese', 'Beef', 'Prawns',
+    'Mushroom', 'Spinach', 'Chili', 'Honey', 'Yogurt', 'Avocado', 'Lime',
+    'Coriander', 'Pasta', 'Cream', 'Bacon', 'Feta', 'Aubergine', 'Tahini',
+)
+DISHES = ('curry', 'stew', 'salad', 'soup', 'pie', 'risotto', 'tart',
+          'stir fry', 'bake', 'roast', 'sandwich', 'pasta')
+
+
+def _zipf_cum_weights(count: int):
+    """Return cumulative weights favouring the first items, like usage."""
+    return list(itertools.accumulate(1 / rank for rank in range(1, count + 1)))
+
+
+class Seeder:
+    """Generate users and their recipes deterministically from a seed.
+
+    Rows are written with bulk inserts in batches, so memory use does not
+    depend on the number of rows. Every user shares one password hash.
+    Recipe stats, signatures, pantry masks and sync changes are built for
+    each batch.
+    """
+
+    def __init__(self, seed: int = 0, prefix: str = 'user',
+                 tags_per_user: int = 20, ingredients_per_user: int = 100,
+                 batch_size: int = 5000, password: str = 'password'):
+        self.seed = seed
+        self.prefix = prefix
+        self.tags_per_user = tags_per_user
+        self.ingredients_per_user = ingredients_per_user
+        self.batch_size = batch_size
+        self.random = random.Random(seed)
+        self.password_hash = make_password(password)
+        self.tag_weights = _zipf_cum_weights(tags_per_user)
+        self.ingredient_weights = _zipf_cum_weights(ingredients_per_user)
+        self.counts = dict.fromkeys(
+            ('users', 'tags', 'ingredients', 'recipes', 'recipe_tags',
+             'recipe_ingredients'),
+            0
+        )
+
+    def email(self, index: int) -> str:
+        """Return the email of the index-th generated user."""
+        return f'{self.prefix}{index}@seed{self.seed}.example.com'
+
+    def seed_users(self, count: int, recipes_per_user: int) -> dict:
+        """Create users with their tags, ingredients and recipes.
+
+        Args:
+            count (int): number of users to create.
+            recipes_per_user (int): number of recipes owned by each user.
+
+        Returns:
+            dict: number of rows created per table.
+        """
+        rows_per_user = self.tags_per_user + self.ingredients_per_user + 1
+        users_per_batch = max(1, self.batch_size // rows_per_user)
+        for start in range(0, count, users_per_batch):
+            with transaction.atomic():
+                users = self._create_users(
+                    start, min(users_per_batch, count - start)
+                )
+                shards = sharding.assign_shards(users)
+                for alias, shard_users in shards.items():
+                    with sharding.using_shard(alias), \
+                            transaction.atomic(using=alias):
+                        self._seed_batch(shard_users, recipes_per_user)
+                        # Bulk inserts send no signals to update the stats.
+                        stats.rebuild(user.id for user in shard_users)
+
+        return self.counts
+
+    def _create_users(self, start: int, count: int):
+        """Create a batch of users sharing the precomputed password."""
+        users = get_user_model().objects.bulk_create(
+            (
+                get_user_model()(
+                    email=self.email(index),
+                    name=f'Seed user {index}',
+                    password=self.password_hash
+                )
+                for index in range(start, start + count)
+            ),
+            batch_size=self.batch_size
+        )
+        self.counts['users'] += len(users)
+        return users
+
+    def _named(self, names, index: int) -> str:
+        """Return a distinct name for the index-th tag or ingredient."""
+        name = names[index % len(names)]
+        return name if index < len(names) else f'{name} {index}'
+
+    def _seed_batch(self, users, recipes_per_user: int):
+        """Create the tags, ingredients and recipes of a batch of users."""
+        tags = Tag.objects.bulk_create(
+            (
+                Tag(user_id=user.id, name=self._named(TAG_NAMES, i))
+                for user in users for i in range(self.tags_per_user)
+            ),
+            batch_size=self.batch_size
+        )
+        ingredients = Ingredient.objects.bulk_create(
+            (
+                Ingredient(user_id=user.id,
+                           name=self._named(INGREDIENT_NAMES, i))
+                for user in users for i in range(self.ingredients_per_user)
+            ),
+            batch_size=self.batch_size
+        )
+        pantry.assign_positions(user.id for user in users)
+        # New users have no event streams to notify.
+        sync.record(SyncChange.TAG, (tag.id for tag in tags), notify=False)
+        sync.record(SyncChange.INGREDIENT,
+                    (ingredient.id for ingredient in ingredients),
+                    notify=False)
+        self.counts['tags'] += len(tags)
+        self.counts['ingredients'] += len(ingredients)
+
+        tag_ids = {}
+        for tag in tags:
+            tag_ids.setdefault(tag.user_id, []).append(tag.id)
+        ingredient_ids = {}
+        for ingredient in ingredients:
+            ingredient_ids.setdefault(ingredient.user_id, []).append(
+                ingredient.id
+            )
+
+        recipes = (
+            self._recipe(user) for user in users
+            for _ in range(recipes_per_user)
+        )
+        while True:
+            chunk = list(itertools.islice(recipes, self.batch_size))
+            if not chunk:
+                break
+            self._create_recipes(chunk, tag_ids, ingredient_ids)
+
+    def _recipe(self, user) -> Recipe:
+        """Return an unsaved recipe with plausible values."""
+        ingredient = self.random.choice(INGREDIENT_NAMES).lower()
+        return Recipe(
+            user_id=user.id,
+            title=f'{ingredient.capitalize()} '
+                  f'{self.random.choice(DISHES)}',
+            time_minutes=min(int(self.random.lognormvariate(3.3, 0.6)), 600),
+            price=Decimal(self.random.randint(100, 5000)) / 100,
+            link=''
+        )
+
+    def _sample(self, ids, cum_weights, count: int):
+        """Return up to count distinct ids, favouring popular ones."""
+        picks = self.random.choices(ids, cum_weights=cum_weights, k=count * 2)
+        return list(dict.fromkeys(picks))[:count]
+
+    def _create_recipes(self, recipes, tag_ids, ingredient_ids):
+        """Create recipes and link them to the tags and ingredients."""
+        recipes = Recipe.objects.bulk_create(recipes)
+        recipe_tags = []
+        recipe_ingredients = []
+        for recipe in recipes:
+            user_tag_ids = tag_ids.get(recipe.user_id)
+            if user_tag_ids:
+                for tag_id in self._sample(user_tag_ids, self.tag_weights,
+                                           self.random.randint(0, 3)):
+                    recipe_tags.append(Recipe.tags.through(
+                        recipe_id=recipe.id, tag_id=tag_id
+                    ))
+            user_ingredient_ids = ingredient_ids.get(recipe.user_id)
+            if user_ingredient_ids:
+                for ingredient_id in self._sample(user_ingredient_ids,
+                                                  self.ingredient_weights,
+                                                  self.random.randint(3, 12)):
+                    recipe_ingredients.append(Recipe.ingredients.through(
+                        recipe_id=recipe.id, ingredient_id=ingredient_id
+                    ))
+
+        Recipe.tags.through.objects.bulk_create(
+            recipe_tags, batch_size=self.batch_size
+        )
+        Recipe.ingredients.through.objects.bulk_create(
+            recipe_ingredients, batch_size=self.batch_size
+        )
+        indexing.index_recipes(recipe.id for recipe in recipes)
+        sync.record(SyncChange.RECIPE, (recipe.id for recipe in recipes),
+                    notify=False)
+        self.counts['recipes'] += len(recipes)
+        self.counts['recipe_tags'] += len(recipe_tags)
+        self.counts['recipe_ingredients'] += len(recipe_ingredients)
@@ -0,0 +1,215 @@
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core.models import Ingredient, Recipe, Tag, UserShard
+
+
+# Models whose rows live on the shard of their user. Users are copied to
+# every shard they own rows on, as stubs satisfying the foreign keys.
+SHARDED_MODELS = {
+    'core.tag',
+    'core.ingredient',
+    'core.recipe',
+    'core.recipe_tags',
+    'core.recipe_ingredients',
+    'core.recipestats',
+    'core.recipestatsbucket',
+    'core.recipesignature',
+    'core.recipeingredientmask',
+    'core.syncchange',
+}
+# Models whose ids are allocated by the shards, a stride apart.
+SEQUENCED_MODELS = (Tag, Ingredient, Recipe)
+
+_local = threading.local()
+_map = {}
+
+
+class ShardUnknown(Exception):
+    """Raised for sharded writes that cannot tell their shard."""
+
+
+def shards() -> list:
+    """Return the database aliases of the shards, the default first."""
+    return settings.DATABASE_SHARDS
+
+
+def is_sharded_model(model) -> bool:
+    """Tell whether the rows of a model live on the shard of their user."""
+    return model._meta.label_lower in SHARDED_MODELS
+
+
+@contextmanager
+def using_shard(alias: str):
+    """Send the sharded queries of the current thread to a shard."""
+    previous = getattr(_local, 'alias', None)
+    _local.alias = alias
+    try:
+        yield
+    finally:
+        _local.alias = previous
+
+
+def active_shard():
+    """Return the shard of the current thread, None outside of any."""
+    return getattr(_local, 'alias', None)
+
+
+def current_shard() -> str:
+    """Return the shard of the current thread, the default outside of any."""
+    return active_shard() or DEFAULT_DB_ALIAS
+
+
+def db_connection():
+    """Return the connection to the shard of the current thread."""
+    return connections[current_shard()]
+
+
+def on_shard(receiver):
+    """Run a signal receiver on the database the signal was sent from."""
+    @wraps(receiver)
+    def wrapper(*args, **kwargs):
+        with using_shard(kwargs.get('using') or current_shard()):
+            return receiver(*args, **kwargs)
+
+    return wrapper
+
+
+def _lookup(user_id: int) -> tuple:
+    """Return the shard of a user and whether it is moving.
+
+    Entries are kept for SHARD_MAP_CACHE_SECONDS, so the map costs a
+    query per user and interval instead of per request.
+    """
+    now = time.monotonic()
+    expires_at, alias, moving = _map.get(user_id, (0, None, False))
+    if expires_at > now:
+        return alias, moving
+
+    alias, moving = UserShard.objects.using(DEFAULT_DB_ALIAS).filter(
+        user_id=user_id
+    ).values_list('alias', 'moving').first() or (DEFAULT_DB_ALIAS, False)
+    _map[user_id] = (now + settings.SHARD_MAP_CACHE_SECONDS, alias, moving)
+
+    return alias, moving
+
+
+def user_id_of(instance):
+    """Return the id of the user owning an instance, or None."""
+    if isinstance(instance, get_user_model()):
+        return instance.pk
+    return getattr(instance, 'user_id', None)
+
+
+def shard_for(user_id: int) -> str:
+    """Return the alias of the shard holding the rows of a user."""
+    if len(shards()) == 1:
+        return DEFAULT_DB_ALIAS
+    return _lookup(user_id)[0]
+
+
+def is_moving(user_id: int) -> bool:
+    """Tell whether the rows of a user are being moved to another shard."""
+    return len(shards()) > 1 and _lookup(user_id)[1]
+
+
+def forget(user_id: int = None):
+    """Drop the cached shard of a user, or of every user."""
+    if user_id is None:
+        _map.clear()
+    else:
+        _map.pop(user_id, None)
+
+
+def exists(queryset) -> bool:
+    """Tell whether a queryset matches rows on any shard.
+
+    Ids are only unique across shards once `manage.py configure_shards`
+    has run, so rows found by id must not be taken for those of a user.
+    """
+    return any(queryset.using(alias).exists() for alias in shards())
+
+
+def mirror_users(users, alias: str):
+    """Copy users to a shard as stubs, unless they are already there.
+
+    Stubs only satisfy foreign keys: their emails are made up, so they
+    never collide with the unique emails of the default database.
+    """
+    if alias == DEFAULT_DB_ALIAS:
+        return
+    user_model = get_user_model()
+    existing = set(user_model.objects.using(alias).filter(
+        pk__in=[user.pk for user in users]
+    ).values_list('pk', flat=True))
+    user_model.objects.using(alias).bulk_create([
+        user_model(pk=user.pk, email=f'user{user.pk}@shard.invalid',
+                   password='!', is_active=False)
+        for user in users
+        if user.pk not in existing
+    ])
+
+
+def assign_shards(users) -> dict:
+    """Spread new users over the shards.
+
+    Returns:
+        dict: the users assigned to each shard, by alias.
+    """
+    assigned = {}
+    for user in users:
+        alias = shards()[user.pk % len(shards())]
+        assigned.setdefault(alias, []).append(user)
+    if len(shards()) > 1:
+        UserShard.objects.using(DEFAULT_DB_ALIAS).bulk_create([
+            UserShard(user=user, alias=alias)
+            for alias, shard_users in assigned.items()
+            for user in shard_users
+        ])
+        for alias, shard_users in assigned.items():
+            mirror_users(shard_users, alias)
+
+    return assigned
+
+
+def configure_sequences():
+    """Make the shards allocate distinct ids to the sharded models.
+
+    Each sequence restarts above the highest id of every shard, at the
+    next id equal to the index of its shard modulo SHARD_ID_STRIDE, and
+    moves SHARD_ID_STRIDE at a time. Ids allocated concurrently could be
+    reused, so it is run while the shards are not written to.
+    """
+    stride = settings.SHARD_ID_STRIDE
+    if len(shards()) > stride:
+        raise ValueError(f'At most {stride} shards are supported')
+
+    for model in SEQUENCED_MODELS:
+        table = model._meta.db_table
+        floor = 1
+        for alias in shards():
+            with connections[alias].cursor() as cursor:
+                cursor.execute(f'SELECT COALESCE(MAX(id), 0) FROM {table}')
+                floor = max(floor, cursor.fetchone()[0] + 1)
+        for index, alias in enumerate(shards()):
+            with connections[alias].cursor() as cursor:
+                cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')",
+                               [table])
+                sequence = cursor.fetchone()[0]
+                cursor.execute(
+                    f'ALTER SEQUENCE {sequence} INCREMENT BY {stride} '
+                    f'RESTART WITH {floor + (index - floor) % stride}'
+                )
+
+
+def user_post_save(sender, instance, created, raw=False,
+                   using=DEFAULT_DB_ALIAS, **kwargs):
+    """Give a new user a shard."""
+    if created and not raw and using == DEFAULT_DB_ALIAS:
+        assign_shards([instance])
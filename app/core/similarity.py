@@ -0,0 +1,125 @@
+import random
+
+from django.conf import settings
+from django.db import transaction
+
+from core import sharding
+from core.models import Recipe, RecipeSignature
+
+
+# Universal hash functions h(x) = (a * x + b) mod P, one per permutation.
+PRIME = 2 ** 31 - 1
+BATCH_SIZE = 5000
+
+
+def _hash_functions(count: int, seed: int):
+    """Return the (a, b) coefficients of `count` hash functions."""
+    rand = random.Random(seed)
+    return [(rand.randrange(1, PRIME), rand.randrange(PRIME))
+            for _ in range(count)]
+
+
+HASH_FUNCTIONS = _hash_functions(settings.MINHASH_PERMUTATIONS,
+                                 settings.MINHASH_SEED)
+ROWS_PER_BAND = settings.MINHASH_PERMUTATIONS // settings.MINHASH_BANDS
+
+# Each minhash is the minimum of a hash function over the ingredient ids
+# of a recipe. A band hash is the first 64 bits of the MD5 of the band
+# index and values, so equal hashes always come from the same band.
+INDEX_SQL = f'''
+    WITH signatures AS (
+        SELECT recipe_id, array_agg(minhash ORDER BY position) AS minhashes
+        FROM (
+            SELECT l.recipe_id, h.position,
+                   MIN((h.a * l.ingredient_id + h.b) %% {PRIME}) AS minhash
+            FROM {Recipe.ingredients.through._meta.db_table} l,
+                 unnest(%s::bigint[], %s::bigint[])
+                     WITH ORDINALITY AS h (a, b, position)
+            WHERE l.recipe_id = ANY(%s)
+            GROUP BY l.recipe_id, h.position
+        ) m
+        GROUP BY recipe_id
+    )
+    INSERT INTO {RecipeSignature._meta.db_table}
+        (recipe_id, minhashes, bands)
+    SELECT recipe_id, minhashes, ARRAY(
+        SELECT ('x' || substr(md5(
+            band || ':' || array_to_string(
+                minhashes[band * {ROWS_PER_BAND} + 1:
+                          (band + 1) * {ROWS_PER_BAND}],
+                ','
+            )
+        ), 1, 16))::bit(64)::bigint
+        FROM generate_series(0, {settings.MINHASH_BANDS - 1}) AS band
+        ORDER BY band
+    )
+    FROM signatures
+'''
+
+
+def estimate_similarity(first, second) -> float:
+    """Return the Jaccard similarity estimated from two signatures."""
+    return sum(x == y for x, y in zip(first, second)) / len(first)
+
+
+def index_recipes(recipe_ids):
+    """Compute the signatures of recipes from their ingredients.
+
+    Signatures are computed by the database with one INSERT ... SELECT,
+    so ingredient ids never travel to Python.
+    """
+    recipe_ids = list(recipe_ids)
+    with transaction.atomic(using=sharding.current_shard()):
+        stale = RecipeSignature.objects.filter(recipe_id__in=recipe_ids)
+        stale._raw_delete(stale.db)
+        with sharding.db_connection().cursor() as cursor:
+            cursor.execute(INDEX_SQL, [
+                [a for a, _ in HASH_FUNCTIONS],
+                [b for _, b in HASH_FUNCTIONS],
+                recipe_ids,
+            ])
+
+
+def rebuild():
+    """Compute the signatures of every recipe, a batch at a time."""
+    RecipeSignature.objects.all()._raw_delete(RecipeSignature.objects.db)
+    last_id = 0
+    while True:
+        recipe_ids = list(Recipe.objects.filter(
+            pk__gt=last_id
+        ).order_by('pk').values_list('pk', flat=True)[:BATCH_SIZE])
+        if not recipe_ids:
+            return
+        index_recipes(recipe_ids)
+        last_id = recipe_ids[-1]
+
+
+def similar_recipes(recipe, limit: int) -> list:
+    """Return the recipes of the same user with the most similar ingredients.
+
+    Candidates sharing an LSH band are found with the GIN index on
+    `bands`, at most MINHASH_MAX_CANDIDATES of them, and ranked by their
+    estimated Jaccard similarity.
+
+    Returns:
+        list: (recipe id, similarity) pairs, most similar first.
+    """
+    signature = RecipeSignature.objects.filter(recipe=recipe).first()
+    if signature is None:
+        return []
+
+    candidates = RecipeSignature.objects.filter(
+        recipe__user_id=recipe.user_id,
+        bands__overlap=signature.bands
+    ).exclude(
+        recipe_id=recipe.pk
+    ).values_list(
+        'recipe_id', 'minhashes'
+    )[:settings.MINHASH_MAX_CANDIDATES]
+    scored = [
+        (recipe_id, estimate_similarity(signature.minhashes, minhashes))
+        for recipe_id, minhashes in candidates
+    ]
+    scored.sort(key=lambda pair: (-pair[1], pair[0]))
+
+    return scored[:limit]
@@ -0,0 +1,323 @@
+from decimal import Decimal
+
+from django.conf import settings
+
+from core import sharding
+from core.models import Ingredient, Recipe, RecipeStats, RecipeStatsBucket, \
+    Tag
+
+
+RECIPE = Recipe._meta.db_table
+RECIPE_TAGS = Recipe.tags.through._meta.db_table
+RECIPE_INGREDIENTS = Recipe.ingredients.through._meta.db_table
+STATS = RecipeStats._meta.db_table
+BUCKETS = RecipeStatsBucket._meta.db_table
+
+# Per user totals of the recipes matching {where}.
+STATS_SOURCE = f'''
+    SELECT r.user_id, COUNT(*), SUM(r.time_minutes), SUM(r.price)
+    FROM {RECIPE} r
+    WHERE {{where}}
+    GROUP BY r.user_id
+'''
+
+# Per user histogram buckets of the recipes matching {where}.
+BUCKETS_SOURCE = f'''
+    SELECT r.user_id, '{RecipeStatsBucket.PRICE}',
+           width_bucket(r.price, %s::numeric[]), COUNT(*)
+    FROM {RECIPE} r
+    WHERE {{where}}
+    GROUP BY 1, 3
+    UNION ALL
+    SELECT r.user_id, '{RecipeStatsBucket.TAG}', l.tag_id, COUNT(*)
+    FROM {RECIPE_TAGS} l JOIN {RECIPE} r ON r.id = l.recipe_id
+    WHERE {{where}}
+    GROUP BY 1, 3
+    UNION ALL
+    SELECT r.user_id, '{RecipeStatsBucket.INGREDIENT}', l.ingredient_id,
+           COUNT(*)
+    FROM {RECIPE_INGREDIENTS} l JOIN {RECIPE} r ON r.id = l.recipe_id
+    WHERE {{where}}
+    GROUP BY 1, 3
+'''
+
+ADD_STATS = f'''
+    INSERT INTO {STATS} (user_id, recipe_count, time_minutes_total,
+                         price_total)
+    {{source}}
+    ON CONFLICT (user_id) DO UPDATE SET
+        recipe_count = {STATS}.recipe_count + EXCLUDED.recipe_count,
+        time_minutes_total =
+            {STATS}.time_minutes_total + EXCLUDED.time_minutes_total,
+        price_total = {STATS}.price_total + EXCLUDED.price_total
+'''
+
+# Removals only update existing rows: inserting negative rows could race
+# with the deletion of the user owning them.
+SUBTRACT_STATS = f'''
+    UPDATE {STATS} SET
+        recipe_count = {STATS}.recipe_count - s.count,
+        time_minutes_total = {STATS}.time_minutes_total - s.time_minutes,
+        price_total = {STATS}.price_total - s.price
+    FROM ({{source}}) s (user_id, count, time_minutes, price)
+    WHERE {STATS}.user_id = s.user_id
+'''
+
+ADD_BUCKETS = f'''
+    INSERT INTO {BUCKETS} (user_id, dimension, key, count)
+    {{source}}
+    ON CONFLICT (user_id, dimension, key) DO UPDATE SET
+        count = {BUCKETS}.count + EXCLUDED.count
+'''
+
+SUBTRACT_BUCKETS = f'''
+    UPDATE {BUCKETS} SET count = {BUCKETS}.count - b.count
+    FROM ({{source}}) b (user_id, dimension, key, count)
+    WHERE {BUCKETS}.user_id = b.user_id
+      AND {BUCKETS}.dimension = b.dimension
+      AND {BUCKETS}.key = b.key
+'''
+
+LINKS = {
+    RecipeStatsBucket.TAG: (RECIPE_TAGS, 'tag_id'),
+    RecipeStatsBucket.INGREDIENT: (RECIPE_INGREDIENTS, 'ingredient_id'),
+}
+
+
+def _price_bounds():
+    """Return the upper bounds of the price buckets."""
+    return [Decimal(bound) for bound in settings.STATS_PRICE_BUCKETS]
+
+
+def _apply_recipes(where: str, params: list, add: bool):
+    """Add or subtract the recipes matching a condition from the stats."""
+    stats_sql = (ADD_STATS if add else SUBTRACT_STATS).format(
+        source=STATS_SOURCE.format(where=where)
+    )
+    buckets_sql = (ADD_BUCKETS if add else SUBTRACT_BUCKETS).format(
+        source=BUCKETS_SOURCE.format(where=where)
+    )
+    with sharding.db_connection().cursor() as cursor:
+        cursor.execute(
+            f'WITH stats AS ({stats_sql}) {buckets_sql}',
+            params + [_price_bounds()] + params * 3
+        )
+
+
+def add_recipes(recipe_ids):
+    """Add recipes, with their tags and ingredients, to the stats."""
+    _apply_recipes('r.id = ANY(%s)', [list(recipe_ids)], add=True)
+
+
+def remove_recipes(recipe_ids):
+    """Subtract recipes, with their tags and ingredients, from the stats."""
+    _apply_recipes('r.id = ANY(%s)', [list(recipe_ids)], add=False)
+
+
+def _apply_links(dimension: str, recipe_ids, keys, add: bool):
+    """Add or subtract existing recipe links from the histograms.
+
+    Either list may be None to match every recipe or every key.
+    """
+    table, column = LINKS[dimension]
+    conditions = []
+    params = [dimension]
+    if recipe_ids is not None:
+        conditions.append('l.recipe_id = ANY(%s)')
+        params.append(list(recipe_ids))
+    if keys is not None:
+        conditions.append(f'l.{column} = ANY(%s)')
+        params.append(list(keys))
+    source = f'''
+        SELECT r.user_id, %s, l.{column}, COUNT(*)
+        FROM {table} l JOIN {RECIPE} r ON r.id = l.recipe_id
+        WHERE {' AND '.join(conditions) or 'TRUE'}
+        GROUP BY r.user_id, l.{column}
+    '''
+    with sharding.db_connection().cursor() as cursor:
+        cursor.execute(
+            (ADD_BUCKETS if add else SUBTRACT_BUCKETS).format(source=source),
+            params
+        )
+
+
+def forget_keys(dimension: str, keys):
+    """Drop the histogram buckets of deleted tags or ingredients."""
+    RecipeStatsBucket.objects.filter(dimension=dimension,
+                                     key__in=list(keys)).delete()
+
+
+def rebuild(user_ids=None):
+    """Recompute the stats from the recipes, for some or all users."""
+    stats = RecipeStats.objects.all()
+    buckets = RecipeStatsBucket.objects.all()
+    if user_ids is None:
+        where, params = 'TRUE', []
+    else:
+        user_ids = list(user_ids)
+        stats = stats.filter(user_id__in=user_ids)
+        buckets = buckets.filter(user_id__in=user_ids)
+        where, params = 'r.user_id = ANY(%s)', [user_ids]
+
+    stats._raw_delete(stats.db)
+    buckets._raw_delete(buckets.db)
+    _apply_recipes(where, params, add=True)
+
+
+def check(user_ids=None) -> list:
+    """Compare the stored stats with a recompute.
+
+    Returns:
+        list: a description of every mismatching value.
+    """
+    where, params = 'TRUE', []
+    stats = RecipeStats.objects.all()
+    buckets = RecipeStatsBucket.objects.filter(count__gt=0)
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        where, params = 'r.user_id = ANY(%s)', [user_ids]
+        stats = stats.filter(user_id__in=user_ids)
+        buckets = buckets.filter(user_id__in=user_ids)
+
+    with sharding.db_connection().cursor() as cursor:
+        cursor.execute(STATS_SOURCE.format(where=where), params)
+        expected_stats = {row[0]: tuple(row[1:])
+                          for row in cursor.fetchall()}
+        cursor.execute(BUCKETS_SOURCE.format(where=where),
+                       [_price_bounds()] + params * 3)
+        expected_buckets = {tuple(row[:3]): row[3]
+                            for row in cursor.fetchall()}
+
+    stored_stats = {
+        user_id: values for user_id, *values in stats.exclude(
+            recipe_count=0, time_minutes_total=0, price_total=0
+        ).values_list('user_id', 'recipe_count', 'time_minutes_total',
+                      'price_total')
+    }
+    stored_buckets = {
+        tuple(row[:3]): row[3] for row in buckets.values_list(
+            'user_id', 'dimension', 'key', 'count'
+        )
+    }
+
+    mismatches = []
+    for user_id in sorted(set(expected_stats) | set(stored_stats)):
+        expected = expected_stats.get(user_id, (0, 0, 0))
+        stored = tuple(stored_stats.get(user_id, (0, 0, 0)))
+        if expected != stored:
+            mismatches.append(
+                f'user {user_id}: stored {stored}, expected {expected}'
+            )
+    for key in sorted(set(expected_buckets) | set(stored_buckets)):
+        expected = expected_buckets.get(key, 0)
+        stored = stored_buckets.get(key, 0)
+        if expected != stored:
+            mismatches.append(
+                f'user {key[0]} {key[1]} {key[2]}: stored {stored}, '
+                f'expected {expected}'
+            )
+
+    return mismatches
+
+
+def _histogram(model, counts: dict):
+    """Return the named histogram of tags or ingredients."""
+    names = dict(model.objects.filter(
+        id__in=list(counts)
+    ).values_list('id', 'name'))
+    return sorted(
+        ({'id': key, 'name': names[key], 'count': count}
+         for key, count in counts.items() if key in names),
+        key=lambda bucket: (-bucket['count'], bucket['name'])
+    )
+
+
+def summary(user) -> dict:
+    """Return the recipe statistics of a user."""
+    stats = RecipeStats.objects.filter(user=user).first() or \
+        RecipeStats(user=user)
+    counts = {dimension: {} for dimension, _ in RecipeStatsBucket.DIMENSIONS}
+    for dimension, key, count in RecipeStatsBucket.objects.filter(
+        user=user,
+        count__gt=0
+    ).values_list('dimension', 'key', 'count'):
+        counts[dimension][key] = count
+
+    bounds = _price_bounds()
+    price_histogram = [
+        {
+            'min': f'{bounds[index - 1]:.2f}' if index > 0 else None,
+            'max': f'{bounds[index]:.2f}' if index < len(bounds) else None,
+            'count': counts[RecipeStatsBucket.PRICE].get(index, 0),
+        }
+        for index in range(len(bounds) + 1)
+    ]
+    recipe_count = stats.recipe_count
+
+    return {
+        'recipe_count': recipe_count,
+        'avg_time_minutes': round(
+            stats.time_minutes_total / recipe_count, 1
+        ) if recipe_count else None,
+        'avg_price': f'{Decimal(stats.price_total) / recipe_count:.2f}'
+        if recipe_count else None,
+        'price_histogram': price_histogram,
+        'tags': _histogram(Tag, counts[RecipeStatsBucket.TAG]),
+        'ingredients': _histogram(Ingredient,
+                                  counts[RecipeStatsBucket.INGREDIENT]),
+    }
+
+
+@sharding.on_shard
+def recipe_pre_save(sender, instance, update_fields=None, **kwargs):
+    """Subtract the stored version of an updated recipe."""
+    if instance._state.adding or instance.pk is None:
+        return
+    if update_fields is not None and \
+            not {'user', 'time_minutes', 'price'} & set(update_fields):
+        return
+    instance._stats_removed = True
+    remove_recipes([instance.pk])
+
+
+@sharding.on_shard
+def recipe_post_save(sender, instance, created, **kwargs):
+    """Add a created or updated recipe."""
+    if created or getattr(instance, '_stats_removed', False):
+        instance._stats_removed = False
+        add_recipes([instance.pk])
+
+
+@sharding.on_shard
+def recipe_pre_delete(sender, instance, **kwargs):
+    """Subtract a recipe about to be deleted, links included."""
+    remove_recipes([instance.pk])
+
+
+@sharding.on_shard
+def links_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Update the histograms when recipe tags or ingredients change."""
+    if action not in ('post_add', 'pre_remove', 'pre_clear'):
+        return
+    dimension = (RecipeStatsBucket.TAG if sender is Recipe.tags.through
+                 else RecipeStatsBucket.INGREDIENT)
+    if reverse:
+        recipe_ids, keys = pk_set, [instance.pk]
+    else:
+        recipe_ids, keys = [instance.pk], pk_set
+    if action != 'pre_clear' and not pk_set:
+        return
+
+    _apply_links(dimension, recipe_ids, keys, add=action == 'post_add')
+
+
+@sharding.on_shard
+def tag_pre_delete(sender, instance, **kwargs):
+    """Drop the histogram buckets of a deleted tag."""
+    forget_keys(RecipeStatsBucket.TAG, [instance.pk])
+
+
+@sharding.on_shard
+def ingredient_pre_delete(sender, instance, **kwargs):
+    """Drop the histogram buckets of a deleted ingredient."""
+    forget_keys(RecipeStatsBucket.INGREDIENT, [instance.pk])
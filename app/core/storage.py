@@ -0,0 +1,43 @@
+from storages.backends.s3boto3 import S3Boto3Storage
+from storages.utils import clean_name
+
+
+class MediaStorage(S3Boto3Storage):
+    """S3 compatible media storage that clients can upload to directly."""
+
+    def _key(self, name: str) -> str:
+        """Return the object key of a file name."""
+        return self._normalize_name(clean_name(name))
+
+    def presigned_upload(self, name: str, content_type: str, max_size: int,
+                         expires_in: int) -> dict:
+        """Return the URL and form fields of a presigned POST upload.
+
+        The policy pins the key and the content type and bounds the size,
+        so the client cannot upload anything else with it.
+        """
+        return self.connection.meta.client.generate_presigned_post(
+            Bucket=self.bucket_name,
+            Key=self._key(name),
+            Fields={'Content-Type': content_type},
+            Conditions=[
+                {'Content-Type': content_type},
+                ['content-length-range', 1, max_size],
+            ],
+            ExpiresIn=expires_in
+        )
+
+    def head(self, name: str) -> dict:
+        """Return the metadata of a stored object."""
+        return self.connection.meta.client.head_object(
+            Bucket=self.bucket_name,
+            Key=self._key(name)
+        )
+
+    def read_start(self, name: str, length: int) -> bytes:
+        """Return the first bytes of a stored object."""
+        return self.connection.meta.client.get_object(
+            Bucket=self.bucket_name,
+            Key=self._key(name),
+            Range=f'bytes=0-{length - 1}'
+        )['Body'].read()
@@ -0,0 +1,185 @@
+from django.db import transaction
+from django.db.models import Max
+
+from core import sharding
+from core.models import Ingredient, Recipe, SyncChange, Tag
+
+
+CHANGES = SyncChange._meta.db_table
+SEQUENCE = f'{CHANGES}_sequence'
+TABLES = {
+    SyncChange.RECIPE: Recipe._meta.db_table,
+    SyncChange.TAG: Tag._meta.db_table,
+    SyncChange.INGREDIENT: Ingredient._meta.db_table,
+}
+KINDS = {
+    Recipe: SyncChange.RECIPE,
+    Tag: SyncChange.TAG,
+    Ingredient: SyncChange.INGREDIENT,
+}
+# First key of the advisory locks serializing the changes of a user.
+LOCK_CLASS = 0x53594e43
+# Postgres channel notified of every change, see core.events.
+CHANNEL = 'sync_changes'
+
+LOCK_SQL = f'''
+    SELECT pg_advisory_xact_lock({LOCK_CLASS}, user_id)
+    FROM (
+        SELECT DISTINCT user_id FROM {{table}}
+        WHERE {{where}}
+        ORDER BY user_id
+    ) u
+'''
+
+RECORD_SQL = f'''
+    INSERT INTO {CHANGES} (user_id, kind, object_id, sequence, deleted)
+    SELECT user_id, %s, id, nextval('{SEQUENCE}'), %s
+    FROM (
+        SELECT user_id, id FROM {{table}}
+        WHERE {{where}}
+        ORDER BY id
+    ) o
+    ON CONFLICT (kind, object_id) DO UPDATE SET
+        user_id = EXCLUDED.user_id,
+        sequence = EXCLUDED.sequence,
+        deleted = EXCLUDED.deleted
+'''
+
+# Notifies CHANNEL of each recorded change. Notifications are delivered
+# when the transaction commits. First changes of an object are inserted
+# rows, which have no xmax.
+NOTIFY_SQL = '''
+    WITH changes AS (
+        {record}
+        RETURNING user_id, kind, object_id, sequence, deleted,
+                  xmax = 0 AS created
+    )
+    SELECT pg_notify(%s, json_build_object(
+        'user', user_id,
+        'kind', kind,
+        'id', object_id,
+        'sequence', sequence,
+        'action', CASE
+            WHEN deleted THEN 'deleted'
+            WHEN created THEN 'created'
+            ELSE 'updated'
+        END
+    )::text)
+    FROM changes
+'''
+
+
+def _record(kind: str, where: str, params: list, deleted: bool,
+            lock: bool = True, notify: bool = True):
+    """Give the objects of a kind matching a condition a new sequence."""
+    table = TABLES[kind]
+    sql = RECORD_SQL.format(table=table, where=where)
+    record_params = [kind, deleted] + params
+    if notify:
+        sql = NOTIFY_SQL.format(record=sql)
+        record_params.append(CHANNEL)
+    with transaction.atomic(using=sharding.current_shard()), \
+            sharding.db_connection().cursor() as cursor:
+        if lock:
+            # Held until commit, so the sequences of a user are committed
+            # in order and a cursor never skips a late commit.
+            cursor.execute(LOCK_SQL.format(table=table, where=where),
+                           params)
+        cursor.execute(sql, record_params)
+
+
+def record(kind: str, object_ids, deleted: bool = False,
+           notify: bool = True):
+    """Record that objects changed, or are about to be deleted.
+
+    Args:
+        kind (str): SyncChange kind of the objects.
+        object_ids (list): ids of the objects, which must still exist.
+        deleted (bool): record tombstones instead of updates.
+        notify (bool): publish the changes to the event streams.
+    """
+    object_ids = list(object_ids)
+    if object_ids:
+        _record(kind, 'id = ANY(%s)', [object_ids], deleted, notify=notify)
+
+
+def rebuild():
+    """Record every existing object, for clients syncing from scratch."""
+    for kind in TABLES:
+        _record(kind, 'TRUE', [], deleted=False, lock=False, notify=False)
+
+
+def changes_after(user, since: int, limit: int) -> list:
+    """Return up to `limit` changes of a user after a cursor, in order.
+
+    Returns:
+        list: (kind, object id, deleted, sequence) tuples.
+    """
+    return list(SyncChange.objects.filter(
+        user=user,
+        sequence__gt=since
+    ).order_by('sequence').values_list(
+        'kind', 'object_id', 'deleted', 'sequence'
+    )[:limit])
+
+
+def last_sequence(user) -> int:
+    """Return the sequence of the last change of a user, 0 without any."""
+    return SyncChange.objects.filter(user=user).aggregate(
+        last=Max('sequence')
+    )['last'] or 0
+
+
+def changes_since(user, since: int, limit: int) -> dict:
+    """Return the changes of a user after a cursor, oldest first.
+
+    Returns:
+        dict: the `cursor` of the last change, whether there are `more`,
+        and the ids of the `changed` and `deleted` objects by kind.
+    """
+    rows = changes_after(user, since, limit + 1)
+    changes = {
+        'cursor': since,
+        'more': len(rows) > limit,
+        'changed': {kind: [] for kind in TABLES},
+        'deleted': {kind: [] for kind in TABLES},
+    }
+    for kind, object_id, deleted, sequence in rows[:limit]:
+        changes['deleted' if deleted else 'changed'][kind].append(object_id)
+        changes['cursor'] = sequence
+
+    return changes
+
+
+@sharding.on_shard
+def object_post_save(sender, instance, **kwargs):
+    """Record a created or updated recipe, tag or ingredient."""
+    record(KINDS[sender], [instance.pk])
+
+
+@sharding.on_shard
+def object_pre_delete(sender, instance, **kwargs):
+    """Record a tombstone, and the recipes losing a tag or ingredient."""
+    if sender is not Recipe:
+        record(SyncChange.RECIPE,
+               instance.recipe_set.values_list('pk', flat=True))
+    record(KINDS[sender], [instance.pk], deleted=True)
+
+
+@sharding.on_shard
+def links_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Record the recipes whose tags or ingredients changed."""
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            record(SyncChange.RECIPE, [instance.pk])
+        return
+
+    # A tag or ingredient was added to or removed from recipes.
+    if action == 'pre_clear':
+        instance._sync_recipe_ids = list(
+            instance.recipe_set.values_list('pk', flat=True)
+        )
+    elif action == 'post_clear':
+        record(SyncChange.RECIPE, instance._sync_recipe_ids)
+    elif action in ('post_add', 'post_remove'):
+        record(SyncChange.RECIPE, pk_set)
@@ -0,0 +1,28 @@
+from django.contrib.auth import get_user_model
+
+from core import resharding, sharding
+
+
+def create_user_on_shard(alias: str, email: str = 'other@companydomain.com',
+                         password: str = 'test1234'):
+    """Create and return a user whose rows live on a shard."""
+    user = get_user_model().objects.create_user(email, password)
+    if sharding.shard_for(user.pk) != alias:
+        resharding.move_user(user, alias, wait=lambda seconds: None)
+
+    return user
+
+
+def create_user_on_shard_of(user, email: str = 'other@companydomain.com'):
+    """Create and return a user whose rows live on the shard of another."""
+    return create_user_on_shard(sharding.shard_for(user.pk), email)
+
+
+class UserShardMixin:
+    """Test case mixin running sharded queries on the shard of a user."""
+
+    def use_shard_of(self, user):
+        """Send the sharded queries of the test to the shard of a user."""
+        shard = sharding.using_shard(sharding.shard_for(user.pk))
+        shard.__enter__()
+        self.addCleanup(shard.__exit__, None, None, None)
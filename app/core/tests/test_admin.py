@@ -1,8 +1,15 @@
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
 from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS, connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
+from core.admin import EstimatedCountPaginator
+from core.models import Recipe, Tag
+from core.tests.shards import create_user_on_shard
 
+
+@override_settings(DATABASE_SHARDS=['default'])
 class AdminSiteTests(TestCase):
 
     def setUp(self):
@@ -41,3 +48,104 @@ class AdminSiteTests(TestCase):
         res = self.client.get(url)
 
         self.assertEqual(res.status_code, 200)
+
+
+class RecipeAdminTests(TestCase):
+    multi_db = True
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(get_user_model().objects.create_superuser(
+            email='admin@companydomain.com',
+            password='test123'
+        ))
+        # The admin manages the rows of the default shard.
+        self.user = create_user_on_shard(DEFAULT_DB_ALIAS,
+                                         'test@companydomain.com')
+        self.other_user = create_user_on_shard(DEFAULT_DB_ALIAS)
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.other_tag = Tag.objects.create(user=self.other_user,
+                                            name='Vegetarian')
+        self.recipe = self.create_recipe(self.user)
+        self.recipe.tags.add(self.tag)
+
+    def create_recipe(self, user, title='Sample Recipe'):
+        """Create and return a sample recipe."""
+        return Recipe.objects.create(user=user, title=title,
+                                     time_minutes=10, price=5.00)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        """Test that recipe owners are selected with the recipes."""
+        url = reverse('admin:core_recipe_changelist')
+        with CaptureQueriesContext(connection) as single:
+            self.client.get(url)
+        for i in range(5):
+            self.create_recipe(self.other_user, f'Recipe {i}')
+
+        with CaptureQueriesContext(connection) as many:
+            res = self.client.get(url)
+
+        self.assertContains(res, 'Recipe 4')
+        self.assertEqual(len(many), len(single))
+
+    def test_change_page_renders_selected_tags_only(self):
+        """Test that the change page does not list every tag."""
+        res = self.client.get(
+            reverse('admin:core_recipe_change', args=[self.recipe.id])
+        )
+
+        self.assertContains(res, self.tag.name)
+        self.assertNotContains(res, self.other_tag.name)
+        self.assertContains(res, f'user_id={self.user.id}')
+
+    def test_change_rejects_tags_of_other_users(self):
+        """Test that a recipe cannot use tags of another user."""
+        res = self.client.post(
+            reverse('admin:core_recipe_change', args=[self.recipe.id]),
+            {'user': self.user.id, 'title': 'Sample Recipe',
+             'time_minutes': 10, 'price': '5.00', 'link': '',
+             'tags': [self.other_tag.id]}
+        )
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(list(self.recipe.tags.all()), [self.tag])
+
+    def test_autocomplete_scoped_by_user(self):
+        """Test that tag autocompletion can be limited to a user."""
+        res = self.client.get(reverse('admin:core_tag_autocomplete'),
+                              {'term': 'veg', 'user_id': self.user.id})
+
+        self.assertEqual([result['text'] for result in res.json()['results']],
+                         [self.tag.name])
+
+    def test_search_by_title_prefix(self):
+        """Test searching recipes by the start of their title."""
+        self.create_recipe(self.user, 'Lemon tart')
+
+        res = self.client.get(reverse('admin:core_recipe_changelist'),
+                              {'q': 'lemon'})
+
+        self.assertContains(res, 'Lemon tart')
+        self.assertNotContains(res, 'Sample Recipe')
+
+    @override_settings(ADMIN_ESTIMATED_COUNT_THRESHOLD=1)
+    def test_estimated_count(self):
+        """Test that large tables are counted from planner estimates."""
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE core_recipe')
+
+        with CaptureQueriesContext(connection) as queries:
+            count = EstimatedCountPaginator(Recipe.objects.all(), 10).count
+            filtered_count = EstimatedCountPaginator(
+                Recipe.objects.filter(user=self.user), 10
+            ).count
+
+        self.assertEqual(count, 1)
+        self.assertGreaterEqual(filtered_count, 1)
+        self.assertFalse(any('COUNT(' in query['sql'] for query in queries))
+
+    def test_exact_count_below_threshold(self):
+        """Test that small tables are counted exactly."""
+        count = EstimatedCountPaginator(Recipe.objects.all(), 10).count
+
+        self.assertEqual(count, 1)
@@ -0,0 +1,108 @@
+import json
+import subprocess
+import sys
+import tempfile
+from io import StringIO
+from unittest.mock import Mock, patch
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from core import coldstart
+from core.management.commands.wait_for_db import Command as WaitForDb
+from core.preload import preload
+
+
+IMPORTTIME_OUTPUT = '''import time: self [us] | cumulative | imported package
+import time:       120 |        120 |     django.utils
+import time:       300 |        420 |   django
+import time:      1000 |       1000 | PIL.Image
+some other output
+'''
+
+
+class ColdStartTests(SimpleTestCase):
+
+    def test_parse_importtime(self):
+        """Test parsing the import times reported by the interpreter."""
+        modules = coldstart.parse_importtime(IMPORTTIME_OUTPUT)
+
+        self.assertEqual(modules, [
+            ('django.utils', 120, 120),
+            ('django', 300, 420),
+            ('PIL.Image', 1000, 1000),
+        ])
+
+    def test_summarize_by_package(self):
+        """Test that import times are added up by top level package."""
+        summary = coldstart.summarize(
+            coldstart.parse_importtime(IMPORTTIME_OUTPUT), top=1
+        )
+
+        self.assertEqual(summary['modules'], 3)
+        self.assertEqual(summary['import_ms'], 1.42)
+        self.assertEqual(summary['packages'], {'PIL': 1.0})
+
+    def test_setup_skips_heavy_modules(self):
+        """Test that loading the apps leaves the views and Pillow out."""
+        script = ('import django, json, sys; django.setup(); '
+                  'print(json.dumps(sorted(sys.modules)))')
+        process = subprocess.run(
+            [sys.executable, '-c', script], stdout=subprocess.PIPE,
+            check=True, cwd=settings.BASE_DIR, universal_newlines=True
+        )
+        modules = json.loads(process.stdout)
+
+        for module in ('PIL', 'botocore', 'recipe.views',
+                       'rest_framework.views'):
+            self.assertNotIn(module, modules)
+
+    def test_wait_for_db_skips_checks(self):
+        """Test that waiting for the database does not run the checks."""
+        self.assertFalse(WaitForDb.requires_system_checks)
+
+    def test_preload(self):
+        """Test that preloading imports the modules and closes connections."""
+        with patch('core.preload.import_module') as import_module, \
+                patch('core.preload.connections') as connections:
+            preload()
+
+        self.assertEqual([call[0][0] for call in import_module.call_args_list],
+                         settings.PRELOAD_MODULES)
+        connections.close_all.assert_called_once_with()
+
+    @patch('core.coldstart.subprocess.run')
+    def test_profile_startup_writes_results(self, run):
+        """Test the profile command times commands and first requests."""
+        run.side_effect = [
+            Mock(returncode=0, stderr=IMPORTTIME_OUTPUT,
+                 stdout='Database available!\n{"run_ms": 12.345}\n'),
+            Mock(returncode=0, stderr=IMPORTTIME_OUTPUT,
+                 stdout='{"boot_ms": 20.0, "first_request_ms": 5.5}\n'),
+        ]
+
+        with tempfile.NamedTemporaryFile(suffix='.json') as output:
+            call_command('profile_startup', output=output.name,
+                         stdout=StringIO())
+            results = json.load(output)
+
+        self.assertEqual(set(results), {'command wait_for_db',
+                                        'request /api/recipe/recipes/'})
+        command = results['command wait_for_db']
+        self.assertEqual(command['run_ms'], 12.35)
+        self.assertEqual(command['modules'], 3)
+        self.assertEqual(command['packages'], {'PIL': 1.0, 'django': 0.42})
+        self.assertEqual(
+            results['request /api/recipe/recipes/']['first_request_ms'], 5.5
+        )
+        self.assertEqual(run.call_args_list[0][0][0][-1], 'wait_for_db')
+
+    @patch('core.coldstart.subprocess.run')
+    def test_profile_failure(self, run):
+        """Test that a failing entry point reports its last error line."""
+        run.return_value = Mock(returncode=1, stdout='',
+                                stderr='Traceback\nImportError: boom\n')
+
+        with self.assertRaisesMessage(RuntimeError, 'ImportError: boom'):
+            coldstart.profile('command', 'wait_for_db')
@@ -1,10 +1,24 @@
+import json
+import tempfile
+from io import StringIO
 from unittest.mock import patch
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.db.utils import OperationalError
 from django.test import TestCase
 
+from core import sharding
+from core.models import Recipe
+
+
+def count_recipes() -> int:
+    """Count the recipes of every shard."""
+    return sum(Recipe.objects.using(alias).count()
+               for alias in sharding.shards())
+
 
 class CommandTests(TestCase):
+    multi_db = True
 
     def test_wait_for_db_ready(self):
         """Test waiting for db when db is available."""
@@ -20,3 +34,77 @@ class CommandTests(TestCase):
             gi.side_effect = [OperationalError] * 5 + [True]
             call_command('wait_for_db')
             self.assertEqual(gi.call_count, 6)
+
+    def test_benchmark_writes_results(self):
+        """Test the benchmark suite stores results for every scenario."""
+        with tempfile.NamedTemporaryFile(suffix='.json') as output:
+            call_command('benchmark', sizes=[3], iterations=2,
+                         output=output.name, stdout=StringIO())
+            results = json.load(output)
+
+        self.assertIn('recipe_list_queryset[3]', results)
+        self.assertIn('token_authentication[3]', results)
+        self.assertEqual(results['recipe_list_queryset[3]']['queries'], 1)
+        self.assertEqual(
+            set(results['recipe_list_api[3]']),
+            {'ops_per_sec', 'p50_ms', 'p99_ms', 'queries'}
+        )
+
+    def test_benchmark_fails_on_regression(self):
+        """Test the benchmark fails when slower than the baseline."""
+        baseline = {'recipe_list_queryset[3]': {
+            'ops_per_sec': 1e9, 'p50_ms': 0, 'p99_ms': 0, 'queries': 0
+        }}
+        with tempfile.NamedTemporaryFile('w', suffix='.json') as file:
+            json.dump(baseline, file)
+            file.flush()
+            with self.assertRaises(CommandError):
+                call_command('benchmark', scenarios=['recipe_list_queryset'],
+                             sizes=[3], iterations=2, baseline=file.name,
+                             stdout=StringIO())
+
+    def test_seed(self):
+        """Test seeding the database with synthetic recipes."""
+        out = StringIO()
+        call_command('seed', users=2, recipes_per_user=3, tags_per_user=2,
+                     ingredients_per_user=4, stdout=out)
+
+        self.assertEqual(count_recipes(), 6)
+        self.assertIn('rows per minute', out.getvalue())
+
+    def test_seed_twice_with_same_seed(self):
+        """Test that seeding twice with the same seed is refused."""
+        call_command('seed', users=1, recipes_per_user=1, stdout=StringIO())
+
+        with self.assertRaises(CommandError):
+            call_command('seed', users=1, recipes_per_user=1,
+                         stdout=StringIO())
+
+    def test_delete_user(self):
+        """Test deleting a user and its recipes."""
+        call_command('seed', users=1, recipes_per_user=3, stdout=StringIO())
+        out = StringIO()
+        call_command('delete_user', 'user0@seed0.example.com', stdout=out)
+
+        self.assertEqual(count_recipes(), 0)
+        self.assertIn('recipes: 3', out.getvalue())
+
+    def test_delete_missing_user(self):
+        """Test deleting a user that does not exist fails."""
+        with self.assertRaises(CommandError):
+            call_command('delete_user', 'missing@companydomain.com')
+
+    def test_rebuild_recipe_stats(self):
+        """Test rebuilding and checking the recipe stats."""
+        call_command('seed', users=2, recipes_per_user=3, stdout=StringIO())
+        for alias in sharding.shards():
+            Recipe.objects.using(alias).update(time_minutes=1)
+
+        with self.assertRaises(CommandError):
+            call_command('rebuild_recipe_stats', check=True,
+                         stdout=StringIO())
+        call_command('rebuild_recipe_stats', stdout=StringIO())
+        out = StringIO()
+        call_command('rebuild_recipe_stats', check=True, stdout=out)
+
+        self.assertIn('valid', out.getvalue())
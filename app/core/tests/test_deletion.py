@@ -0,0 +1,99 @@
+import os
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.test import TestCase, TransactionTestCase
+
+from core import deletion, sharding
+from core.models import Ingredient, Recipe, Tag
+from core.tests.shards import create_user_on_shard_of, UserShardMixin
+
+
+def create_user(email='test@companydomain.com'):
+    """Create and return a sample user."""
+    return get_user_model().objects.create_user(email, 'test1234')
+
+
+def create_recipe(user, tag=None, ingredient=None):
+    """Create and return a sample recipe linked to a tag and ingredient."""
+    recipe = Recipe.objects.create(user=user, title='Sample Recipe',
+                                   time_minutes=10, price=5.00)
+    if tag:
+        recipe.tags.add(tag)
+    if ingredient:
+        recipe.ingredients.add(ingredient)
+
+    return recipe
+
+
+class DeletionTests(UserShardMixin, TestCase):
+    multi_db = True
+
+    def setUp(self):
+        self.user = create_user()
+        self.use_shard_of(self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.ingredient = Ingredient.objects.create(user=self.user,
+                                                    name='Salt')
+
+    def test_delete_recipes_in_batches(self):
+        """Test that recipes and their links are deleted in batches."""
+        for _ in range(5):
+            create_recipe(self.user, self.tag, self.ingredient)
+        other_recipe = create_recipe(create_user_on_shard_of(self.user))
+
+        deleted = deletion.delete_recipes(
+            Recipe.objects.filter(user=self.user),
+            batch_size=2
+        )
+
+        self.assertEqual(deleted, 5)
+        self.assertEqual(list(Recipe.objects.all()), [other_recipe])
+        self.assertFalse(Recipe.tags.through.objects.exists())
+        self.assertFalse(Recipe.ingredients.through.objects.exists())
+
+    def test_delete_user(self):
+        """Test that a user is deleted with everything it owns."""
+        create_recipe(self.user, self.tag, self.ingredient)
+        other_recipe = create_recipe(create_user_on_shard_of(self.user),
+                                     self.tag, self.ingredient)
+
+        counts = deletion.delete_user(self.user, batch_size=1)
+
+        self.assertEqual(counts, {'recipes': 1, 'tags': 1, 'ingredients': 1,
+                                  'users': 1})
+        self.assertFalse(
+            get_user_model().objects.filter(pk=self.user.pk).exists()
+        )
+        self.assertFalse(Tag.objects.exists())
+        self.assertFalse(Ingredient.objects.exists())
+        self.assertEqual(list(Recipe.objects.all()), [other_recipe])
+
+
+class ImageDeletionTests(TransactionTestCase):
+    multi_db = True
+
+    def test_images_removed_after_commit(self):
+        """Test that recipe images are removed in the background."""
+        user = create_user()
+        recipe = create_recipe(user)
+        recipe.image.save('image.jpg', ContentFile(b'image'))
+        path = recipe.image.path
+
+        with sharding.using_shard(sharding.shard_for(user.pk)):
+            deletion.delete_recipes(Recipe.objects.all())
+        deletion.wait_for_file_removal()
+
+        self.assertFalse(os.path.exists(path))
+
+    def test_storage_errors_do_not_stop_removal(self):
+        """Test that files are still removed after the storage fails."""
+        with patch('core.deletion.default_storage') as storage:
+            storage.delete.side_effect = [RuntimeError('S3 is down'), None]
+            with self.assertLogs('core.deletion', level='WARNING'):
+                deletion.queue_file_removal(['broken.jpg'])
+                deletion.queue_file_removal(['image.jpg'])
+                deletion.wait_for_file_removal()
+
+        self.assertEqual(storage.delete.call_count, 2)
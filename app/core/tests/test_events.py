@@ -0,0 +1,163 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from core import events, sharding, sync
+from core.models import Recipe, SyncChange
+from core.tests.shards import UserShardMixin
+
+
+def create_user(email='test@companydomain.com'):
+    """Create and return a user."""
+    return get_user_model().objects.create_user(email, 'test1234')
+
+
+def create_recipe(user, **params):
+    """Create and return a recipe."""
+    return Recipe.objects.create(user=user, title='Sample Recipe',
+                                 time_minutes=10, price=5.00, **params)
+
+
+class EventStreamTests(UserShardMixin, TestCase):
+    multi_db = True
+
+    def setUp(self):
+        self.broker = events.Broker(poll_interval=0.1)
+        patcher = patch('core.events.broker', self.broker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.broker.stop)
+        self.user = create_user()
+        self.use_shard_of(self.user)
+
+    def test_stream_starts_with_cursor(self):
+        """Test that streams start with the current sync cursor."""
+        recipe = create_recipe(self.user)
+        cursor = sync.last_sequence(self.user)
+
+        first = next(events.stream(self.user))
+
+        self.assertTrue(first.startswith('retry: '))
+        self.assertIn(f'id: {cursor}\nevent: ready\n', first)
+        self.assertEqual(
+            cursor,
+            SyncChange.objects.get(object_id=recipe.id).sequence
+        )
+
+    def test_replay_after_last_event_id(self):
+        """Test that changes after the Last-Event-ID are replayed."""
+        create_recipe(self.user)
+        cursor = sync.last_sequence(self.user)
+        recipe = create_recipe(self.user)
+        sequence = sync.last_sequence(self.user)
+
+        stream = events.stream(self.user, last_event_id=cursor)
+
+        self.assertIn(f'id: {cursor}\nevent: ready\n', next(stream))
+        self.assertEqual(
+            next(stream),
+            f'id: {sequence}\nevent: updated\n'
+            f'data: {{"kind":"recipe","id":{recipe.id}}}\n\n'
+        )
+
+    @override_settings(EVENT_HEARTBEAT=0.01)
+    def test_live_events_and_heartbeat(self):
+        """Test that published events are sent once, with heartbeats."""
+        stream = events.stream(self.user)
+        cursor = sync.last_sequence(self.user)
+        next(stream)
+        self.assertTrue(self.broker.listening.wait(5))
+
+        self.assertEqual(next(stream), ': heartbeat\n\n')
+        for sequence in (cursor, cursor + 1):
+            self.broker.publish({'user': self.user.id, 'kind': 'tag',
+                                 'id': 7, 'sequence': sequence,
+                                 'action': 'created'})
+        self.broker.publish({'user': self.user.id + 1, 'kind': 'tag',
+                             'id': 8, 'sequence': cursor + 2,
+                             'action': 'created'})
+
+        self.assertEqual(
+            next(stream),
+            f'id: {cursor + 1}\nevent: created\n'
+            f'data: {{"kind":"tag","id":7}}\n\n'
+        )
+        self.assertEqual(next(stream), ': heartbeat\n\n')
+
+    @override_settings(EVENT_QUEUE_SIZE=1)
+    def test_overflow_catches_up_from_sync_log(self):
+        """Test that a stream falling behind replays the sync log."""
+        stream = events.stream(self.user)
+        next(stream)
+        recipes = [create_recipe(self.user) for _ in range(2)]
+        changes = list(SyncChange.objects.filter(
+            kind=SyncChange.RECIPE
+        ).order_by('sequence').values_list('object_id', 'sequence'))
+        for object_id, sequence in changes:
+            self.broker.publish({'user': self.user.id, 'kind': 'recipe',
+                                 'id': object_id, 'sequence': sequence,
+                                 'action': 'created'})
+
+        self.assertEqual(
+            [next(stream) for _ in recipes],
+            [f'id: {sequence}\nevent: updated\n'
+             f'data: {{"kind":"recipe","id":{object_id}}}\n\n'
+             for object_id, sequence in changes]
+        )
+
+    @override_settings(EVENT_STREAM_MAX_SECONDS=0)
+    def test_stream_ends(self):
+        """Test that streams end after their maximum duration."""
+        stream = list(events.stream(self.user))
+
+        self.assertEqual(len(stream), 1)
+        self.assertEqual(self.broker._subscriptions, {})
+
+
+class EventBrokerTests(TransactionTestCase):
+    multi_db = True
+
+    def setUp(self):
+        self.broker = events.Broker(poll_interval=0.1)
+        patcher = patch('core.events.broker', self.broker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.broker.stop)
+
+    @override_settings(EVENT_HEARTBEAT=0.01)
+    def test_committed_changes_are_streamed(self):
+        """Test that committed changes reach the streams of their user."""
+        user = create_user()
+        other_user = create_user('other@companydomain.com')
+        stream = events.stream(user)
+        next(stream)
+        self.assertTrue(self.broker.listening.wait(5))
+        self.assertEqual(next(stream), ': heartbeat\n\n')
+
+        create_recipe(other_user)
+        recipe = create_recipe(user)
+        with sharding.using_shard(sharding.shard_for(user.pk)):
+            sequence = sync.last_sequence(user)
+
+        self.assertEqual(
+            next(event for event in stream if event.startswith('id:')),
+            f'id: {sequence}\nevent: created\n'
+            f'data: {{"kind":"recipe","id":{recipe.id}}}\n\n'
+        )
+
+    @override_settings(EVENT_HEARTBEAT=0.01)
+    def test_stream_releases_connection(self):
+        """Test that streams close their connection between queries."""
+        user = create_user()
+        create_recipe(user)
+        stream = events.stream(user, last_event_id=0)
+        connection = connections[sharding.shard_for(user.pk)]
+
+        next(stream)
+        self.assertIsNone(connection.connection)
+        self.assertIn('event: updated', next(stream))
+        self.assertEqual(next(stream), ': heartbeat\n\n')
+        self.assertIsNone(connection.connection)
+        stream.close()
@@ -0,0 +1,40 @@
+from django.test import LiveServerTestCase
+
+from core import loadtest
+from core.throttling import get_counter_store
+
+
+class LoadTestTests(LiveServerTestCase):
+    multi_db = True
+
+    def setUp(self):
+        get_counter_store().clear()
+
+    def test_scenario_runs_against_live_server(self):
+        """Test the scripted sessions succeed against a running server."""
+        report = loadtest.run(self.live_server_url, users=2, concurrency=2,
+                              recipes=2)
+
+        self.assertEqual(report['failed_sessions'], 0, report['failures'])
+        endpoints = report['endpoints']
+        self.assertEqual(endpoints['POST /api/recipe/recipes/']['requests'],
+                         4)
+        self.assertEqual(
+            endpoints['POST /api/recipe/recipes/<id>/upload-image/']
+            ['errors'],
+            0
+        )
+        for summary in endpoints.values():
+            self.assertEqual(summary['error_rate'], 0)
+            self.assertIn('p99_ms', summary)
+
+    def test_failed_session_reported(self):
+        """Test that a session failing to connect is reported."""
+        report = loadtest.run('http://127.0.0.1:1', users=1, concurrency=1,
+                              recipes=1)
+
+        self.assertEqual(report['failed_sessions'], 1)
+        self.assertEqual(
+            report['endpoints']['POST /api/user/create/']['error_rate'],
+            1
+        )
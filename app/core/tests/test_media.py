@@ -0,0 +1,174 @@
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from core import media
+from core.models import Recipe
+
+from recipe import renditions
+
+
+def media_url(name):
+    """Return the URL of a media file."""
+    return reverse('media', args=[name])
+
+
+class ParseRangeTests(SimpleTestCase):
+
+    def test_parse_range(self):
+        """Test parsing single byte ranges."""
+        self.assertEqual(media.parse_range('bytes=0-9', 100), (0, 10))
+        self.assertEqual(media.parse_range('bytes=90-', 100), (90, 10))
+        self.assertEqual(media.parse_range('bytes=-10', 100), (90, 10))
+        self.assertEqual(media.parse_range('bytes=95-200', 100), (95, 5))
+        self.assertIsNone(media.parse_range('bytes=0-1,5-9', 100))
+        self.assertIsNone(media.parse_range('items=0-9', 100))
+
+    def test_unsatisfiable_range(self):
+        """Test that ranges outside of the file are rejected."""
+        for header in ('bytes=100-', 'bytes=9-5', 'bytes=-0'):
+            with self.assertRaises(ValueError):
+                media.parse_range(header, 100)
+
+
+class ServeMediaTests(TestCase):
+    multi_db = True
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        settings_override = override_settings(MEDIA_ROOT=self.root,
+                                              MEDIA_SENDFILE='')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.content = bytes(range(256)) * 4
+        user = get_user_model().objects.create_user(
+            'test@companydomain.com',
+            'test1234'
+        )
+        self.recipe = Recipe.objects.create(user=user, title='Sample Recipe',
+                                            time_minutes=10, price=5.00)
+        self.recipe.image.save('image.jpg', ContentFile(self.content))
+        self.url = media_url(self.recipe.image.name)
+
+    def test_serve_recipe_image(self):
+        """Test serving a recipe image with caching headers."""
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(b''.join(res.streaming_content), self.content)
+        self.assertEqual(res['Content-Type'], 'image/jpeg')
+        self.assertEqual(res['Content-Length'], str(len(self.content)))
+        self.assertEqual(res['Accept-Ranges'], 'bytes')
+        self.assertFalse(res['ETag'].startswith('W/'))
+        self.assertIn('immutable', res['Cache-Control'])
+
+    def test_not_modified(self):
+        """Test that a matching ETag gets an empty response."""
+        etag = self.client.get(self.url)['ETag']
+
+        res = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, 304)
+
+    def test_range_request(self):
+        """Test serving part of a file."""
+        res = self.client.get(self.url, HTTP_RANGE='bytes=10-19')
+
+        self.assertEqual(res.status_code, 206)
+        self.assertEqual(b''.join(res.streaming_content), self.content[10:20])
+        self.assertEqual(res['Content-Length'], '10')
+        self.assertEqual(res['Content-Range'],
+                         f'bytes 10-19/{len(self.content)}')
+
+    def test_range_with_stale_if_range(self):
+        """Test that the whole file is sent when If-Range does not match."""
+        res = self.client.get(self.url, HTTP_RANGE='bytes=10-19',
+                              HTTP_IF_RANGE='"stale"')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(b''.join(res.streaming_content), self.content)
+
+    def test_unsatisfiable_range(self):
+        """Test that a range past the end of the file is rejected."""
+        res = self.client.get(self.url, HTTP_RANGE='bytes=5000-')
+
+        self.assertEqual(res.status_code, 416)
+        self.assertEqual(res['Content-Range'], f'bytes */{len(self.content)}')
+
+    def test_orphan_image_not_served(self):
+        """Test that images no recipe uses are not served."""
+        name = FileSystemStorage(self.root).save(
+            'uploads/recipe/orphan.jpg', ContentFile(b'image')
+        )
+
+        res = self.client.get(media_url(name))
+
+        self.assertEqual(res.status_code, 404)
+
+    def test_other_files_not_served(self):
+        """Test that files outside the known media prefixes are denied."""
+        name = FileSystemStorage(self.root).save('notes.txt',
+                                                 ContentFile(b'notes'))
+
+        res = self.client.get(media_url(name))
+
+        self.assertEqual(res.status_code, 404)
+
+    def test_serve_rendition(self):
+        """Test that renditions of the current recipe image are served."""
+        storage = FileSystemStorage(self.root)
+        source = renditions.source_hash(self.recipe.image.name)
+        current = storage.save(
+            f'renditions/{self.recipe.id}/{source}-160x160.jpg',
+            ContentFile(b'rendition')
+        )
+        stale = storage.save(
+            f'renditions/{self.recipe.id}/{"0" * 16}-160x160.jpg',
+            ContentFile(b'rendition')
+        )
+
+        with override_settings(
+            IMAGE_RENDITION_ROOT=os.path.join(self.root, 'renditions')
+        ):
+            self.assertEqual(self.client.get(media_url(current)).status_code,
+                             200)
+            self.assertEqual(self.client.get(media_url(stale)).status_code,
+                             404)
+
+    def test_path_outside_media_root(self):
+        """Test that paths leaving the media root are not found."""
+        with open(os.path.join(self.root, '..', 'secret.txt'), 'w'):
+            pass
+        self.addCleanup(os.remove, os.path.join(self.root, '..',
+                                                'secret.txt'))
+
+        res = self.client.get(f'{media_url("x")[:-1]}%2E%2E/secret.txt')
+
+        self.assertEqual(res.status_code, 404)
+
+    @override_settings(MEDIA_SENDFILE='x-accel-redirect',
+                       MEDIA_SENDFILE_PREFIX='/protected/')
+    def test_x_accel_redirect(self):
+        """Test offloading the file to nginx."""
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.content, b'')
+        self.assertEqual(res['X-Accel-Redirect'],
+                         f'/protected/{self.recipe.image.name}')
+        self.assertNotIn('Content-Type', res)
+
+    @override_settings(MEDIA_SENDFILE='x-sendfile')
+    def test_x_sendfile(self):
+        """Test offloading the file to Apache."""
+        res = self.client.get(self.url)
+
+        self.assertEqual(res['X-Sendfile'], self.recipe.image.path)
@@ -0,0 +1,50 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.tests.shards import UserShardMixin
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+@override_settings(REQUEST_TIMING=True)
+class ServerTimingMiddlewareTests(UserShardMixin, TestCase):
+    multi_db = True
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@companydomain.com',
+            'test1234'
+        )
+        self.client.force_authenticate(self.user)
+        self.use_shard_of(self.user)
+
+    def test_server_timing_header(self):
+        """Test that request timings are returned in a header."""
+        res = self.client.get(RECIPES_URL)
+
+        timing = res['Server-Timing']
+        self.assertIn('db;dur=', timing)
+        self.assertIn('desc="1 queries"', timing)
+        self.assertIn('serialize;dur=', timing)
+        self.assertIn('render;dur=', timing)
+        self.assertIn('total;dur=', timing)
+
+    def test_timings_logged_with_view_and_action(self):
+        """Test that request timings are logged with the view action."""
+        with self.assertLogs('core.middleware', 'INFO') as logs:
+            self.client.get(RECIPES_URL)
+
+        self.assertIn('view=RecipeViewSet action=list', logs.output[0])
+        self.assertIn('queries=1', logs.output[0])
+
+    @override_settings(REQUEST_TIMING=False)
+    def test_timing_disabled(self):
+        """Test that no header is added when timing is disabled."""
+        res = APIClient().get(RECIPES_URL)
+
+        self.assertNotIn('Server-Timing', res)
@@ -1,6 +1,6 @@
 from unittest.mock import patch
 
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
 from core import models
 
@@ -10,6 +10,7 @@ def create_sample_user(email='test@companydomain.com', password='test1234'):
     return get_user_model().objects.create_user(email, password)
 
 
+@override_settings(DATABASE_SHARDS=['default'])
 class ModelTests(TestCase):
 
     def test_create_user_with_email_successful(self):
@@ -0,0 +1,244 @@
+from io import StringIO
+from unittest.mock import Mock, patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import NotSupportedError, OperationalError, connection, \
+    models, transaction
+from django.db.migrations.loader import MigrationLoader
+from django.db.migrations.operations import AddField
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from core import migration_locks, partitioning
+from core.models import Tag
+from core.operations import AddIndexConcurrently, BackfillField, \
+    LockTimeoutRetry
+
+
+def project_state():
+    """Return the state of the models after every migration."""
+    return MigrationLoader(connection).project_state()
+
+
+def index_validity(name: str) -> list:
+    """Return whether an index and each index attached to it are valid."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT i.indisvalid FROM pg_index i '
+            'WHERE i.indexrelid = to_regclass(%s) OR i.indexrelid IN ('
+            '    SELECT inhrelid FROM pg_inherits '
+            '    WHERE inhparent = to_regclass(%s))',
+            [name, name]
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def lock_timeout_error():
+    """Return the error of a statement cancelled by lock_timeout."""
+    cause = Exception('canceling statement due to lock timeout')
+    cause.pgcode = '55P03'
+    error = OperationalError(*cause.args)
+    error.__cause__ = cause
+    return error
+
+
+@override_settings(DATABASE_SHARDS=['default'])
+class OnlineOperationTests(TransactionTestCase):
+
+    def apply(self, *operations, backwards=False):
+        """Run operations on the current models, outside transactions."""
+        state = project_state()
+        with connection.schema_editor(atomic=False) as editor:
+            for operation in operations:
+                from_state, state = state, state.clone()
+                operation.state_forwards('core', state)
+                if backwards:
+                    operation.database_backwards('core', editor, state,
+                                                 from_state)
+                else:
+                    operation.database_forwards('core', editor, from_state,
+                                                state)
+
+    def test_add_index_concurrently(self):
+        """Test creating and dropping an index concurrently."""
+        operation = AddIndexConcurrently(
+            'tag', models.Index(fields=['name'], name='core_tag_name_test')
+        )
+
+        self.apply(operation)
+        self.assertEqual(index_validity('core_tag_name_test'), [True])
+
+        self.apply(operation, backwards=True)
+        self.assertEqual(index_validity('core_tag_name_test'), [])
+
+    def test_add_index_concurrently_to_partitions(self):
+        """Test that partitioned tables get a valid index per partition."""
+        operation = AddIndexConcurrently(
+            'recipe',
+            models.Index(fields=['title'], name='core_recipe_title_test')
+        )
+        with connection.cursor() as cursor:
+            partitions = partitioning.partition_count(cursor, 'core_recipe')
+
+        self.apply(operation)
+        validity = index_validity('core_recipe_title_test')
+        self.assertEqual(validity, [True] * (partitions + 1))
+
+        self.apply(operation, backwards=True)
+        self.assertEqual(index_validity('core_recipe_title_test'), [])
+
+    def test_add_index_concurrently_in_transaction(self):
+        """Test that concurrent indexes refuse to run in a transaction."""
+        operation = AddIndexConcurrently(
+            'tag', models.Index(fields=['name'], name='core_tag_name_test')
+        )
+
+        with self.assertRaises(NotSupportedError), transaction.atomic():
+            self.apply(operation)
+
+    def test_add_field_and_backfill(self):
+        """Test adding a nullable column, then filling it in batches."""
+        user = get_user_model().objects.create_user(
+            'test@companydomain.com',
+            'test1234'
+        )
+        for name in ('Vegan', 'Dessert', 'Quick'):
+            Tag.objects.create(user=user, name=name)
+        add_field = LockTimeoutRetry(AddField(
+            'tag', 'slug', models.CharField(max_length=255, null=True)
+        ))
+        backfill = BackfillField('tag', 'slug', 'lower(name)', batch_size=1)
+
+        self.apply(add_field, backfill)
+        self.addCleanup(self.apply, add_field, backwards=True)
+
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT name, slug FROM core_tag')
+            for name, slug in cursor.fetchall():
+                self.assertEqual(slug, name.lower())
+
+
+class LockTimeoutRetryTests(TestCase):
+
+    def setUp(self):
+        self.operation = Mock(reversible=True)
+        self.retry = LockTimeoutRetry(self.operation, attempts=2, pause=0)
+
+    def run_retry(self, collect_sql=False):
+        """Run the retried operation forwards."""
+        with connection.schema_editor(collect_sql=collect_sql) as editor:
+            self.retry.database_forwards('core', editor, None, None)
+        return editor
+
+    def test_retried_on_lock_timeout(self):
+        """Test that operations timing out on a lock run again."""
+        self.operation.database_forwards.side_effect = [
+            lock_timeout_error(), None
+        ]
+
+        self.run_retry()
+
+        self.assertEqual(self.operation.database_forwards.call_count, 2)
+
+    def test_gives_up_after_attempts(self):
+        """Test that the lock timeout error is raised after the attempts."""
+        self.operation.database_forwards.side_effect = lock_timeout_error()
+
+        with self.assertRaises(OperationalError):
+            self.run_retry()
+        self.assertEqual(self.operation.database_forwards.call_count, 2)
+
+    def test_other_errors_not_retried(self):
+        """Test that errors other than lock timeouts are raised at once."""
+        self.operation.database_forwards.side_effect = OperationalError()
+
+        with self.assertRaises(OperationalError):
+            self.run_retry()
+        self.assertEqual(self.operation.database_forwards.call_count, 1)
+
+    def test_collected_sql_sets_lock_timeout(self):
+        """Test that the collected statements set and reset the timeout."""
+        editor = self.run_retry(collect_sql=True)
+
+        self.assertEqual(editor.collected_sql, [
+            "SET LOCAL lock_timeout = '2s';",
+            'SET LOCAL lock_timeout TO DEFAULT;',
+        ])
+
+
+class MigrationLockTests(TestCase):
+
+    def test_statement_lock(self):
+        """Test the locks found for the statements of migrations."""
+        cases = {
+            'CREATE INDEX "a" ON "core_recipe" ("title");':
+                ('core_recipe', 'SHARE', True),
+            'CREATE INDEX CONCURRENTLY "a" ON "core_recipe" ("title");':
+                ('core_recipe', 'SHARE UPDATE EXCLUSIVE', True),
+            'ALTER TABLE "core_tag" ADD COLUMN "slug" varchar(255) NULL;':
+                ('core_tag', 'ACCESS EXCLUSIVE', False),
+            'ALTER TABLE "core_tag" ALTER COLUMN "name" TYPE text;':
+                ('core_tag', 'ACCESS EXCLUSIVE', True),
+            'ALTER TABLE "core_tag" ADD CONSTRAINT "a" UNIQUE USING INDEX '
+            '"a";':
+                ('core_tag', 'ACCESS EXCLUSIVE', False),
+            'ALTER TABLE "core_tag" ADD CONSTRAINT "a" FOREIGN KEY ("b") '
+            'REFERENCES "core_user" ("id");':
+                ('core_tag', 'SHARE ROW EXCLUSIVE', True),
+            'CREATE TABLE "core_new" ("id" serial NOT NULL PRIMARY KEY);':
+                None,
+        }
+
+        for statement, expected in cases.items():
+            self.assertEqual(migration_locks.statement_lock(statement),
+                             expected)
+
+    def test_guarded_statements(self):
+        """Test that short locks under a lock timeout do not block."""
+        findings = migration_locks._statement_findings('core.0015', [
+            "SET LOCAL lock_timeout = '2s';",
+            'ALTER TABLE "core_tag" ADD COLUMN "slug" varchar(255) NULL;',
+            'SET LOCAL lock_timeout TO DEFAULT;',
+            'ALTER TABLE "core_tag" ADD COLUMN "code" varchar(255) NULL;',
+            '--',
+            migration_locks.NOT_SQL,
+            '-- Raw Python operation',
+        ], lambda table: 10)
+
+        self.assertEqual([finding.guarded for finding in findings],
+                         [True, False, False])
+        self.assertEqual([migration_locks.is_blocking(finding)
+                          for finding in findings], [False, True, False])
+        self.assertEqual(findings[2].statement, 'Raw Python operation')
+
+    def test_check_migration_locks(self):
+        """Test that no statements are reported without pending
+        migrations.
+        """
+        out = StringIO()
+
+        with patch('core.migration_locks.MigrationExecutor') as executor:
+            executor.return_value.migration_plan.return_value = []
+            call_command('check_migration_locks', check=True, stdout=out)
+
+        self.assertIn('0 statements', out.getvalue())
+
+    def test_maintenance_window_reported(self):
+        """Test that migrations needing a maintenance window fail the
+        check.
+        """
+        migration = Mock(app_label='core', maintenance_window='rewrites')
+        migration.name = '0015_rewrite'
+        out = StringIO()
+
+        with patch('core.migration_locks.MigrationExecutor') as executor:
+            executor.return_value.migration_plan.return_value = [
+                (migration, False)
+            ]
+            executor.return_value.collect_sql.return_value = []
+            with self.assertRaises(CommandError):
+                call_command('check_migration_locks', check=True,
+                             stdout=out)
+
+        self.assertIn('core.0015_rewrite\n  needs a maintenance window: '
+                      'rewrites', out.getvalue())
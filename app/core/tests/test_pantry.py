@@ -0,0 +1,133 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from core import pantry, sharding
+from core.deletion import delete_ingredients, delete_recipes
+from core.models import Ingredient, Recipe, RecipeIngredientMask
+from core.tests.shards import UserShardMixin
+
+
+class PantryTests(UserShardMixin, TestCase):
+    multi_db = True
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@companydomain.com',
+            'test1234'
+        )
+        self.use_shard_of(self.user)
+        self.ingredients = [
+            Ingredient.objects.create(user=self.user, name=f'Ingredient {i}')
+            for i in range(6)
+        ]
+
+    def create_recipe(self, ingredients):
+        """Create and return a recipe with the given ingredients."""
+        recipe = Recipe.objects.create(user=self.user, title='Sample Recipe',
+                                       time_minutes=10, price=5.00)
+        recipe.ingredients.add(*ingredients)
+        return recipe
+
+    def mask(self, recipe):
+        """Return the stored mask of a recipe."""
+        return RecipeIngredientMask.objects.get(recipe=recipe).mask
+
+    def cookable(self, ingredients, max_missing=0):
+        """Return the ids and missing counts of the cookable recipes."""
+        return dict(pantry.cookable(
+            Recipe.objects.filter(user=self.user), self.user,
+            [ingredient.id for ingredient in ingredients], max_missing
+        ).values_list('id', 'missing_ingredients'))
+
+    def test_positions_are_assigned_per_user(self):
+        """Test that ingredients get consecutive positions per user."""
+        other_user = get_user_model().objects.create_user(
+            'other@companydomain.com',
+            'test1234'
+        )
+        other = Ingredient.objects.create(user=other_user, name='Salt')
+
+        self.assertEqual([ingredient.position
+                          for ingredient in self.ingredients],
+                         list(range(6)))
+        self.assertEqual(other.position, 0)
+        Ingredient.objects.bulk_create([
+            Ingredient(user=self.user, name='Pepper'),
+        ])
+        positions = pantry.assign_positions([self.user.id])
+        self.assertEqual(list(positions.values()), [6])
+
+        with sharding.using_shard(sharding.shard_for(other_user.pk)):
+            Ingredient.objects.bulk_create([
+                Ingredient(user=other_user, name='Pepper'),
+            ])
+            self.assertEqual(list(pantry.assign_positions().values()), [1])
+
+    def test_mask_follows_ingredients(self):
+        """Test that masks are updated when ingredients change."""
+        recipe = self.create_recipe([self.ingredients[0],
+                                     self.ingredients[2]])
+        self.assertEqual(self.mask(recipe), '101')
+
+        self.ingredients[4].recipe_set.add(recipe)
+        self.assertEqual(self.mask(recipe), '10101')
+
+        recipe.ingredients.remove(self.ingredients[4])
+        self.assertEqual(self.mask(recipe), '101')
+
+        recipe.ingredients.clear()
+        self.assertFalse(RecipeIngredientMask.objects.filter(recipe=recipe)
+                         .exists())
+
+    def test_cookable_recipes(self):
+        """Test that only recipes covered by the ingredients match."""
+        covered = self.create_recipe(self.ingredients[:2])
+        exact = self.create_recipe(self.ingredients[:3])
+        missing_one = self.create_recipe(self.ingredients[1:4])
+        missing_two = self.create_recipe(self.ingredients[2:5])
+        self.create_recipe([])
+
+        self.assertEqual(self.cookable(self.ingredients[:3]),
+                         {covered.id: 0, exact.id: 0})
+        self.assertEqual(
+            self.cookable(self.ingredients[:3], max_missing=1),
+            {covered.id: 0, exact.id: 0, missing_one.id: 1}
+        )
+        self.assertEqual(self.cookable([self.ingredients[5]], 3),
+                         {covered.id: 2, exact.id: 3, missing_one.id: 3,
+                          missing_two.id: 3})
+
+    def test_other_users_ingredients_ignored(self):
+        """Test that ingredients of other users are not in the pantry."""
+        recipe = self.create_recipe(self.ingredients[:1])
+        other_user = get_user_model().objects.create_user(
+            'other@companydomain.com',
+            'test1234'
+        )
+        other = Ingredient.objects.create(user=other_user, name='Salt')
+
+        self.assertEqual(self.cookable([other]), {})
+        self.assertEqual(self.cookable([other], 1), {recipe.id: 1})
+
+    def test_deleted_ingredients_and_recipes(self):
+        """Test that deletions keep the masks consistent."""
+        recipe = self.create_recipe(self.ingredients[:3])
+        self.ingredients[2].delete()
+        self.assertEqual(self.mask(recipe), '11')
+
+        delete_ingredients(Ingredient.objects.filter(
+            pk=self.ingredients[1].pk
+        ))
+        self.assertEqual(self.mask(recipe), '1')
+
+        delete_recipes(Recipe.objects.all())
+        self.assertFalse(RecipeIngredientMask.objects.exists())
+
+    def test_rebuild(self):
+        """Test rebuilding every mask and missing position."""
+        recipe = self.create_recipe(self.ingredients[1:3])
+        RecipeIngredientMask.objects.all().delete()
+
+        pantry.rebuild()
+
+        self.assertEqual(self.mask(recipe), '011')
@@ -0,0 +1,114 @@
+import json
+import tempfile
+from importlib import import_module
+from io import StringIO
+from unittest import skipUnless
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from core import partitioning
+from core.admin import table_estimate
+from core.models import Ingredient, Recipe, Tag
+
+
+migration = import_module('core.migrations.0014_partition_recipes')
+
+TABLES = ('core_recipe', 'core_recipe_tags', 'core_recipe_ingredients')
+
+
+def explain(queryset) -> str:
+    """Return the plan of a queryset."""
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN {sql}', params)
+        return '\n'.join(row[0] for row in cursor.fetchall())
+
+
+@skipUnless(partitioning.is_supported(),
+            'The database server cannot hash partition tables.')
+@override_settings(DATABASE_SHARDS=['default'])
+class PartitioningTests(TestCase):
+    multi_db = True
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@companydomain.com',
+            'test1234'
+        )
+        self.recipe = Recipe.objects.create(user=self.user, title='Soup',
+                                            time_minutes=10, price=5)
+        self.recipe.tags.add(Tag.objects.create(user=self.user,
+                                                name='Vegan'))
+        self.recipe.ingredients.add(Ingredient.objects.create(user=self.user,
+                                                              name='Kale'))
+
+    def test_tables_partitioned(self):
+        """Test that the recipes and their links are hash partitioned."""
+        with connection.cursor() as cursor:
+            for table in TABLES:
+                self.assertEqual(partitioning.partition_count(cursor, table),
+                                 16)
+
+    def test_user_recipes_read_one_partition(self):
+        """Test that listing the recipes of a user reads one partition."""
+        plan = explain(Recipe.objects.filter(user=self.user))
+
+        self.assertEqual(plan.count('core_recipe_p'), 1)
+
+    def test_round_trip_keeps_rows(self):
+        """Test that reverting the migration and applying it again keeps
+        the rows."""
+        with connection.cursor() as cursor:
+            cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+        with connection.schema_editor() as schema_editor:
+            migration.unpartition_tables(apps, schema_editor)
+        with connection.cursor() as cursor:
+            for table in TABLES:
+                self.assertEqual(partitioning.partition_count(cursor, table),
+                                 0)
+        with connection.schema_editor() as schema_editor:
+            migration.partition_tables(apps, schema_editor)
+        with connection.cursor() as cursor:
+            for table in TABLES:
+                self.assertEqual(partitioning.partition_count(cursor, table),
+                                 migration.PARTITIONS)
+
+        recipe = Recipe.objects.get(user=self.user)
+        self.assertEqual(recipe.title, 'Soup')
+        self.assertEqual(recipe.tags.count(), 1)
+        self.assertEqual(recipe.ingredients.count(), 1)
+
+    def test_table_estimate_sums_partitions(self):
+        """Test that the row estimate covers every partition."""
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE core_recipe')
+
+        self.assertEqual(table_estimate(Recipe), 1)
+
+
+@override_settings(DATABASE_SHARDS=['default'])
+class VacuumBenchmarkTests(TransactionTestCase):
+    multi_db = True
+
+    def test_benchmark_vacuum_writes_results(self):
+        """Test the vacuum benchmark times every recipe table."""
+        user = get_user_model().objects.create_user(
+            'test@companydomain.com',
+            'test1234'
+        )
+        Recipe.objects.create(user=user, title='Soup', time_minutes=10,
+                              price=5)
+
+        with tempfile.NamedTemporaryFile(suffix='.json') as output:
+            call_command('benchmark_vacuum', dead_fraction=1.0,
+                         output=output.name, stdout=StringIO())
+            results = json.load(output)
+
+        self.assertEqual(set(results), set(TABLES))
+        self.assertEqual(results['core_recipe']['dead_rows'], 1)
+        self.assertEqual(results['core_recipe']['relations'],
+                         16 if partitioning.is_supported() else 1)
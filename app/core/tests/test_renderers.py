@@ -0,0 +1,78 @@
+import datetime
+from decimal import Decimal
+from io import BytesIO
+
+from django.test import SimpleTestCase
+from django.utils.translation import ugettext_lazy as _
+
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+from core.parsers import ORJSONParser
+from core.renderers import ORJSONRenderer
+
+
+SAMPLE_DATA = {
+    'id': 1,
+    'title': 'Crème brûlée\u2028',
+    'price': Decimal('5.10'),
+    'ingredients': [1, 2],
+    'created': datetime.datetime(2020, 1, 2, 3, 4, 5, 678,
+                                 tzinfo=datetime.timezone.utc),
+    'day': datetime.date(2020, 1, 2),
+    'error': _('Unable to authenticate with provided credentials'),
+    1: None,
+}
+
+
+class RendererTests(SimpleTestCase):
+
+    def test_render_matches_json_renderer(self):
+        """Test orjson output is identical to DRF's JSONRenderer."""
+        self.assertEqual(
+            ORJSONRenderer().render(SAMPLE_DATA),
+            JSONRenderer().render(SAMPLE_DATA)
+        )
+
+    def test_render_indented(self):
+        """Test indented output falls back to DRF's JSONRenderer."""
+        media_type = 'application/json; indent=4'
+
+        self.assertEqual(
+            ORJSONRenderer().render(SAMPLE_DATA, media_type),
+            JSONRenderer().render(SAMPLE_DATA, media_type)
+        )
+
+    def test_render_wide_integers(self):
+        """Test integers orjson rejects are rendered by JSONRenderer."""
+        data = {'id': 2 ** 70, 'price': Decimal('5.10')}
+
+        self.assertEqual(ORJSONRenderer().render(data),
+                         JSONRenderer().render(data))
+
+    def test_render_small_floats(self):
+        """Test that small floats differ in notation only."""
+        data = {'small': 1.5e-07, 'tiny': 1e-05}
+        rendered = ORJSONRenderer().render(data)
+
+        self.assertEqual(rendered, b'{"small":1.5e-7,"tiny":0.00001}')
+        self.assertEqual(ORJSONParser().parse(BytesIO(rendered)), data)
+
+    def test_render_none(self):
+        """Test that no data renders an empty body."""
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+
+
+class ParserTests(SimpleTestCase):
+
+    def test_parse(self):
+        """Test that a JSON payload is parsed."""
+        payload = BytesIO(b'{"title": "Curry", "tags": [1]}')
+        data = ORJSONParser().parse(payload)
+
+        self.assertEqual(data, {'title': 'Curry', 'tags': [1]})
+
+    def test_parse_invalid(self):
+        """Test that an invalid payload raises a parse error."""
+        with self.assertRaises(ParseError):
+            ORJSONParser().parse(BytesIO(b'{"title": '))
@@ -0,0 +1,92 @@
+import os
+import tempfile
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import OperationalError
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from core import routers
+from core.models import Tag
+
+
+SHARED_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(tempfile.gettempdir(), 'test-replica-pins'),
+    },
+}
+
+
+@override_settings(DATABASE_REPLICAS=['default'], CACHES=SHARED_CACHES)
+class ReplicaRoutingTests(TestCase):
+    """Test routing with the test database standing in as the replica."""
+
+    def setUp(self):
+        cache.clear()
+        routers._health.clear()
+        self.factory = RequestFactory()
+        self.read_aliases = []
+
+        def get_response(request):
+            self.read_aliases.append(routers.current_read_alias())
+            return HttpResponse()
+
+        self.middleware = routers.ReplicaRoutingMiddleware(get_response)
+
+    def test_reads_outside_requests_use_primary(self):
+        """Test that reads default to the primary."""
+        self.assertIsNone(routers.ReplicaRouter().db_for_read(Tag))
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }})
+    def test_local_cache_refused(self):
+        """Test that pins need a cache shared by every worker."""
+        with self.assertRaises(ImproperlyConfigured):
+            routers.ReplicaRoutingMiddleware(lambda request: None)
+
+    def test_safe_request_reads_from_replica(self):
+        """Test that GET requests read from a healthy replica."""
+        self.middleware(self.factory.get('/'))
+
+        self.assertEqual(self.read_aliases, ['default'])
+        self.assertIsNone(routers.current_read_alias())
+
+    def test_write_pins_client_to_primary(self):
+        """Test that reads following a write go to the primary."""
+        auth = {'HTTP_AUTHORIZATION': 'Token abc'}
+        self.middleware(self.factory.post('/', **auth))
+        self.middleware(self.factory.get('/', **auth))
+        self.middleware(self.factory.get('/', HTTP_AUTHORIZATION='Token x'))
+
+        self.assertEqual(self.read_aliases, [None, None, 'default'])
+
+    @patch('core.routers.replica_lag', return_value=60)
+    def test_lagging_replica_skipped(self, replica_lag):
+        """Test that reads fall back to the primary when a replica lags."""
+        self.middleware(self.factory.get('/'))
+        self.middleware(self.factory.get('/'))
+
+        self.assertEqual(self.read_aliases, [None, None])
+        self.assertEqual(replica_lag.call_count, 1)
+
+    @patch('core.routers.replica_lag', side_effect=OperationalError)
+    def test_unreachable_replica_skipped(self, replica_lag):
+        """Test that reads fall back to the primary when a replica is down."""
+        self.middleware(self.factory.get('/'))
+
+        self.assertEqual(self.read_aliases, [None])
+
+    def test_replica_lag_query(self):
+        """Test the lag of a database that is not a replica is zero."""
+        self.assertEqual(routers.replica_lag('default'), 0)
+
+    def test_migrations_skip_replicas(self):
+        """Test that migrations only run on the primary."""
+        with override_settings(DATABASE_REPLICAS=['replica1']):
+            router = routers.ReplicaRouter()
+            self.assertTrue(router.allow_migrate('default', 'core'))
+            self.assertFalse(router.allow_migrate('replica1', 'core'))
@@ -0,0 +1,77 @@
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.test import TestCase
+
+from core import sharding
+from core.models import Recipe, Tag
+from core.seeding import Seeder
+
+
+def count(queryset) -> int:
+    """Count the rows of a queryset on every shard."""
+    return sum(queryset.using(alias).count() for alias in sharding.shards())
+
+
+def seeded_recipes(prefix: str, seed: int):
+    """Seed two users and return a comparable summary of their recipes."""
+    seeder = Seeder(seed=seed, prefix=prefix, tags_per_user=3,
+                    ingredients_per_user=8, batch_size=4)
+    seeder.seed_users(2, 5)
+    recipes = []
+    for user in get_user_model().objects.filter(
+        email__startswith=prefix
+    ).order_by('id'):
+        recipes.extend(Recipe.objects.using(
+            sharding.shard_for(user.pk)
+        ).filter(user=user).order_by('id').prefetch_related(
+            'tags', 'ingredients'
+        ))
+
+    return [
+        (recipe.title, recipe.time_minutes, recipe.price,
+         sorted(tag.name for tag in recipe.tags.all()),
+         sorted(ingredient.name for ingredient in recipe.ingredients.all()))
+        for recipe in recipes
+    ]
+
+
+class SeederTests(TestCase):
+    multi_db = True
+
+    def test_seed_users_counts(self):
+        """Test that the requested number of rows is created."""
+        seeder = Seeder(seed=1, tags_per_user=3, ingredients_per_user=8,
+                        batch_size=4)
+        counts = seeder.seed_users(3, 5)
+
+        self.assertEqual(counts['users'], 3)
+        self.assertEqual(counts['tags'], 9)
+        self.assertEqual(counts['ingredients'], 24)
+        self.assertEqual(counts['recipes'], 15)
+        self.assertEqual(count(Tag.objects.all()), 9)
+        self.assertEqual(
+            count(Recipe.ingredients.through.objects.all()),
+            counts['recipe_ingredients']
+        )
+
+    def test_seed_is_deterministic(self):
+        """Test that the same seed generates the same recipes."""
+        first = seeded_recipes('first', seed=7)
+        second = seeded_recipes('second', seed=7)
+        other = seeded_recipes('other', seed=8)
+
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+
+    def test_recipes_link_to_owner_data(self):
+        """Test that recipes only use their owner's tags and ingredients."""
+        Seeder(seed=1, tags_per_user=3, ingredients_per_user=8).seed_users(
+            2, 5
+        )
+
+        self.assertEqual(count(Recipe.tags.through.objects.exclude(
+            tag__user=F('recipe__user')
+        )), 0)
+        self.assertEqual(count(Recipe.ingredients.through.objects.exclude(
+            ingredient__user=F('recipe__user')
+        )), 0)
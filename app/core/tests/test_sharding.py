@@ -0,0 +1,254 @@
+import os
+from unittest import skipUnless
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import media, routers, sharding, stats, sync
+from core.deletion import delete_user
+from core.models import Ingredient, Recipe, RecipeIngredientMask, \
+    RecipeSignature, SyncChange, Tag, UserShard
+from core.resharding import move_user
+from recipe import renditions
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+SYNC_URL = reverse('recipe:sync')
+
+
+class ShardMapTests(TestCase):
+    multi_db = True
+
+    def setUp(self):
+        sharding.forget()
+        self.addCleanup(sharding.forget)
+        self.user = get_user_model().objects.create_user(
+            'test@companydomain.com',
+            'test1234'
+        )
+
+    @override_settings(DATABASE_SHARDS=['default'])
+    def test_single_shard_without_queries(self):
+        """Test that users are on the default shard without any others."""
+        with self.assertNumQueries(0):
+            self.assertEqual(sharding.shard_for(self.user.pk),
+                             DEFAULT_DB_ALIAS)
+            self.assertFalse(sharding.is_moving(self.user.pk))
+
+    @override_settings(DATABASE_SHARDS=['default', 'shard1'])
+    def test_shard_map_cached(self):
+        """Test that the shard of a user is read once from the map."""
+        UserShard.objects.update_or_create(user=self.user,
+                                           defaults={'alias': 'shard1'})
+
+        self.assertEqual(sharding.shard_for(self.user.pk), 'shard1')
+        with self.assertNumQueries(0):
+            self.assertEqual(sharding.shard_for(self.user.pk), 'shard1')
+
+    @override_settings(DATABASE_SHARDS=['default', 'shard1'])
+    def test_users_without_map_on_default(self):
+        """Test that users missing from the map are on the default shard."""
+        UserShard.objects.filter(user=self.user).delete()
+
+        self.assertEqual(sharding.shard_for(self.user.pk), DEFAULT_DB_ALIAS)
+
+    @override_settings(DATABASE_SHARDS=['default', 'shard1'])
+    def test_router(self):
+        """Test that sharded models follow their user or the thread."""
+        UserShard.objects.update_or_create(user=self.user,
+                                           defaults={'alias': 'shard1'})
+        router = routers.ShardRouter()
+        recipe = Recipe(user=self.user)
+
+        self.assertEqual(router.db_for_write(Recipe, instance=recipe),
+                         'shard1')
+        self.assertIsNone(router.db_for_read(Tag))
+        with sharding.using_shard('shard1'):
+            self.assertEqual(router.db_for_read(Tag), 'shard1')
+            self.assertEqual(router.db_for_write(Recipe.tags.through),
+                             'shard1')
+            self.assertIsNone(router.db_for_read(get_user_model()))
+            self.assertIsNone(router.db_for_read(UserShard))
+        with sharding.using_shard(DEFAULT_DB_ALIAS):
+            # Left to the replica router.
+            self.assertIsNone(router.db_for_read(Tag))
+
+
+@skipUnless(len(settings.DATABASE_SHARDS) > 1,
+            'Set DB_SHARD_NAMES to test with several shards.')
+class ShardedTests(TestCase):
+    """Test with the shards configured by DB_SHARD_NAMES."""
+    multi_db = True
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        sharding.configure_sequences()
+
+    def setUp(self):
+        sharding.forget()
+        self.addCleanup(sharding.forget)
+        self.source, self.target = sharding.shards()[1], DEFAULT_DB_ALIAS
+        self.user = self.create_user('test', self.source)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_user(self, name: str, alias: str):
+        """Create and return a user assigned to a shard."""
+        for index in range(len(sharding.shards())):
+            user = get_user_model().objects.create_user(
+                f'{name}{index}@companydomain.com',
+                'test1234'
+            )
+            if sharding.shard_for(user.pk) == alias:
+                return user
+
+    def create_recipe(self):
+        """Create a recipe with a tag and an ingredient through the API."""
+        tag = self.client.post(TAGS_URL, {'name': 'Vegan'}).data
+        with sharding.using_shard(self.source):
+            ingredient = Ingredient.objects.create(user=self.user,
+                                                   name='Kale')
+        res = self.client.post(RECIPES_URL, {
+            'title': 'Kale salad',
+            'time_minutes': 10,
+            'price': '5.00',
+            'tags': [tag['id']],
+            'ingredients': [ingredient.id],
+        })
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED, res.data)
+        return res.data
+
+    def test_rows_on_user_shard(self):
+        """Test that the rows of a user and their derived data are kept
+        on the shard of the user.
+        """
+        recipe = self.create_recipe()
+
+        for alias, expected in ((self.source, True), (self.target, False)):
+            with sharding.using_shard(alias):
+                self.assertEqual(Recipe.objects.filter(
+                    user=self.user
+                ).exists(), expected)
+                self.assertEqual(RecipeSignature.objects.filter(
+                    recipe_id=recipe['id']
+                ).exists(), expected)
+                self.assertEqual(
+                    stats.summary(self.user)['recipe_count'],
+                    1 if expected else 0
+                )
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual([row['id'] for row in res.data], [recipe['id']])
+
+    def test_ids_allocated_by_shard(self):
+        """Test that each shard allocates its own ids."""
+        other = self.create_user('other', self.target)
+        with sharding.using_shard(self.source):
+            tag = Tag.objects.create(user=self.user, name='Vegan')
+        with sharding.using_shard(self.target):
+            other_tag = Tag.objects.create(user=other, name='Vegan')
+
+        self.assertNotEqual(tag.id, other_tag.id)
+        self.assertEqual(tag.id % settings.SHARD_ID_STRIDE,
+                         sharding.shards().index(self.source))
+        self.assertEqual(other_tag.id % settings.SHARD_ID_STRIDE,
+                         sharding.shards().index(self.target))
+
+    @override_settings(IMAGE_RENDITION_ROOT=os.path.join(settings.MEDIA_ROOT,
+                                                         'renditions'))
+    def test_media_with_ids_reused_by_shards(self):
+        """Test that media of recipes sharing an id are all served."""
+        other = self.create_user('other', self.target)
+        recipe = Recipe.objects.create(user=self.user, title='Kale salad',
+                                       time_minutes=10, price=5.00,
+                                       image='uploads/recipe/source.jpg')
+        Recipe.objects.create(pk=recipe.pk, user=other, title='Kale salad',
+                              time_minutes=10, price=5.00,
+                              image='uploads/recipe/target.jpg')
+
+        for image in ('uploads/recipe/source.jpg',
+                      'uploads/recipe/target.jpg'):
+            source = renditions.source_hash(image)
+            self.assertTrue(media.can_access(None, image))
+            self.assertTrue(media.can_access(
+                None, f'renditions/{recipe.pk}/{source}-160x160.jpg'
+            ))
+
+    def test_other_user_tags_rejected(self):
+        """Test that recipes cannot use the tags of other users."""
+        other = self.create_user('other', self.target)
+        with sharding.using_shard(self.target):
+            tag = Tag.objects.create(user=other, name='Vegan')
+
+        res = self.client.post(RECIPES_URL, {
+            'title': 'Kale salad',
+            'time_minutes': 10,
+            'price': '5.00',
+            'tags': [tag.id],
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_writes_refused_while_moving(self):
+        """Test that a moving user can read but not write."""
+        UserShard.objects.filter(user=self.user).update(moving=True)
+        sharding.forget(self.user.pk)
+
+        self.assertEqual(self.client.get(TAGS_URL).status_code,
+                         status.HTTP_200_OK)
+        res = self.client.post(TAGS_URL, {'name': 'Vegan'})
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    def test_move_user(self):
+        """Test moving a user keeps its rows, indexes and sync cursor."""
+        recipe = self.create_recipe()
+        cursor = self.client.get(SYNC_URL).data['cursor']
+
+        counts = move_user(self.user, self.target, wait=lambda seconds: None)
+
+        self.assertEqual(counts['recipes'], 1)
+        self.assertEqual(counts['recipe_tags'], 1)
+        self.assertEqual(sharding.shard_for(self.user.pk), self.target)
+        with sharding.using_shard(self.source):
+            self.assertFalse(Recipe.objects.filter(user=self.user).exists())
+            self.assertFalse(SyncChange.objects.filter(
+                user=self.user
+            ).exists())
+        with sharding.using_shard(self.target):
+            self.assertTrue(RecipeIngredientMask.objects.filter(
+                recipe_id=recipe['id']
+            ).exists())
+            self.assertEqual(stats.summary(self.user)['recipe_count'], 1)
+            self.assertEqual(sync.last_sequence(self.user), cursor)
+
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.data[0]['tags'], recipe['tags'])
+        self.client.post(TAGS_URL, {'name': 'Quick'})
+        self.assertGreater(self.client.get(SYNC_URL, {'since': cursor})
+                           .data['cursor'], cursor)
+
+    def test_move_to_same_shard_rejected(self):
+        """Test that moving a user to its own shard fails."""
+        with self.assertRaises(ValueError):
+            move_user(self.user, self.source, wait=lambda seconds: None)
+
+    def test_delete_user(self):
+        """Test that deleting a user removes its stub from its shard."""
+        self.create_recipe()
+
+        user_id = self.user.pk
+
+        delete_user(self.user)
+
+        self.assertFalse(get_user_model().objects.using(self.source).filter(
+            pk=user_id
+        ).exists())
+        with sharding.using_shard(self.source):
+            self.assertFalse(Tag.objects.filter(user_id=user_id).exists())
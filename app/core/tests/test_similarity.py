@@ -0,0 +1,109 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from core import similarity
+from core.deletion import delete_ingredients, delete_recipes
+from core.models import Ingredient, Recipe, RecipeSignature
+from core.tests.shards import create_user_on_shard_of, UserShardMixin
+
+
+class SimilarityTests(UserShardMixin, TestCase):
+    multi_db = True
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@companydomain.com',
+            'test1234'
+        )
+        self.use_shard_of(self.user)
+        self.ingredients = [
+            Ingredient.objects.create(user=self.user, name=f'Ingredient {i}')
+            for i in range(12)
+        ]
+
+    def create_recipe(self, ingredients, user=None):
+        """Create and return a recipe with the given ingredients."""
+        recipe = Recipe.objects.create(user=user or self.user,
+                                       title='Sample Recipe',
+                                       time_minutes=10, price=5.00)
+        recipe.ingredients.add(*ingredients)
+        return recipe
+
+    def test_identical_recipes_are_most_similar(self):
+        """Test that recipes are ranked by shared ingredients."""
+        recipe = self.create_recipe(self.ingredients[:6])
+        same = self.create_recipe(self.ingredients[:6])
+        close = self.create_recipe(self.ingredients[:5])
+        different = self.create_recipe(self.ingredients[6:])
+
+        results = similarity.similar_recipes(recipe, 10)
+
+        self.assertEqual([recipe_id for recipe_id, _ in results[:2]],
+                         [same.id, close.id])
+        self.assertEqual(results[0][1], 1.0)
+        self.assertNotIn(different.id, dict(results))
+
+    def test_other_users_recipes_excluded(self):
+        """Test that only recipes of the same user are returned."""
+        recipe = self.create_recipe(self.ingredients[:4])
+        other_user = create_user_on_shard_of(self.user)
+        other_recipe = self.create_recipe(self.ingredients[:4], other_user)
+
+        results = similarity.similar_recipes(recipe, 10)
+
+        self.assertNotIn(other_recipe.id, dict(results))
+
+    def test_signature_follows_ingredients(self):
+        """Test that signatures are updated when ingredients change."""
+        recipe = self.create_recipe(self.ingredients[:3])
+        other = self.create_recipe(self.ingredients[:4])
+        before = RecipeSignature.objects.get(recipe=recipe).minhashes
+
+        self.ingredients[3].recipe_set.add(recipe)
+        self.assertNotEqual(
+            RecipeSignature.objects.get(recipe=recipe).minhashes, before
+        )
+        self.assertEqual(similarity.similar_recipes(recipe, 1),
+                         [(other.id, 1.0)])
+
+        recipe.ingredients.clear()
+        self.assertFalse(RecipeSignature.objects.filter(recipe=recipe)
+                         .exists())
+
+    def test_deleted_ingredients_and_recipes(self):
+        """Test that deletions keep the signatures consistent."""
+        recipe = self.create_recipe(self.ingredients[:2])
+        self.ingredients[0].delete()
+        self.assertEqual(
+            RecipeSignature.objects.get(recipe=recipe).minhashes,
+            expected_minhashes([self.ingredients[1].id])
+        )
+
+        delete_ingredients(Ingredient.objects.filter(
+            pk=self.ingredients[1].pk
+        ))
+        self.assertFalse(RecipeSignature.objects.exists())
+
+        recipe.ingredients.add(self.ingredients[2])
+        delete_recipes(Recipe.objects.all())
+        self.assertFalse(RecipeSignature.objects.exists())
+
+    def test_rebuild(self):
+        """Test rebuilding every signature."""
+        recipe = self.create_recipe(self.ingredients[:3])
+        RecipeSignature.objects.all().delete()
+
+        similarity.rebuild()
+
+        self.assertEqual(
+            RecipeSignature.objects.get(recipe=recipe).minhashes,
+            expected_minhashes([ingredient.id
+                                for ingredient in self.ingredients[:3]])
+        )
+
+
+def expected_minhashes(ingredient_ids):
+    """Return the expected MinHash signature of ingredient ids."""
+    return [min((a * ingredient_id + b) % similarity.PRIME
+                for ingredient_id in ingredient_ids)
+            for a, b in similarity.HASH_FUNCTIONS]
@@ -0,0 +1,125 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from core import stats
+from core.deletion import delete_recipes, delete_tags, delete_user
+from core.models import Ingredient, Recipe, RecipeStats, Tag
+from core.tests.shards import create_user_on_shard_of, UserShardMixin
+
+
+class RecipeStatsTests(UserShardMixin, TestCase):
+    multi_db = True
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@companydomain.com',
+            'test1234'
+        )
+        self.use_shard_of(self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.ingredient = Ingredient.objects.create(user=self.user,
+                                                    name='Salt')
+
+    def create_recipe(self, time_minutes=10, price='5.00', user=None):
+        """Create and return a sample recipe."""
+        return Recipe.objects.create(user=user or self.user,
+                                     title='Sample Recipe',
+                                     time_minutes=time_minutes,
+                                     price=Decimal(price))
+
+    def assertConsistent(self):
+        """Assert that the stats match a recompute."""
+        self.assertEqual(stats.check(), [])
+
+    def test_create_and_update_recipes(self):
+        """Test that created and updated recipes are counted."""
+        recipe = self.create_recipe(time_minutes=10, price='4.00')
+        self.create_recipe(time_minutes=30, price='12.00')
+        recipe.price = Decimal('25.00')
+        recipe.save()
+
+        summary = stats.summary(self.user)
+
+        self.assertConsistent()
+        self.assertEqual(summary['recipe_count'], 2)
+        self.assertEqual(summary['avg_time_minutes'], 20)
+        self.assertEqual(summary['avg_price'], '18.50')
+        self.assertEqual(
+            [bucket['count'] for bucket in summary['price_histogram']],
+            [0, 0, 1, 1, 0]
+        )
+        self.assertEqual(summary['price_histogram'][0],
+                         {'min': None, 'max': '5.00', 'count': 0})
+
+    def test_links_change(self):
+        """Test that tag and ingredient histograms follow links."""
+        recipe = self.create_recipe()
+        other_recipe = self.create_recipe()
+        recipe.tags.add(self.tag)
+        self.tag.recipe_set.add(other_recipe)
+        recipe.ingredients.add(self.ingredient)
+        self.assertConsistent()
+
+        summary = stats.summary(self.user)
+        self.assertEqual(summary['tags'], [
+            {'id': self.tag.id, 'name': 'Vegan', 'count': 2}
+        ])
+        self.assertEqual(summary['ingredients'][0]['count'], 1)
+
+        recipe.tags.remove(self.tag)
+        recipe.ingredients.clear()
+        self.assertConsistent()
+        self.assertEqual(stats.summary(self.user)['tags'][0]['count'], 1)
+        self.assertEqual(stats.summary(self.user)['ingredients'], [])
+
+    def test_delete_recipes(self):
+        """Test that deleted recipes and tags leave the stats."""
+        recipe = self.create_recipe()
+        recipe.tags.add(self.tag)
+        other_recipe = self.create_recipe()
+        other_recipe.tags.add(self.tag)
+        recipe.delete()
+        self.assertConsistent()
+
+        delete_recipes(Recipe.objects.filter(pk=other_recipe.pk))
+        self.assertConsistent()
+        self.assertEqual(stats.summary(self.user)['recipe_count'], 0)
+
+        self.create_recipe().tags.add(self.tag)
+        delete_tags(Tag.objects.all())
+        self.assertConsistent()
+        self.assertEqual(stats.summary(self.user)['tags'], [])
+
+    def test_recipe_moved_to_other_user(self):
+        """Test that a recipe changing owner moves its counts."""
+        other_user = create_user_on_shard_of(self.user)
+        recipe = self.create_recipe()
+        recipe.tags.add(self.tag)
+
+        recipe.user = other_user
+        recipe.save()
+
+        self.assertConsistent()
+        self.assertEqual(stats.summary(other_user)['recipe_count'], 1)
+        self.assertEqual(stats.summary(other_user)['tags'][0]['count'], 1)
+
+    def test_delete_user(self):
+        """Test that deleting a user deletes its stats."""
+        self.create_recipe()
+
+        delete_user(self.user)
+
+        self.assertFalse(RecipeStats.objects.exists())
+
+    def test_check_and_rebuild(self):
+        """Test that drift is detected and fixed by a rebuild."""
+        recipe = self.create_recipe()
+        recipe.tags.add(self.tag)
+        Recipe.objects.filter(pk=recipe.pk).update(price=Decimal('99.00'))
+
+        self.assertEqual(len(stats.check()), 3)
+
+        stats.rebuild([self.user.id])
+        self.assertConsistent()
@@ -0,0 +1,86 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from core import sync
+from core.deletion import delete_ingredients, delete_tags, delete_user
+from core.models import Ingredient, Recipe, SyncChange, Tag
+from core.tests.shards import UserShardMixin
+
+
+class SyncTests(UserShardMixin, TestCase):
+    multi_db = True
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@companydomain.com',
+            'test1234'
+        )
+        self.use_shard_of(self.user)
+        self.recipe = Recipe.objects.create(user=self.user,
+                                            title='Sample Recipe',
+                                            time_minutes=10, price=5.00)
+
+    def sequence(self, kind, object_id):
+        """Return the sequence of the last change of an object."""
+        return SyncChange.objects.get(kind=kind, object_id=object_id).sequence
+
+    def test_changes_replace_previous_ones(self):
+        """Test that an object keeps only its latest change."""
+        before = self.sequence(SyncChange.RECIPE, self.recipe.id)
+
+        self.recipe.title = 'Updated'
+        self.recipe.save()
+
+        self.assertGreater(self.sequence(SyncChange.RECIPE, self.recipe.id),
+                           before)
+        self.assertEqual(SyncChange.objects.filter(
+            kind=SyncChange.RECIPE
+        ).count(), 1)
+
+    def test_reverse_links_change_recipes(self):
+        """Test that linking from a tag or ingredient changes recipes."""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        before = self.sequence(SyncChange.RECIPE, self.recipe.id)
+
+        tag.recipe_set.add(self.recipe)
+        added = self.sequence(SyncChange.RECIPE, self.recipe.id)
+        tag.recipe_set.clear()
+
+        self.assertGreater(added, before)
+        self.assertGreater(self.sequence(SyncChange.RECIPE, self.recipe.id),
+                           added)
+
+    def test_batch_deletions_record_tombstones(self):
+        """Test that the deletion helpers record tombstones."""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        ingredient = Ingredient.objects.create(user=self.user, name='Kale')
+        self.recipe.tags.add(tag)
+        self.recipe.ingredients.add(ingredient)
+        cursor = sync.changes_since(self.user, 0, 100)['cursor']
+
+        delete_tags(Tag.objects.all())
+        delete_ingredients(Ingredient.objects.all())
+        changes = sync.changes_since(self.user, cursor, 100)
+
+        self.assertEqual(changes['changed'][SyncChange.RECIPE],
+                         [self.recipe.id])
+        self.assertEqual(changes['deleted'][SyncChange.TAG], [tag.id])
+        self.assertEqual(changes['deleted'][SyncChange.INGREDIENT],
+                         [ingredient.id])
+
+        delete_user(self.user)
+        self.assertFalse(SyncChange.objects.exists())
+
+    def test_rebuild(self):
+        """Test recording every existing object."""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        SyncChange.objects.all().delete()
+
+        sync.rebuild()
+        changes = sync.changes_since(self.user, 0, 100)
+
+        self.assertEqual(changes['changed'], {
+            SyncChange.RECIPE: [self.recipe.id],
+            SyncChange.TAG: [tag.id],
+            SyncChange.INGREDIENT: [],
+        })
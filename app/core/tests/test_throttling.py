@@ -0,0 +1,101 @@
+from unittest.mock import Mock, patch
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.throttling import CacheCounterStore, LocalCounterStore, \
+                            LoginRateThrottle, get_counter_store
+
+
+TOKEN_URL = reverse('user:token')
+
+
+class CounterStoreTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def assert_sliding_window(self, store):
+        """Assert the store limits requests over a sliding window."""
+        for _ in range(3):
+            allowed, _estimate = store.hit('key', 3, 60, 600.0)
+            self.assertTrue(allowed)
+
+        allowed, estimate = store.hit('key', 3, 60, 610.0)
+        self.assertFalse(allowed)
+        self.assertEqual(estimate, 3)
+
+        # Halfway through the next window only half of the previous
+        # window still counts.
+        allowed, estimate = store.hit('key', 3, 60, 690.0)
+        self.assertTrue(allowed)
+        self.assertEqual(estimate, 2.5)
+
+        allowed, _estimate = store.hit('key', 3, 60, 800.0)
+        self.assertTrue(allowed)
+
+    def test_local_counter_store(self):
+        """Test the in-process store limits requests."""
+        self.assert_sliding_window(LocalCounterStore())
+
+    def test_cache_counter_store(self):
+        """Test the shared cache store limits requests."""
+        self.assert_sliding_window(CacheCounterStore())
+
+    def test_local_counter_store_prunes_expired_keys(self):
+        """Test that expired counters are dropped once the store is full."""
+        store = LocalCounterStore()
+        store.max_keys = 2
+        store.hit('first', 3, 60, 0.0)
+        store.hit('second', 3, 60, 0.0)
+        store.hit('third', 3, 60, 600.0)
+
+        self.assertEqual(list(store._counters), ['third'])
+
+
+class LoginThrottleTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        get_counter_store().clear()
+
+    @patch.object(LoginRateThrottle, 'rate', '2/min', create=True)
+    def test_login_attempts_throttled(self):
+        """Test that repeated login attempts from one address are limited."""
+        payload = {'email': 'test@companydomain.com', 'password': 'wrong'}
+        for _ in range(2):
+            res = self.client.post(TOKEN_URL, payload)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.post(TOKEN_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', res)
+
+    @patch.object(LoginRateThrottle, 'rate', '2/min', create=True)
+    def test_forwarded_for_ignored(self):
+        """Test that clients cannot reset the limit with X-Forwarded-For."""
+        payload = {'email': 'test@companydomain.com', 'password': 'wrong'}
+        for attempt in range(2):
+            self.client.post(TOKEN_URL, payload,
+                             HTTP_X_FORWARDED_FOR=f'10.0.0.{attempt}')
+
+        res = self.client.post(TOKEN_URL, payload,
+                               HTTP_X_FORWARDED_FOR='10.0.0.99')
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @override_settings(REST_FRAMEWORK=dict(settings.REST_FRAMEWORK,
+                                           NUM_PROXIES=1))
+    def test_forwarded_for_from_trusted_proxy(self):
+        """Test that the address appended by a trusted proxy is used."""
+        throttle = LoginRateThrottle()
+        request = Mock(META={'REMOTE_ADDR': '172.16.0.1',
+                             'HTTP_X_FORWARDED_FOR': '1.2.3.4, 10.0.0.1'})
+
+        self.assertEqual(throttle.get_ident(request), '10.0.0.1')
@@ -0,0 +1,176 @@
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+
+from rest_framework import throttling
+
+
+class LocalCounterStore:
+    """Sliding window counters kept in the memory of the current process.
+
+    Only suitable when a single worker serves the traffic, every worker
+    keeps its own counters.
+    """
+    max_keys = 100000
+
+    def __init__(self):
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def hit(self, key: str, limit: int, duration: int, now: float):
+        """Count a request against the key unless it is over the limit.
+
+        Args:
+            key (str): throttled identity.
+            limit (int): allowed requests per window.
+            duration (int): window length in seconds.
+            now (float): current timestamp.
+
+        Returns:
+            tuple: whether the request is allowed and the estimated
+            number of requests made in the last window.
+        """
+        window = int(now // duration)
+        elapsed = (now % duration) / duration
+
+        with self._lock:
+            entry = self._counters.get(key)
+            if entry is None or entry[0] < window - 1:
+                previous, current = 0, 0
+            elif entry[0] == window - 1:
+                previous, current = entry[2], 0
+            else:
+                previous, current = entry[1], entry[2]
+
+            estimate = previous * (1 - elapsed) + current
+            if estimate >= limit:
+                return False, estimate
+
+            if entry is None and len(self._counters) >= self.max_keys:
+                self._prune(window)
+            self._counters[key] = (window, previous, current + 1)
+
+        return True, estimate + 1
+
+    def _prune(self, window: int):
+        """Drop the counters that no longer affect the current window."""
+        self._counters = {
+            key: entry for key, entry in self._counters.items()
+            if entry[0] >= window - 1
+        }
+
+    def clear(self):
+        """Forget every counter."""
+        with self._lock:
+            self._counters = {}
+
+
+class CacheCounterStore:
+    """Sliding window counters kept in a cache shared by every worker."""
+
+    def __init__(self, alias: str = 'default'):
+        self.cache = caches[alias]
+
+    def hit(self, key: str, limit: int, duration: int, now: float):
+        """Count a request against the key unless it is over the limit.
+
+        Args:
+            key (str): throttled identity.
+            limit (int): allowed requests per window.
+            duration (int): window length in seconds.
+            now (float): current timestamp.
+
+        Returns:
+            tuple: whether the request is allowed and the estimated
+            number of requests made in the last window.
+        """
+        window = int(now // duration)
+        elapsed = (now % duration) / duration
+        current_key = f'{key}:{window}'
+        previous_key = f'{key}:{window - 1}'
+
+        counts = self.cache.get_many([current_key, previous_key])
+        estimate = (
+            counts.get(previous_key, 0) * (1 - elapsed)
+            + counts.get(current_key, 0)
+        )
+        if estimate >= limit:
+            return False, estimate
+
+        # Keep the counter alive through the next window, where it is
+        # still weighted into the estimate.
+        self.cache.add(current_key, 0, duration * 2)
+        try:
+            current = self.cache.incr(current_key)
+        except ValueError:
+            current = 1
+            self.cache.set(current_key, current, duration * 2)
+
+        return True, counts.get(previous_key, 0) * (1 - elapsed) + current
+
+    def clear(self):
+        """Counters expire on their own in the shared cache."""
+
+
+_stores = {}
+
+
+def get_counter_store():
+    """Return the counter store configured by THROTTLE_COUNTER_STORE."""
+    path = settings.THROTTLE_COUNTER_STORE
+    if path not in _stores:
+        _stores[path] = import_string(path)()
+
+    return _stores[path]
+
+
+class SlidingWindowRateThrottle(throttling.SimpleRateThrottle):
+    """Rate throttle approximating a sliding window with two counters.
+
+    Each check costs a constant amount of work, unlike the request
+    history kept by DRF's SimpleRateThrottle.
+    """
+    counter_store = None
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        store = self.counter_store or get_counter_store()
+        allowed, self.estimate = store.hit(
+            self.key,
+            self.num_requests,
+            self.duration,
+            self.now
+        )
+        return allowed
+
+    def wait(self):
+        """Return the seconds left until the current window ends."""
+        return self.duration - (self.now % self.duration)
+
+
+class AnonRateThrottle(SlidingWindowRateThrottle, throttling.AnonRateThrottle):
+    """Limit the requests of anonymous clients per IP address."""
+
+
+class UserRateThrottle(SlidingWindowRateThrottle, throttling.UserRateThrottle):
+    """Limit the requests of authenticated users per user."""
+
+
+class LoginRateThrottle(SlidingWindowRateThrottle):
+    """Limit the login attempts per IP address."""
+    scope = 'login'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': self.get_ident(request)
+        }
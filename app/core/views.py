@@ -0,0 +1,32 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import APIException
+
+from core import sharding
+
+
+class UserMoving(APIException):
+    status_code = 503
+    default_detail = _('Your recipes are being moved, try again shortly.')
+    default_code = 'user_moving'
+
+
+class ShardedViewMixin:
+    """Run the queries of a view on the shard of the authenticated user.
+
+    Writes are refused while the rows of the user are being moved.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        user_id = request.user.pk
+        if request.method not in ('GET', 'HEAD', 'OPTIONS') and \
+                sharding.is_moving(user_id):
+            raise UserMoving
+        self._shard = sharding.using_shard(sharding.shard_for(user_id))
+        self._shard.__enter__()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        shard, self._shard = getattr(self, '_shard', None), None
+        if shard is not None:
+            shard.__exit__(None, None, None)
+        return super().finalize_response(request, response, *args, **kwargs)
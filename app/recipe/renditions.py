@@ -0,0 +1,185 @@
+import hashlib
+import os
+import threading
+import uuid
+
+from django.conf import settings
+
+
+FORMATS = {
+    'jpg': ('JPEG', 'image/jpeg'),
+    'png': ('PNG', 'image/png'),
+    'webp': ('WEBP', 'image/webp'),
+}
+
+_locks = {}
+_locks_guard = threading.Lock()
+_cache_size = None
+_cache_size_guard = threading.Lock()
+
+
+def source_hash(image_name: str) -> str:
+    """Return the hash naming the renditions of a source image."""
+    return hashlib.sha256(image_name.encode()).hexdigest()[:16]
+
+
+class Rendition:
+    """A resized copy of a recipe image, cached on disk."""
+
+    def __init__(self, recipe, width: int, height: int, fmt: str):
+        self.recipe = recipe
+        self.width = width
+        self.height = height
+        self.fmt = fmt
+        # The source name changes on every upload, so renditions of a
+        # replaced image are never served again and age out of the cache.
+        source = source_hash(recipe.image.name)
+        self.etag = f'"{source}-{width}x{height}"'
+        self.path = os.path.join(
+            settings.IMAGE_RENDITION_ROOT,
+            str(recipe.id),
+            f'{source}-{width}x{height}.{fmt}'
+        )
+
+    @property
+    def content_type(self) -> str:
+        return FORMATS[self.fmt][1]
+
+    def get(self):
+        """Return the rendition opened for reading, creating it when missing.
+
+        The open file stays readable when the rendition is evicted before
+        the response is sent.
+        """
+        file = self._open()
+        if file is not None:
+            return file
+
+        # Concurrent requests for the same rendition wait for the first
+        # one instead of resizing the image again.
+        with _lock(self.path):
+            file = self._open()
+            if file is None:
+                file = self._create()
+
+        return file
+
+    def _open(self):
+        """Open a cached rendition and mark it as recently used, or return
+        None when it is not cached."""
+        try:
+            file = _open(self.path)
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(self.path)
+        except FileNotFoundError:
+            pass
+        return file
+
+    def _create(self):
+        """Resize the source image and write the rendition atomically.
+
+        Returns:
+            file: the new rendition, opened before it can be evicted.
+        """
+        from PIL import Image
+
+        with self.recipe.image.open('rb') as source:
+            image = Image.open(source)
+            image.thumbnail((self.width, self.height), Image.LANCZOS)
+            pil_format = FORMATS[self.fmt][0]
+            if pil_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f'{self.path}.{uuid.uuid4().hex}.tmp'
+            image.save(tmp_path, format=pil_format)
+
+        file = _open(tmp_path)
+        os.replace(tmp_path, self.path)
+        _account(os.fstat(file.fileno()).st_size)
+        return file
+
+
+def _open(path: str):
+    """Open a file by descriptor, for reading.
+
+    The file object has no name, so FileResponse does not stat a path
+    that may be evicted meanwhile.
+    """
+    return open(os.open(path, os.O_RDONLY), 'rb')
+
+
+class _lock:
+    """Lock held by every thread creating the same rendition."""
+
+    def __init__(self, key: str):
+        self.key = key
+
+    def __enter__(self):
+        with _locks_guard:
+            lock, waiters = _locks.get(self.key, (threading.Lock(), 0))
+            _locks[self.key] = (lock, waiters + 1)
+        lock.acquire()
+
+    def __exit__(self, *exc_info):
+        with _locks_guard:
+            lock, waiters = _locks[self.key]
+            if waiters == 1:
+                del _locks[self.key]
+            else:
+                _locks[self.key] = (lock, waiters - 1)
+        lock.release()
+
+
+def _cached_files():
+    """Return the (mtime, size, path) of every cached rendition."""
+    files = []
+    for root, _, names in os.walk(settings.IMAGE_RENDITION_ROOT):
+        for name in names:
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+
+    return files
+
+
+def _account(size: int):
+    """Add a new rendition to the cache size, evicting when over the cap.
+
+    The size is computed by walking the cache once per process and then
+    kept up to date, so the directory is only walked again to evict.
+    """
+    global _cache_size
+
+    with _cache_size_guard:
+        if _cache_size is None:
+            _cache_size = sum(size for _, size, _ in _cached_files())
+        else:
+            _cache_size += size
+        if _cache_size > settings.IMAGE_RENDITION_CACHE_SIZE:
+            _cache_size = evict(settings.IMAGE_RENDITION_CACHE_SIZE)
+
+
+def evict(max_size: int) -> int:
+    """Remove the least recently used renditions above a total size.
+
+    Returns:
+        int: size of the cache after eviction, in bytes.
+    """
+    files = sorted(_cached_files())
+    total = sum(size for _, size, _ in files)
+    for _, size, path in files:
+        if total <= max_size:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+    return total
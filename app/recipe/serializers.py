@@ -1,6 +1,7 @@
 from rest_framework import serializers
 
 from core.models import Ingredient, Tag, Recipe
+from recipe.uploads import IMAGE_CONTENT_TYPES
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -21,13 +22,29 @@ class IngredientSerializer(serializers.ModelSerializer):
         read_only_fields = ('id',)
 
 
+class UserPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Related field accepting only objects of the requesting user.
+
+    Other users' objects may live on another shard, and are invalid
+    choices anyway.
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        request = self.context.get('request')
+        if request is None:
+            return queryset
+
+        return queryset.filter(user=request.user)
+
+
 class RecipeSerializer(serializers.ModelSerializer):
     """Serializer for recipe objects."""
-    ingredients = serializers.PrimaryKeyRelatedField(
+    ingredients = UserPrimaryKeyRelatedField(
         many=True,
         queryset=Ingredient.objects.all()
     )
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = UserPrimaryKeyRelatedField(
         many=True,
         queryset=Tag.objects.all()
     )
@@ -39,12 +56,60 @@ class RecipeSerializer(serializers.ModelSerializer):
         read_only_fields = ('id',)
 
 
+class SimilarRecipeSerializer(RecipeSerializer):
+    """Serializer for recipes similar to another one."""
+    similarity = serializers.FloatField(read_only=True)
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ('similarity',)
+
+
 class RecipeDetailSerializer(RecipeSerializer):
     """Serializer a recipe detail."""
     ingredients = IngredientSerializer(many=True, read_only=True)
     tags = TagSerializer(many=True, read_only=True)
 
 
+class ValuesSerializer(serializers.BaseSerializer):
+    """Read-only serializer for rows fetched with ``QuerySet.values()``.
+
+    List endpoints use it to skip model instantiation and the per-field
+    machinery of ModelSerializer.
+    """
+    value_fields = ()
+
+    def to_representation(self, row):
+        return {field: row[field] for field in self.value_fields}
+
+
+class TagValuesSerializer(ValuesSerializer):
+    """Read-only serializer for tag rows."""
+    value_fields = TagSerializer.Meta.fields
+
+
+class IngredientValuesSerializer(ValuesSerializer):
+    """Read-only serializer for ingredient rows."""
+    value_fields = IngredientSerializer.Meta.fields
+
+
+class RecipeValuesSerializer(ValuesSerializer):
+    """Read-only serializer for recipe rows annotated with related ids."""
+    value_fields = ('id', 'title', 'ingredient_ids', 'tag_ids',
+                    'time_minutes', 'price', 'link')
+    price_field = serializers.DecimalField(max_digits=5, decimal_places=2)
+
+    def to_representation(self, row):
+        return {
+            'id': row['id'],
+            'title': row['title'],
+            'ingredients': row['ingredient_ids'],
+            'tags': row['tag_ids'],
+            'time_minutes': row['time_minutes'],
+            'price': self.price_field.to_representation(row['price']),
+            'link': row['link'],
+        }
+
+
 class RecipeImageSerializer(serializers.ModelSerializer):
     """Serializer for uploading images to recipes"""
 
@@ -52,3 +117,13 @@ class RecipeImageSerializer(serializers.ModelSerializer):
         model = Recipe
         fields = ('id', 'image')
         read_only_fields = ('id',)
+
+
+class ImageUploadStartSerializer(serializers.Serializer):
+    """Serializer for requesting a direct image upload"""
+    content_type = serializers.ChoiceField(choices=list(IMAGE_CONTENT_TYPES))
+
+
+class ImageUploadCompleteSerializer(serializers.Serializer):
+    """Serializer for attaching a directly uploaded image"""
+    upload = serializers.CharField()
@@ -3,9 +3,11 @@ from django.urls import reverse
 from django.test import TestCase
 
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
 
 from core.models import Ingredient, Recipe
+from core.tests.shards import create_user_on_shard_of, UserShardMixin
 
 from recipe.serializers import IngredientSerializer
 
@@ -26,8 +28,9 @@ class PublicIngredientsApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
 
 
-class PrivateIngredientsApiTests(TestCase):
+class PrivateIngredientsApiTests(UserShardMixin, TestCase):
     """Test ingredients can e retrieved by authorized user."""
+    multi_db = True
 
     def setUp(self):
         self.client = APIClient()
@@ -36,6 +39,7 @@ class PrivateIngredientsApiTests(TestCase):
             'test1234'
         )
         self.client.force_authenticate(self.user)
+        self.use_shard_of(self.user)
 
     def test_retrieve_ingredients_list(self):
         """Test retrieving a list of ingridients."""
@@ -51,10 +55,7 @@ class PrivateIngredientsApiTests(TestCase):
 
     def test_ingredients_limited_to_user(self):
         """Test that ingredients for the authenticated user are returned."""
-        second_user = get_user_model().objects.create_user(
-            'other@companydomain.com',
-            'test1234'
-        )
+        second_user = create_user_on_shard_of(self.user)
         Ingredient.objects.create(user=second_user, name='Vinegar')
         ingredient = Ingredient.objects.create(user=self.user, name='Tumeric')
 
@@ -125,3 +126,16 @@ class PrivateIngredientsApiTests(TestCase):
         res = self.client.get(INGREDIENTS_URL, {'assigned_only': 1})
 
         self.assertEqual(len(res.data), 1)
+
+    def test_list_renders_same_bytes_as_model_serializer(self):
+        """Test the ingredient list matches its serializer byte for byte."""
+        Ingredient.objects.create(user=self.user, name='Crème')
+        Ingredient.objects.create(user=self.user, name='Salt')
+
+        res = self.client.get(INGREDIENTS_URL, HTTP_ACCEPT='application/json')
+
+        ingredients = Ingredient.objects.filter(
+            user=self.user
+        ).order_by('-name')
+        serializer = IngredientSerializer(ingredients, many=True)
+        self.assertEqual(res.content, JSONRenderer().render(serializer.data))
@@ -1,16 +1,21 @@
 import tempfile
 import os
+from decimal import Decimal
 
 from PIL import Image
 
 from django.contrib.auth import get_user_model
+from django.db.models import Prefetch
 from django.test import TestCase
 from django.urls import reverse
 
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
 
+from core import sharding
 from core.models import Recipe, Tag, Ingredient
+from core.tests.shards import create_user_on_shard_of, UserShardMixin
 
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
 
@@ -28,6 +33,11 @@ def detail_url(recipe_id):
     return reverse('recipe:recipe-detail', args=[recipe_id])
 
 
+def similar_url(recipe_id):
+    """Return the similar recipes URL of a recipe."""
+    return reverse('recipe:recipe-similar', args=[recipe_id])
+
+
 def create_sample_tag(user, name='Main Course'):
     """Create and return a sample tag."""
     return Tag.objects.create(user=user, name=name)
@@ -63,8 +73,9 @@ class PublicRecipeApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
 
 
-class PrivateRecipeApiTests(TestCase):
+class PrivateRecipeApiTests(UserShardMixin, TestCase):
     """Test anauthenticated recipe API access."""
+    multi_db = True
 
     def setUp(self):
         self.client = APIClient()
@@ -73,6 +84,7 @@ class PrivateRecipeApiTests(TestCase):
             'test1234'
         )
         self.client.force_authenticate(self.user)
+        self.use_shard_of(self.user)
 
     def test_retrieve_recipes(self):
         """Test retrieving a list of recipes."""
@@ -88,10 +100,7 @@ class PrivateRecipeApiTests(TestCase):
 
     def test_recipes_limited_to_user(self):
         """Test retrieving recipes for user."""
-        second_user = get_user_model().objects.create_user(
-            'other@companydomain.com',
-            'test1234'
-        )
+        second_user = create_user_on_shard_of(self.user)
         create_sample_recipe(user=second_user)
         create_sample_recipe(user=self.user)
 
@@ -260,8 +269,229 @@ class PrivateRecipeApiTests(TestCase):
         self.assertIn(second_serializer.data, res.data)
         self.assertNotIn(third_serializer.data, res.data)
 
+    def test_filter_cookable_recipes(self):
+        """Test returning recipes made only of the given ingredients."""
+        eggs = create_sample_ingredient(user=self.user, name='Eggs')
+        milk = create_sample_ingredient(user=self.user, name='Milk')
+        flour = create_sample_ingredient(user=self.user, name='Flour')
+        omelette = create_sample_recipe(user=self.user, title='Omelette')
+        omelette.ingredients.add(eggs)
+        pancakes = create_sample_recipe(user=self.user, title='Pancakes')
+        pancakes.ingredients.add(eggs, milk, flour)
+        custard = create_sample_recipe(user=self.user, title='Custard')
+        custard.ingredients.add(eggs, milk)
+
+        res = self.client.get(RECIPES_URL, {
+            'ingredients': f'{eggs.id},{milk.id}',
+            'ingredients_match': 'subset',
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([recipe['id'] for recipe in res.data],
+                         [custard.id, omelette.id])
+
+        res = self.client.get(RECIPES_URL, {
+            'ingredients': f'{eggs.id},{milk.id}',
+            'ingredients_match': 'subset',
+            'max_missing': 1,
+        })
+
+        self.assertEqual([recipe['id'] for recipe in res.data],
+                         [custard.id, omelette.id, pancakes.id])
+
+    def test_filter_recipes_by_time_and_price(self):
+        """Test filtering recipes on time and price ranges."""
+        quick = create_sample_recipe(user=self.user, time_minutes=10,
+                                     price=Decimal('4.00'))
+        cheap = create_sample_recipe(user=self.user, time_minutes=45,
+                                     price=Decimal('3.50'))
+        create_sample_recipe(user=self.user, time_minutes=20,
+                             price=Decimal('25.00'))
+
+        res = self.client.get(RECIPES_URL, {'max_time': 30,
+                                            'max_price': '10'})
+        self.assertEqual([recipe['id'] for recipe in res.data], [quick.id])
+
+        res = self.client.get(RECIPES_URL, {'min_price': '3.50',
+                                            'max_price': '4'})
+        self.assertEqual([recipe['id'] for recipe in res.data],
+                         [cheap.id, quick.id])
+
+    def test_filter_recipes_invalid_range(self):
+        """Test that invalid range filters are rejected."""
+        for params in ({'max_time': 'soon'}, {'min_price': 'cheap'},
+                       {'max_price': 'NaN'}):
+            res = self.client.get(RECIPES_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(list(params)[0], res.data)
+
+    def test_order_recipes(self):
+        """Test ordering recipes on a whitelisted field."""
+        first = create_sample_recipe(user=self.user, title='Banana bread',
+                                     price=Decimal('8.00'))
+        second = create_sample_recipe(user=self.user, title='Apple pie',
+                                      price=Decimal('8.00'))
+        third = create_sample_recipe(user=self.user, title='Carrot cake',
+                                     price=Decimal('2.00'))
+
+        res = self.client.get(RECIPES_URL, {'ordering': 'price'})
+        self.assertEqual([recipe['id'] for recipe in res.data],
+                         [third.id, first.id, second.id])
+
+        res = self.client.get(RECIPES_URL, {'ordering': '-price'})
+        self.assertEqual([recipe['id'] for recipe in res.data],
+                         [second.id, first.id, third.id])
+
+        res = self.client.get(RECIPES_URL, {'ordering': 'title'})
+        self.assertEqual([recipe['id'] for recipe in res.data],
+                         [second.id, first.id, third.id])
+
+        res = self.client.get(RECIPES_URL, {'ordering': 'link'})
+        self.assertEqual([recipe['id'] for recipe in res.data],
+                         [third.id, second.id, first.id])
+
+    def test_list_renders_same_bytes_as_model_serializer(self):
+        """Test the recipe list matches RecipeSerializer byte for byte."""
+        first_recipe = create_sample_recipe(user=self.user,
+                                            title='Crème brûlée',
+                                            price=Decimal('12.5'))
+        first_recipe.tags.add(create_sample_tag(user=self.user),
+                              create_sample_tag(user=self.user, name='Vegan'))
+        first_recipe.ingredients.add(create_sample_ingredient(user=self.user))
+        create_sample_recipe(user=self.user, link='https://example.com')
+
+        res = self.client.get(RECIPES_URL, HTTP_ACCEPT='application/json')
+
+        recipes = Recipe.objects.filter(user=self.user).order_by(
+            '-id'
+        ).prefetch_related(
+            Prefetch('tags', queryset=Tag.objects.order_by('id')),
+            Prefetch('ingredients', queryset=Ingredient.objects.order_by('id'))
+        )
+        serializer = RecipeSerializer(recipes, many=True)
+        self.assertEqual(res.content, JSONRenderer().render(serializer.data))
+
+    def test_list_queries_do_not_grow_with_recipes(self):
+        """Test listing recipes runs a fixed number of queries."""
+        tag = create_sample_tag(user=self.user)
+        ingredient = create_sample_ingredient(user=self.user)
+        for _ in range(5):
+            recipe = create_sample_recipe(user=self.user)
+            recipe.tags.add(tag)
+            recipe.ingredients.add(ingredient)
+
+        with self.assertNumQueries(1, using=sharding.current_shard()):
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(len(res.data), 5)
+
+    def test_list_matches_prefetched_serializer(self):
+        """Test one list query returns what prefetching needs three for."""
+        first_tag = create_sample_tag(user=self.user, name='Vegan')
+        second_tag = create_sample_tag(user=self.user, name='Dessert')
+        ingredient = create_sample_ingredient(user=self.user)
+        first_recipe = create_sample_recipe(user=self.user)
+        first_recipe.tags.add(first_tag, second_tag)
+        first_recipe.ingredients.add(ingredient)
+        second_recipe = create_sample_recipe(user=self.user)
+        second_recipe.tags.add(second_tag)
+        create_sample_recipe(user=self.user)
+
+        with self.assertNumQueries(3, using=sharding.current_shard()):
+            # The list returns related ids in order.
+            recipes = Recipe.objects.filter(user=self.user).order_by(
+                '-id'
+            ).prefetch_related(
+                Prefetch('tags', queryset=Tag.objects.order_by('id')),
+                Prefetch('ingredients',
+                         queryset=Ingredient.objects.order_by('id'))
+            )
+            expected = RecipeSerializer(recipes, many=True).data
+        with self.assertNumQueries(1, using=sharding.current_shard()):
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.data, expected)
+
+    def test_bulk_delete_recipes(self):
+        """Test deleting the recipes listed in the ids parameter."""
+        first_recipe = create_sample_recipe(user=self.user)
+        second_recipe = create_sample_recipe(user=self.user)
+        kept_recipe = create_sample_recipe(user=self.user)
+        other_recipe = create_sample_recipe(
+            user=create_user_on_shard_of(self.user)
+        )
+        first_recipe.tags.add(create_sample_tag(user=self.user))
+
+        ids = [first_recipe.id, second_recipe.id, other_recipe.id]
+        res = self.client.delete(
+            f'{RECIPES_URL}?ids={",".join(map(str, ids))}'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(
+            set(Recipe.objects.all()),
+            {kept_recipe, other_recipe}
+        )
+
+    def test_bulk_delete_requires_ids(self):
+        """Test that bulk deletion needs a valid list of ids."""
+        create_sample_recipe(user=self.user)
+
+        for url in (RECIPES_URL, f'{RECIPES_URL}?ids=one'):
+            res = self.client.delete(url)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Recipe.objects.count(), 1)
+
+    def test_similar_recipes(self):
+        """Test listing recipes with similar ingredients."""
+        ingredients = [
+            create_sample_ingredient(user=self.user, name=name)
+            for name in ('Flour', 'Sugar', 'Butter', 'Egg')
+        ]
+        recipe = create_sample_recipe(user=self.user)
+        recipe.ingredients.add(*ingredients)
+        similar = create_sample_recipe(user=self.user, title='Similar')
+        similar.ingredients.add(*ingredients)
+
+        res = self.client.get(similar_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 1)
+        self.assertEqual(res.data[0]['id'], similar.id)
+        self.assertEqual(res.data[0]['similarity'], 1.0)
+
+    def test_similar_recipes_limit_clamped(self):
+        """Test that the number of similar recipes stays within 1 to 50."""
+        ingredients = [
+            create_sample_ingredient(user=self.user, name=name)
+            for name in ('Flour', 'Sugar')
+        ]
+        recipe = create_sample_recipe(user=self.user)
+        recipe.ingredients.add(*ingredients)
+        for index in range(3):
+            similar = create_sample_recipe(user=self.user,
+                                           title=f'Similar {index}')
+            similar.ingredients.add(*ingredients)
+
+        for limit in ('-5', '0'):
+            res = self.client.get(similar_url(recipe.id), {'limit': limit})
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(res.data), 1)
+
+    def test_similar_recipes_of_other_user(self):
+        """Test that similar recipes of another user's recipe are hidden."""
+        recipe = create_sample_recipe(
+            user=create_user_on_shard_of(self.user)
+        )
+
+        res = self.client.get(similar_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
 
-class RecipeImageUploadTests(TestCase):
+class RecipeImageUploadTests(UserShardMixin, TestCase):
+    multi_db = True
 
     def setUp(self):
         self.client = APIClient()
@@ -270,6 +500,7 @@ class RecipeImageUploadTests(TestCase):
             'test1234'
         )
         self.client.force_authenticate(self.user)
+        self.use_shard_of(self.user)
         self.recipe = create_sample_recipe(user=self.user)
 
     def tearDown(self):
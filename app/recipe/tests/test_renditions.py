@@ -0,0 +1,161 @@
+import io
+import os
+import shutil
+import tempfile
+import threading
+from unittest.mock import patch
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+
+from recipe import renditions
+
+
+def rendition_url(recipe_id, width=160, height=160, fmt='jpg'):
+    """Return the URL of a recipe image rendition."""
+    return reverse('image-rendition', args=[recipe_id, width, height, fmt])
+
+
+class ImageRenditionTests(TestCase):
+    multi_db = True
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        settings_override = override_settings(IMAGE_RENDITION_ROOT=self.root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        user = get_user_model().objects.create_user(
+            'test@companydomain.com',
+            'test1234'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        self.recipe = Recipe.objects.create(user=user, title='Sample Recipe',
+                                            time_minutes=10, price=5.00)
+        image = io.BytesIO()
+        Image.new('RGBA', (400, 200)).save(image, format='PNG')
+        self.recipe.image.save('image.png', ContentFile(image.getvalue()))
+        self.addCleanup(self.recipe.image.delete, save=False)
+
+    def test_resize_image(self):
+        """Test that an image is resized to fit and cached."""
+        res = self.client.get(rendition_url(self.recipe.id, 320, 320))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res['Content-Type'], 'image/jpeg')
+        self.assertIn('Content-Length', res)
+        self.assertIn('private', res['Cache-Control'])
+        self.assertIn('max-age=', res['Cache-Control'])
+        image = Image.open(io.BytesIO(b''.join(res.streaming_content)))
+        self.assertEqual(image.size, (320, 160))
+        self.assertEqual(image.format, 'JPEG')
+
+        with patch.object(renditions.Rendition, '_create') as create:
+            res = self.client.get(rendition_url(self.recipe.id, 320, 320))
+            self.assertEqual(res.status_code, 200)
+            b''.join(res.streaming_content)
+        create.assert_not_called()
+
+    def test_owner_only(self):
+        """Test that only the owner of a recipe gets its renditions."""
+        other_user = get_user_model().objects.create_user(
+            'other@companydomain.com',
+            'test1234'
+        )
+        url = rendition_url(self.recipe.id)
+
+        self.assertEqual(APIClient().get(url).status_code, 401)
+        self.client.force_authenticate(other_user)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_not_modified(self):
+        """Test that a matching ETag gets an empty response."""
+        etag = self.client.get(rendition_url(self.recipe.id))['ETag']
+
+        res = self.client.get(rendition_url(self.recipe.id),
+                              HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, 304)
+
+    def test_invalid_renditions(self):
+        """Test that unknown formats, sizes and images are not found."""
+        recipe_without_image = Recipe.objects.create(
+            user=self.recipe.user, title='No image', time_minutes=5, price=1
+        )
+        urls = [
+            rendition_url(self.recipe.id, fmt='gif'),
+            rendition_url(self.recipe.id, width=0),
+            rendition_url(self.recipe.id, height=10000),
+            rendition_url(self.recipe.id, 161, 161),
+            rendition_url(recipe_without_image.id),
+        ]
+
+        for url in urls:
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, 404)
+
+    def test_concurrent_requests_resize_once(self):
+        """Test that concurrent requests for a rendition resize it once."""
+        create = renditions.Rendition._create
+        calls = []
+        started = threading.Event()
+
+        def slow_create(rendition):
+            calls.append(rendition.path)
+            started.set()
+            threading.Event().wait(0.1)
+            return create(rendition)
+
+        def get():
+            renditions.Rendition(self.recipe, 80, 80, 'webp').get().close()
+
+        with patch.object(renditions.Rendition, '_create', slow_create):
+            threads = [threading.Thread(target=get) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(len(calls), 1)
+
+    def test_evict_least_recently_used(self):
+        """Test that eviction removes the oldest renditions first."""
+        paths = []
+        for size in (10, 20, 30):
+            rendition = renditions.Rendition(self.recipe, size, size, 'png')
+            rendition.get().close()
+            paths.append(rendition.path)
+        for age, path in enumerate(paths):
+            os.utime(path, (1000 + age, 1000 + age))
+        renditions.Rendition(self.recipe, 10, 10, 'png').get().close()
+
+        size = renditions.evict(os.path.getsize(paths[0]))
+
+        self.assertEqual(size, os.path.getsize(paths[0]))
+        self.assertEqual([os.path.exists(path) for path in paths],
+                         [True, False, False])
+
+    def test_evicted_while_served(self):
+        """Test that a rendition evicted after it is created is still sent."""
+        def create_and_evict(rendition):
+            file = create(rendition)
+            os.remove(rendition.path)
+            return file
+
+        create = renditions.Rendition._create
+        with patch.object(renditions.Rendition, '_create', create_and_evict):
+            res = self.client.get(rendition_url(self.recipe.id))
+
+        self.assertEqual(res.status_code, 200)
+        image = Image.open(io.BytesIO(b''.join(res.streaming_content)))
+        self.assertEqual(image.size, (160, 80))
@@ -0,0 +1,61 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import sharding
+from core.models import Recipe, Tag
+from core.tests.shards import create_user_on_shard_of, UserShardMixin
+
+
+STATS_URL = reverse('recipe:stats')
+
+
+class PublicStatsApiTests(TestCase):
+
+    def test_login_required(self):
+        """Test that login is required to see stats."""
+        res = APIClient().get(STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateStatsApiTests(UserShardMixin, TestCase):
+    multi_db = True
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@companydomain.com',
+            'test1234'
+        )
+        self.client.force_authenticate(self.user)
+        self.use_shard_of(self.user)
+
+    def test_retrieve_stats(self):
+        """Test retrieving the stats of the user's recipes only."""
+        recipe = Recipe.objects.create(user=self.user, title='Sample Recipe',
+                                       time_minutes=10, price=5.00)
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+        other_user = create_user_on_shard_of(self.user)
+        Recipe.objects.create(user=other_user, title='Other Recipe',
+                              time_minutes=60, price=40.00)
+
+        with self.assertNumQueries(3, using=sharding.current_shard()):
+            res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['recipe_count'], 1)
+        self.assertEqual(res.data['avg_time_minutes'], 10)
+        self.assertEqual(res.data['avg_price'], '5.00')
+        self.assertEqual(res.data['tags'][0]['name'], 'Vegan')
+
+    def test_retrieve_empty_stats(self):
+        """Test the stats of a user without recipes."""
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.data['recipe_count'], 0)
+        self.assertIsNone(res.data['avg_price'])
+        self.assertEqual(res.data['tags'], [])
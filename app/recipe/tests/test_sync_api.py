@@ -0,0 +1,176 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import events, sync
+from core.models import Ingredient, Recipe, Tag
+
+
+SYNC_URL = reverse('recipe:sync')
+EVENTS_URL = reverse('recipe:events')
+
+
+class PublicSyncApiTests(TestCase):
+
+    def test_login_required(self):
+        """Test that login is required to sync."""
+        res = APIClient().get(SYNC_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_events_login_required(self):
+        """Test that login is required to stream events."""
+        res = APIClient().get(EVENTS_URL, HTTP_ACCEPT='text/event-stream')
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertTrue(res.content.startswith(b'event: error\n'))
+
+
+class PrivateSyncApiTests(TestCase):
+    multi_db = True
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@companydomain.com',
+            'test1234'
+        )
+        self.client.force_authenticate(self.user)
+
+    def create_recipe(self, **params):
+        """Create and return a recipe of the user."""
+        return Recipe.objects.create(user=self.user, title='Sample Recipe',
+                                     time_minutes=10, price=5.00, **params)
+
+    def test_initial_sync(self):
+        """Test that syncing without a cursor returns everything."""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        ingredient = Ingredient.objects.create(user=self.user, name='Kale')
+        recipe = self.create_recipe()
+        recipe.tags.add(tag)
+        recipe.ingredients.add(ingredient)
+        other_user = get_user_model().objects.create_user(
+            'other@companydomain.com',
+            'test1234'
+        )
+        Tag.objects.create(user=other_user, name='Other')
+
+        res = self.client.get(SYNC_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['recipes'], [{
+            'id': recipe.id,
+            'title': 'Sample Recipe',
+            'ingredients': [ingredient.id],
+            'tags': [tag.id],
+            'time_minutes': 10,
+            'price': '5.00',
+            'link': '',
+        }])
+        self.assertEqual(res.data['tags'], [{'id': tag.id, 'name': 'Vegan'}])
+        self.assertEqual(res.data['ingredients'],
+                         [{'id': ingredient.id, 'name': 'Kale'}])
+        self.assertEqual(res.data['deleted'],
+                         {'recipes': [], 'tags': [], 'ingredients': []})
+        self.assertFalse(res.data['more'])
+
+    def test_sync_since_cursor(self):
+        """Test that only changes after the cursor are returned."""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        unchanged = self.create_recipe()
+        recipe = self.create_recipe()
+        cursor = self.client.get(SYNC_URL).data['cursor']
+
+        recipe.tags.add(tag)
+        removed = self.create_recipe()
+        removed_id, tag_id = removed.id, tag.id
+        removed.delete()
+        tag.delete()
+
+        res = self.client.get(SYNC_URL, {'since': cursor})
+
+        self.assertEqual([row['id'] for row in res.data['recipes']],
+                         [recipe.id])
+        self.assertEqual(res.data['recipes'][0]['tags'], [])
+        self.assertEqual(res.data['tags'], [])
+        self.assertEqual(res.data['deleted'], {
+            'recipes': [removed_id],
+            'tags': [tag_id],
+            'ingredients': [],
+        })
+        self.assertNotIn(unchanged.id,
+                         [row['id'] for row in res.data['recipes']])
+
+        res = self.client.get(SYNC_URL, {'since': res.data['cursor']})
+
+        self.assertEqual(res.data['recipes'], [])
+        self.assertEqual(res.data['deleted']['recipes'], [])
+
+    @override_settings(SYNC_PAGE_SIZE=2)
+    def test_sync_pages(self):
+        """Test that large syncs are returned a page at a time."""
+        recipes = [self.create_recipe() for _ in range(3)]
+
+        res = self.client.get(SYNC_URL)
+
+        self.assertTrue(res.data['more'])
+        self.assertEqual([row['id'] for row in res.data['recipes']],
+                         [recipe.id for recipe in recipes[:2]])
+
+        res = self.client.get(SYNC_URL, {'since': res.data['cursor']})
+
+        self.assertFalse(res.data['more'])
+        self.assertEqual([row['id'] for row in res.data['recipes']],
+                         [recipes[2].id])
+
+    def test_invalid_cursor(self):
+        """Test that an invalid cursor is rejected."""
+        res = self.client.get(SYNC_URL, {'since': 'yesterday'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(EVENT_STREAM_MAX_SECONDS=0)
+class PrivateEventsApiTests(TestCase):
+    multi_db = True
+
+    def setUp(self):
+        broker = events.Broker(poll_interval=0.1)
+        patcher = patch('core.events.broker', broker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(broker.stop)
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@companydomain.com',
+            'test1234'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_stream_events(self):
+        """Test opening an event stream, resuming after an event id."""
+        Tag.objects.create(user=self.user, name='Vegan')
+        cursor = sync.last_sequence(self.user)
+        tag = Tag.objects.create(user=self.user, name='Keto')
+
+        res = self.client.get(EVENTS_URL, HTTP_ACCEPT='text/event-stream',
+                              HTTP_LAST_EVENT_ID=str(cursor))
+        content = b''.join(res.streaming_content).decode()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'text/event-stream')
+        self.assertEqual(res['Cache-Control'], 'no-cache')
+        self.assertIn(f'id: {cursor}\nevent: ready\n', content)
+        self.assertIn(f'event: updated\ndata: {{"kind":"tag","id":{tag.id}}}',
+                      content)
+
+    def test_invalid_last_event_id(self):
+        """Test that an invalid event id is rejected."""
+        res = self.client.get(EVENTS_URL, {'last_event_id': 'last'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
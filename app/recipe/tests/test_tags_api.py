@@ -3,9 +3,11 @@ from django.urls import reverse
 from django.test import TestCase
 
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
 
 from core.models import Tag, Recipe
+from core.tests.shards import create_user_on_shard_of, UserShardMixin
 
 from recipe.serializers import TagSerializer
 
@@ -25,14 +27,16 @@ class PublicTagsApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
 
 
-class PrivateTagsApiTests(TestCase):
+class PrivateTagsApiTests(UserShardMixin, TestCase):
     """Test the authorized user tags API."""
+    multi_db = True
 
     def setUp(self):
         self.user = get_user_model().objects.create_user(
             'test@companydomain.com',
             'test1234'
         )
+        self.use_shard_of(self.user)
         self.client = APIClient()
         self.client.force_authenticate(self.user)
 
@@ -51,10 +55,7 @@ class PrivateTagsApiTests(TestCase):
 
     def test_tags_limited_to_user(self):
         """Test that tags returned are for the authenticated user."""
-        second_user = get_user_model().objects.create_user(
-            'other@companydomain.com',
-            'test1234'
-        )
+        second_user = create_user_on_shard_of(self.user)
         Tag.objects.create(user=second_user, name='Fruity')
         tag = Tag.objects.create(user=self.user, name='Comfort food')
 
@@ -124,3 +125,14 @@ class PrivateTagsApiTests(TestCase):
         res = self.client.get(TAGS_URL, {'assigned_only': 1})
 
         self.assertEqual(len(res.data), 1)
+
+    def test_list_renders_same_bytes_as_model_serializer(self):
+        """Test the tag list matches TagSerializer byte for byte."""
+        Tag.objects.create(user=self.user, name='Crème')
+        Tag.objects.create(user=self.user, name='Salt')
+
+        res = self.client.get(TAGS_URL, HTTP_ACCEPT='application/json')
+
+        tags = Tag.objects.filter(user=self.user).order_by('-name')
+        serializer = TagSerializer(tags, many=True)
+        self.assertEqual(res.content, JSONRenderer().render(serializer.data))
@@ -0,0 +1,178 @@
+import io
+from unittest.mock import patch
+
+import boto3
+from moto import mock_s3
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.files.storage import FileSystemStorage
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+from core.storage import MediaStorage
+
+
+BUCKET = 'recipe-media'
+
+
+def upload_url(recipe_id):
+    """Return the URL requesting a direct image upload."""
+    return reverse('recipe:recipe-image-upload-start', args=[recipe_id])
+
+
+def complete_url(recipe_id):
+    """Return the URL completing a direct image upload."""
+    return reverse('recipe:recipe-image-upload-complete', args=[recipe_id])
+
+
+def sample_image(fmt='PNG'):
+    """Return the bytes of a small image."""
+    output = io.BytesIO()
+    Image.new('RGB', (10, 10)).save(output, format=fmt)
+    return output.getvalue()
+
+
+@mock_s3
+class DirectUploadTests(TestCase):
+    multi_db = True
+
+    def setUp(self):
+        boto3.client('s3', region_name='us-east-1').create_bucket(
+            Bucket=BUCKET
+        )
+        self.storage = MediaStorage(
+            bucket_name=BUCKET,
+            access_key='testing',
+            secret_key='testing',
+            region_name='us-east-1',
+            default_acl=None,
+            file_overwrite=False
+        )
+        storage_patch = patch.object(Recipe._meta.get_field('image'),
+                                     'storage', self.storage)
+        storage_patch.start()
+        self.addCleanup(storage_patch.stop)
+
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@companydomain.com',
+            'test1234'
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(user=self.user,
+                                            title='Sample Recipe',
+                                            time_minutes=10, price=5.00)
+
+    def start_upload(self, content_type='image/png'):
+        """Request a direct upload and return the response data."""
+        res = self.client.post(upload_url(self.recipe.id),
+                               {'content_type': content_type})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def put(self, upload, content, content_type='image/png'):
+        """Store an object as the client would with the presigned form."""
+        self.storage.connection.meta.client.put_object(
+            Bucket=BUCKET,
+            Key=upload['fields']['key'],
+            Body=content,
+            ContentType=content_type
+        )
+
+    def test_start_upload(self):
+        """Test that a presigned POST is returned for a new image."""
+        upload = self.start_upload()
+
+        self.assertIn(BUCKET, upload['url'])
+        self.assertRegex(upload['fields']['key'], r'^uploads/recipe/.+\.png$')
+        self.assertEqual(upload['fields']['Content-Type'], 'image/png')
+        self.assertIn('policy', upload['fields'])
+
+    def test_start_upload_invalid_content_type(self):
+        """Test that only image content types can be uploaded."""
+        res = self.client.post(upload_url(self.recipe.id),
+                               {'content_type': 'text/html'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_complete_upload(self):
+        """Test that an uploaded image is verified and attached."""
+        upload = self.start_upload()
+        self.put(upload, sample_image())
+
+        res = self.client.post(complete_url(self.recipe.id),
+                               {'upload': upload['upload']})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image.name, upload['fields']['key'])
+        self.assertIn(upload['fields']['key'], res.data['image'])
+
+    def test_complete_missing_upload(self):
+        """Test completing an upload that never happened."""
+        upload = self.start_upload()
+
+        res = self.client.post(complete_url(self.recipe.id),
+                               {'upload': upload['upload']})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
+
+    def test_complete_invalid_image(self):
+        """Test that an object that is not the image is deleted."""
+        upload = self.start_upload()
+        self.put(upload, sample_image('JPEG'))
+
+        res = self.client.post(complete_url(self.recipe.id),
+                               {'upload': upload['upload']})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(self.storage.exists(upload['fields']['key']))
+
+    def test_complete_upload_of_other_recipe(self):
+        """Test that an upload cannot be attached to another recipe."""
+        other_recipe = Recipe.objects.create(user=self.user, title='Other',
+                                             time_minutes=5, price=1.00)
+        upload = self.start_upload()
+        self.put(upload, sample_image())
+
+        res = self.client.post(complete_url(other_recipe.id),
+                               {'upload': upload['upload']})
+        forged = self.client.post(
+            complete_url(self.recipe.id),
+            {'upload': signing.dumps({'recipe': self.recipe.id,
+                                      'name': 'uploads/recipe/x.png',
+                                      'type': 'image/png'})}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(forged.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class DirectUploadDisabledTests(TestCase):
+    multi_db = True
+
+    def test_not_found_without_object_storage(self):
+        """Test that direct uploads need an object storage."""
+        user = get_user_model().objects.create_user(
+            'test@companydomain.com',
+            'test1234'
+        )
+        recipe = Recipe.objects.create(user=user, title='Sample Recipe',
+                                       time_minutes=10, price=5.00)
+        client = APIClient()
+        client.force_authenticate(user)
+
+        with patch.object(Recipe._meta.get_field('image'), 'storage',
+                          FileSystemStorage()):
+            res = client.post(upload_url(recipe.id),
+                              {'content_type': 'image/png'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,105 @@
+import io
+
+from django.conf import settings
+from django.core import signing
+from django.utils.translation import ugettext_lazy as _
+from rest_framework.exceptions import NotFound, ValidationError
+
+from core.models import Recipe, recipe_image_file_path
+
+
+# Content types accepted for direct uploads, with their extension and
+# the Pillow format the uploaded bytes must have.
+IMAGE_CONTENT_TYPES = {
+    'image/jpeg': ('jpg', 'JPEG'),
+    'image/png': ('png', 'PNG'),
+    'image/webp': ('webp', 'WEBP'),
+    'image/gif': ('gif', 'GIF'),
+}
+SIGNING_SALT = 'recipe.uploads'
+# Enough bytes for Pillow to identify the format from the header.
+HEADER_SIZE = 64 * 1024
+
+
+def direct_upload_storage():
+    """Return the recipe image storage, if clients can upload to it."""
+    storage = Recipe._meta.get_field('image').storage
+    if not hasattr(storage, 'presigned_upload'):
+        raise NotFound(_('Direct uploads are not enabled.'))
+
+    return storage
+
+
+def start_upload(recipe, content_type: str) -> dict:
+    """Return a presigned upload for a new image of a recipe.
+
+    Returns:
+        dict: the URL and form fields to POST the file with, and the
+        signed `upload` value to complete the upload with.
+    """
+    storage = direct_upload_storage()
+    extension = IMAGE_CONTENT_TYPES[content_type][0]
+    name = recipe_image_file_path(recipe, f'image.{extension}')
+    presigned = storage.presigned_upload(
+        name,
+        content_type,
+        settings.IMAGE_UPLOAD_MAX_SIZE,
+        settings.IMAGE_UPLOAD_URL_EXPIRY
+    )
+
+    return {
+        'url': presigned['url'],
+        'fields': presigned['fields'],
+        'upload': signing.dumps(
+            {'recipe': recipe.id, 'name': name, 'type': content_type},
+            salt=SIGNING_SALT
+        ),
+    }
+
+
+def _check_uploaded_image(storage, name: str, content_type: str):
+    """Raise ValidationError unless the object is a valid image."""
+    from botocore.exceptions import ClientError
+    from PIL import Image
+
+    try:
+        metadata = storage.head(name)
+    except ClientError:
+        raise ValidationError({'upload': [_('The file was not uploaded.')]})
+
+    error = None
+    if metadata['ContentLength'] > settings.IMAGE_UPLOAD_MAX_SIZE:
+        error = _('The file is too large.')
+    else:
+        try:
+            image = Image.open(
+                io.BytesIO(storage.read_start(name, HEADER_SIZE))
+            )
+        except OSError:
+            image = None
+        if image is None or \
+                image.format != IMAGE_CONTENT_TYPES[content_type][1]:
+            error = _('Invalid image.')
+
+    if error:
+        storage.delete(name)
+        raise ValidationError({'upload': [error]})
+
+
+def complete_upload(recipe, upload: str):
+    """Verify a directly uploaded image and attach it to a recipe."""
+    storage = direct_upload_storage()
+    try:
+        upload = signing.loads(
+            upload,
+            salt=SIGNING_SALT,
+            max_age=settings.IMAGE_UPLOAD_URL_EXPIRY * 2
+        )
+    except signing.BadSignature:
+        upload = None
+    if upload is None or upload['recipe'] != recipe.id:
+        raise ValidationError({'upload': [_('Invalid upload.')]})
+
+    _check_uploaded_image(storage, upload['name'], upload['type'])
+    recipe.image = upload['name']
+    recipe.save(update_fields=['image'])
@@ -4,7 +4,17 @@ from rest_framework.routers import DefaultRouter
 from recipe import views
 
 
-router = DefaultRouter()
+class Router(DefaultRouter):
+    """Router also mapping DELETE on list routes to `bulk_destroy`."""
+    routes = [
+        DefaultRouter.routes[0]._replace(
+            mapping=dict(DefaultRouter.routes[0].mapping,
+                         delete='bulk_destroy')
+        ),
+    ] + DefaultRouter.routes[1:]
+
+
+router = Router()
 router.register('tags', views.TagViewSet)
 router.register('ingredients', views.IngredientViewSet)
 router.register('recipes', views.RecipeViewSet)
@@ -12,5 +22,8 @@ router.register('recipes', views.RecipeViewSet)
 app_name = 'recipe'
 
 urlpatterns = [
+    path('stats/', views.RecipeStatsView.as_view(), name='stats'),
+    path('sync/', views.SyncView.as_view(), name='sync'),
+    path('events/', views.EventStreamView.as_view(), name='events'),
     path('', include(router.urls))
 ]
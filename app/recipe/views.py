@@ -1,15 +1,53 @@
+import os
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db.models import OuterRef
+from django.http import FileResponse, Http404, HttpResponseNotModified, \
+    StreamingHttpResponse
+from django.utils.cache import patch_cache_control
+from django.utils.translation import ugettext_lazy as _
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework import viewsets, mixins, status
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
 
-from core.models import Tag, Ingredient, Recipe
+from core import events, pantry, similarity, stats, sync
+from core.deletion import delete_recipes
+from core.expressions import ArraySubquery
+from core.renderers import EventStreamRenderer, ORJSONRenderer
+from core.models import Tag, Ingredient, Recipe, SyncChange
+from core.views import ShardedViewMixin
+from user.authentication import TokenAuthentication
 
 from recipe import serializers
+from recipe.renditions import FORMATS, Rendition
+from recipe.uploads import complete_upload, start_upload
+
+
+def _related_ids(through, field: str):
+    """Return an array of the related ids of each recipe, by id."""
+    return ArraySubquery(
+        through.objects.filter(
+            recipe_id=OuterRef('pk')
+        ).order_by(field).values(field)
+    )
+
+
+def recipe_values(queryset):
+    """Return the rows of RecipeValuesSerializer for recipes."""
+    return queryset.annotate(
+        ingredient_ids=_related_ids(
+            Recipe.ingredients.through, 'ingredient_id'
+        ),
+        tag_ids=_related_ids(Recipe.tags.through, 'tag_id'),
+    ).values(*serializers.RecipeValuesSerializer.value_fields)
 
 
-class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
+class BaseRecipeAttrViewSet(ShardedViewMixin,
+                            viewsets.GenericViewSet,
                             mixins.ListModelMixin,
                             mixins.CreateModelMixin):
     """Base viewset for user owned recipe attributes."""
@@ -25,9 +63,20 @@ class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
         if assigned_only:
             queryset = queryset.filter(recipe__isnull=False)
 
-        return queryset.filter(
+        queryset = queryset.filter(
             user=self.request.user
             ).order_by('-name').distinct()
+        if self.action == 'list':
+            return queryset.values(*self.values_serializer_class.value_fields)
+
+        return queryset
+
+    def get_serializer_class(self):
+        """Return the values serializer for list requests."""
+        if self.action == 'list':
+            return self.values_serializer_class
+
+        return self.serializer_class
 
     def perform_create(self, serializer):
         """Create a new object."""
@@ -38,45 +87,118 @@ class TagViewSet(BaseRecipeAttrViewSet):
     """Manage tags in the database."""
     queryset = Tag.objects.all()
     serializer_class = serializers.TagSerializer
+    values_serializer_class = serializers.TagValuesSerializer
 
 
 class IngredientViewSet(BaseRecipeAttrViewSet):
     """Manage ingredients in the database."""
     queryset = Ingredient.objects.all()
     serializer_class = serializers.IngredientSerializer
+    values_serializer_class = serializers.IngredientValuesSerializer
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ShardedViewMixin, viewsets.ModelViewSet):
     """Manage ingredients in the database."""
     queryset = Recipe.objects.all()
     serializer_class = serializers.RecipeSerializer
+    values_serializer_class = serializers.RecipeValuesSerializer
     authentication_classes = (TokenAuthentication, )
     permission_classes = (IsAuthenticated, )
+    # Query parameter: (lookup, value parser) of the list range filters.
+    range_filters = {
+        'max_time': ('time_minutes__lte', int),
+        'min_price': ('price__gte', Decimal),
+        'max_price': ('price__lte', Decimal),
+    }
+    ordering_fields = ('id', 'time_minutes', 'price', 'title')
 
     def _params_to_ints(self, qs):
         """Convert a list of string IDs to a list of integers"""
         return [int(str_id) for str_id in qs.split(',')]
 
+    def _max_missing(self) -> int:
+        """Return the number of ingredients a cookable recipe may lack."""
+        try:
+            return max(int(self.request.query_params.get('max_missing', 0)),
+                       0)
+        except ValueError:
+            return 0
+
+    def _filter_ranges(self, queryset):
+        """Apply the range filters given in the query parameters."""
+        for param, (lookup, parse) in self.range_filters.items():
+            value = self.request.query_params.get(param)
+            if value is None:
+                continue
+            try:
+                value = parse(value)
+            except (ValueError, InvalidOperation):
+                value = None
+            if value is None or (isinstance(value, Decimal) and
+                                 not value.is_finite()):
+                raise ValidationError({param: [_('A number is required.')]})
+            queryset = queryset.filter(**{lookup: value})
+
+        return queryset
+
+    def _ordering(self) -> tuple:
+        """Return the ordering requested by the client.
+
+        Ties are broken by id in the same direction, so every ordering
+        is served by one of the (user, field, id) indexes. Unknown fields
+        fall back to the newest recipes first.
+        """
+        field = self.request.query_params.get('ordering', '-id')
+        descending = field.startswith('-')
+        name = field[1:] if descending else field
+        if name not in self.ordering_fields:
+            return ('-id', )
+        prefix = '-' if descending else ''
+
+        return tuple(dict.fromkeys((f'{prefix}{name}', f'{prefix}id')))
+
     def get_queryset(self):
         """Return recipes for the current authenticated user only."""
         tags = self.request.query_params.get('tags')
         ingredients = self.request.query_params.get('ingredients')
-        queryset = self.queryset
+        queryset = self._filter_ranges(self.queryset)
+        ordering = self._ordering()
         if tags:
             tag_ids = self._params_to_ints(tags)
             queryset = queryset.filter(tags__id__in=tag_ids)
         if ingredients:
             ingredient_ids = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredient_ids)
+            if self.request.query_params.get('ingredients_match') == \
+                    'subset':
+                queryset = pantry.cookable(queryset, self.request.user,
+                                           ingredient_ids,
+                                           self._max_missing())
+                ordering = ('missing_ingredients', ) + ordering
+            else:
+                queryset = queryset.filter(
+                    ingredients__id__in=ingredient_ids
+                )
+
+        queryset = queryset.filter(user=self.request.user)
+        if self.action == 'list':
+            return recipe_values(queryset.order_by(*ordering))
 
-        return queryset.filter(user=self.request.user)
+        return queryset
 
     def get_serializer_class(self):
         """Return appropriate serializer class."""
-        if self.action == 'retrieve':
+        if self.action == 'list':
+            return self.values_serializer_class
+        elif self.action == 'retrieve':
             return serializers.RecipeDetailSerializer
         elif self.action == 'upload_image':
             return serializers.RecipeImageSerializer
+        elif self.action == 'similar':
+            return serializers.SimilarRecipeSerializer
+        elif self.action == 'image_upload_start':
+            return serializers.ImageUploadStartSerializer
+        elif self.action == 'image_upload_complete':
+            return serializers.ImageUploadCompleteSerializer
 
         return self.serializer_class
 
@@ -84,6 +206,43 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """Create a new Recipe."""
         serializer.save(user=self.request.user)
 
+    def bulk_destroy(self, request):
+        """Delete the recipes listed in the ids query parameter."""
+        ids = request.query_params.get('ids')
+        try:
+            recipe_ids = self._params_to_ints(ids) if ids else None
+        except ValueError:
+            recipe_ids = None
+        if not recipe_ids:
+            return Response(
+                {'ids': [_('A comma separated list of ids is required.')]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        delete_recipes(self.get_queryset().filter(id__in=recipe_ids))
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(methods=['GET'], detail=True)
+    def similar(self, request, pk=None):
+        """List the recipes with the most similar ingredients."""
+        recipe = self.get_object()
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), 50)
+        except ValueError:
+            limit = 10
+
+        scores = dict(similarity.similar_recipes(recipe, limit))
+        recipes = sorted(
+            self.get_queryset().filter(
+                id__in=scores
+            ).prefetch_related('tags', 'ingredients'),
+            key=lambda similar: (-scores[similar.id], similar.id)
+        )
+        for similar in recipes:
+            similar.similarity = scores[similar.id]
+
+        return Response(self.get_serializer(recipes, many=True).data)
+
     @action(methods=['POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
         """Upload an image to a recipe."""
@@ -104,3 +263,160 @@ class RecipeViewSet(viewsets.ModelViewSet):
             serializer.errors,
             status=status.HTTP_400_BAD_REQUEST
         )
+
+    @action(methods=['POST'], detail=True, url_path='image-upload')
+    def image_upload_start(self, request, pk=None):
+        """Return a presigned URL to upload an image to storage."""
+        recipe = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        return Response(
+            start_upload(recipe, serializer.validated_data['content_type']),
+            status=status.HTTP_200_OK
+        )
+
+    @action(methods=['POST'], detail=True,
+            url_path='image-upload/complete')
+    def image_upload_complete(self, request, pk=None):
+        """Attach an image uploaded with a presigned URL to a recipe."""
+        recipe = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        complete_upload(recipe, serializer.validated_data['upload'])
+
+        return Response(
+            serializers.RecipeImageSerializer(
+                recipe,
+                context=self.get_serializer_context()
+            ).data,
+            status=status.HTTP_200_OK
+        )
+
+
+class RecipeStatsView(ShardedViewMixin, APIView):
+    """Return recipe statistics of the authenticated user."""
+    authentication_classes = (TokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request):
+        return Response(stats.summary(request.user))
+
+
+class SyncView(ShardedViewMixin, APIView):
+    """Return the recipes, tags and ingredients changed since a cursor.
+
+    Clients start without a cursor to receive everything, then pass the
+    returned `cursor` as `since`, again while `more` is true.
+    """
+    authentication_classes = (TokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request):
+        try:
+            since = int(request.query_params.get('since', 0))
+        except ValueError:
+            raise ValidationError({
+                'since': [_('A valid cursor is required.')]
+            })
+
+        changes = sync.changes_since(request.user, since,
+                                     settings.SYNC_PAGE_SIZE)
+        changed = changes['changed']
+        recipes = recipe_values(Recipe.objects.filter(
+            user=request.user,
+            id__in=changed[SyncChange.RECIPE]
+        ).order_by('id'))
+        tags = Tag.objects.filter(user=request.user,
+                                  id__in=changed[SyncChange.TAG])
+        ingredients = Ingredient.objects.filter(
+            user=request.user,
+            id__in=changed[SyncChange.INGREDIENT]
+        )
+
+        return Response({
+            'cursor': changes['cursor'],
+            'more': changes['more'],
+            'recipes': serializers.RecipeValuesSerializer(
+                recipes, many=True
+            ).data,
+            'tags': serializers.TagSerializer(
+                tags.order_by('id'), many=True
+            ).data,
+            'ingredients': serializers.IngredientSerializer(
+                ingredients.order_by('id'), many=True
+            ).data,
+            'deleted': {
+                'recipes': changes['deleted'][SyncChange.RECIPE],
+                'tags': changes['deleted'][SyncChange.TAG],
+                'ingredients': changes['deleted'][SyncChange.INGREDIENT],
+            },
+        })
+
+
+class EventStreamView(APIView):
+    """Stream the changes of the user's recipes, tags and ingredients.
+
+    Events carry the kind and id of the changed object, with its sync
+    cursor as event id. Reconnecting clients send it back in the
+    Last-Event-ID header, or `last_event_id` parameter, to replay the
+    changes they missed.
+    """
+    authentication_classes = (TokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    renderer_classes = (EventStreamRenderer, ORJSONRenderer)
+
+    def get(self, request):
+        last_event_id = request.META.get(
+            'HTTP_LAST_EVENT_ID',
+            request.query_params.get('last_event_id')
+        )
+        try:
+            if last_event_id is not None:
+                last_event_id = int(last_event_id)
+        except ValueError:
+            raise ValidationError({
+                'last_event_id': [_('A valid cursor is required.')]
+            })
+
+        response = StreamingHttpResponse(
+            events.stream(request.user, last_event_id),
+            content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        # Keep proxies such as nginx from buffering the stream.
+        response['X-Accel-Buffering'] = 'no'
+
+        return response
+
+
+class ImageRenditionView(ShardedViewMixin, APIView):
+    """Serve an image of the user's recipe resized to fit within
+    width x height."""
+    authentication_classes = (TokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request, pk, width, height, fmt):
+        if fmt not in FORMATS or \
+                (width, height) not in settings.IMAGE_RENDITION_SIZES:
+            raise Http404
+
+        recipe = Recipe.objects.filter(pk=pk, user=request.user).first()
+        if recipe is None or not recipe.image:
+            raise Http404
+        rendition = Rendition(recipe, width, height, fmt)
+
+        if request.META.get('HTTP_IF_NONE_MATCH') == rendition.etag:
+            response = HttpResponseNotModified()
+        else:
+            file = rendition.get()
+            response = FileResponse(file,
+                                    content_type=rendition.content_type)
+            response['Content-Length'] = os.fstat(file.fileno()).st_size
+        response['ETag'] = rendition.etag
+        # Only the owner may see the image, so shared caches must not
+        # store it.
+        patch_cache_control(response, private=True,
+                            max_age=settings.IMAGE_RENDITION_MAX_AGE)
+
+        return response
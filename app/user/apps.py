@@ -3,3 +3,14 @@ from django.apps import AppConfig
 
 class UserConfig(AppConfig):
     name = 'user'
+
+    def ready(self):
+        from django.contrib.auth import get_user_model
+        from django.db.models.signals import post_delete, post_save
+        from rest_framework.authtoken.models import Token
+
+        from user import tokens
+
+        post_delete.connect(tokens.forget_token, sender=Token)
+        post_save.connect(tokens.forget_user, sender=get_user_model())
+        post_delete.connect(tokens.forget_user, sender=get_user_model())
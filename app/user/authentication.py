@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.utils.translation import ugettext_lazy as _
+
+from rest_framework import authentication, exceptions
+
+from core.caching import shared_cache
+
+from user.tokens import is_signed_token, load_signed_token, user_cache_key
+
+
+class TokenAuthentication(authentication.TokenAuthentication):
+    """Token authentication that also accepts signed stateless tokens.
+
+    Signed tokens are verified from their signature alone; the user they
+    carry is read from the shared cache, when there is one, and only hits
+    the database on a miss.
+    They cannot be revoked before ``AUTH_SIGNED_TOKEN_MAX_AGE`` expires.
+    """
+
+    def authenticate_credentials(self, key):
+        if settings.AUTH_SIGNED_TOKENS and is_signed_token(key):
+            return self._authenticate_signed_credentials(key)
+
+        return super().authenticate_credentials(key)
+
+    def _authenticate_signed_credentials(self, key):
+        """Return the user and token for a signed token."""
+        try:
+            user_id = load_signed_token(key)
+        except signing.BadSignature:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+        cache = shared_cache()
+        user = cache.get(user_cache_key(user_id)) if cache else None
+        if user is None:
+            user = get_user_model().objects.filter(pk=user_id).first()
+            if user is None:
+                raise exceptions.AuthenticationFailed(
+                    _('User inactive or deleted.')
+                )
+            if cache is not None:
+                cache.set(user_cache_key(user_id), user,
+                          settings.AUTH_TOKEN_CACHE_TIMEOUT)
+
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+
+        return (user, key)
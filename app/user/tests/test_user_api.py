@@ -1,10 +1,17 @@
-from django.test import TestCase
+import tempfile
+
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
 from django.urls import reverse
 
+from rest_framework.authtoken.models import Token
 from rest_framework.test import APIClient
 from rest_framework import status
 
+from core.throttling import get_counter_store
+from user.tokens import token_cache_key, user_cache_key
+
 
 CREATE_USER_URL = reverse('user:create')
 TOKEN_URL = reverse('user:token')
@@ -18,9 +25,12 @@ def create_user(**params):
 
 class PublicUserApiTests(TestCase):
     """Test the users API (public)."""
+    multi_db = True
 
     def setUp(self) -> None:
         self.client = APIClient()
+        cache.clear()
+        get_counter_store().clear()
 
     def test_create_valid_user_success(self):
         """Test creating user with valid payload is successful."""
@@ -73,6 +83,105 @@ class PublicUserApiTests(TestCase):
         self.assertIn('token', res.data)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
+    def test_create_token_reuses_existing_token(self):
+        """Test that logging in twice returns the same stored token."""
+        payload = {'email': 'test@companydomain.com', 'password': 'test1234'}
+        user = create_user(**payload)
+        first_res = self.client.post(TOKEN_URL, payload)
+        second_res = self.client.post(TOKEN_URL, payload)
+
+        self.assertEqual(first_res.data['token'], second_res.data['token'])
+        self.assertEqual(Token.objects.filter(user=user).count(), 1)
+        self.assertEqual(
+            Token.objects.get(user=user).key,
+            first_res.data['token']
+        )
+
+    def test_create_token_after_token_deleted(self):
+        """Test that a deleted token is not served from the cache."""
+        payload = {'email': 'test@companydomain.com', 'password': 'test1234'}
+        user = create_user(**payload)
+        first_res = self.client.post(TOKEN_URL, payload)
+        Token.objects.filter(user=user).delete()
+        second_res = self.client.post(TOKEN_URL, payload)
+
+        self.assertNotEqual(first_res.data['token'], second_res.data['token'])
+        self.assertTrue(
+            Token.objects.filter(key=second_res.data['token']).exists()
+        )
+
+    def test_token_authenticates_requests(self):
+        """Test that the issued token authenticates the user."""
+        payload = {'email': 'test@companydomain.com', 'password': 'test1234'}
+        create_user(**payload)
+        token = self.client.post(TOKEN_URL, payload).data['token']
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], payload['email'])
+
+    @override_settings(AUTH_SIGNED_TOKENS=True)
+    def test_signed_token_authenticates_requests(self):
+        """Test that signed tokens are not stored and authenticate."""
+        payload = {'email': 'test@companydomain.com', 'password': 'test1234'}
+        create_user(**payload)
+        token = self.client.post(TOKEN_URL, payload).data['token']
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+        res = self.client.get(ME_URL)
+
+        self.assertFalse(Token.objects.exists())
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], payload['email'])
+
+    @override_settings(AUTH_SIGNED_TOKENS=True)
+    def test_signed_token_tampered(self):
+        """Test that a tampered signed token is rejected."""
+        payload = {'email': 'test@companydomain.com', 'password': 'test1234'}
+        create_user(**payload)
+        token = self.client.post(TOKEN_URL, payload).data['token']
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token}x')
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(AUTH_SIGNED_TOKENS=True)
+    def test_local_cache_not_used_across_requests(self):
+        """Test that tokens and users are not cached in a local cache,
+        where other workers could not invalidate them.
+        """
+        payload = {'email': 'test@companydomain.com', 'password': 'test1234'}
+        user = create_user(**payload)
+        token = self.client.post(TOKEN_URL, payload).data['token']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+        self.client.get(ME_URL)
+
+        self.assertIsNone(cache.get(user_cache_key(user.pk)))
+        get_user_model().objects.filter(pk=user.pk).update(is_active=False)
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_shared_cache_holds_token(self):
+        """Test that token keys are cached in a shared cache."""
+        payload = {'email': 'test@companydomain.com', 'password': 'test1234'}
+        user = create_user(**payload)
+        with tempfile.TemporaryDirectory() as location, override_settings(
+            CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.'
+                           'FileBasedCache',
+                'LOCATION': location,
+            }}
+        ):
+            token = self.client.post(TOKEN_URL, payload).data['token']
+            self.assertEqual(caches['default'].get(token_cache_key(user.pk)),
+                             token)
+
+            Token.objects.filter(user=user).delete()
+            self.assertIsNone(caches['default'].get(token_cache_key(user.pk)))
+
     def test_create_toke_invalid_credentials(self):
         """Test that token is not created if invalid credentials are given."""
         create_user(email='test@companydomain.com', password='test1234')
@@ -103,6 +212,7 @@ class PublicUserApiTests(TestCase):
 
 class PrivateUserApiTests(TestCase):
     """Test API requests that require authentication."""
+    multi_db = True
 
     def setUp(self):
         self.user = create_user(
@@ -0,0 +1,115 @@
+from django.conf import settings
+from django.core import signing
+from django.db import connection
+from django.utils import timezone
+
+from rest_framework.authtoken.models import Token
+
+from core.caching import shared_cache
+
+
+SIGNED_TOKEN_SALT = 'user.tokens.signed'
+
+
+def token_cache_key(user_id: int) -> str:
+    """Return the cache key holding the token key of a user."""
+    return f'auth_token:user:{user_id}'
+
+
+def user_cache_key(user_id: int) -> str:
+    """Return the cache key holding a user loaded for a signed token."""
+    return f'auth_token:signed_user:{user_id}'
+
+
+def _insert_or_get_token_key(user) -> str:
+    """Insert a token for the user, or read the one that already exists.
+
+    Concurrent logins for the same user race on the unique ``user_id``
+    column; ``ON CONFLICT DO NOTHING`` lets the loser fall through to a
+    plain read instead of raising an IntegrityError.
+    """
+    quote_name = connection.ops.quote_name
+    table = quote_name(Token._meta.db_table)
+    key_column = quote_name(Token._meta.get_field('key').column)
+    user_column = quote_name(Token._meta.get_field('user').column)
+    created_column = quote_name(Token._meta.get_field('created').column)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} ({key_column}, {user_column}, '
+            f'{created_column}) VALUES (%s, %s, %s) '
+            f'ON CONFLICT ({user_column}) DO NOTHING '
+            f'RETURNING {key_column}',
+            [Token().generate_key(), user.pk, timezone.now()]
+        )
+        row = cursor.fetchone()
+        if row is None:
+            cursor.execute(
+                f'SELECT {key_column} FROM {table} '
+                f'WHERE {user_column} = %s',
+                [user.pk]
+            )
+            row = cursor.fetchone()
+
+    return row[0]
+
+
+def get_or_create_token(user) -> str:
+    """Return the auth token key for a user, creating it if needed.
+
+    Args:
+        user (User): authenticated user.
+    """
+    cache = shared_cache()
+    if cache is None:
+        return _insert_or_get_token_key(user)
+
+    cache_key = token_cache_key(user.pk)
+    key = cache.get(cache_key)
+    if key is None:
+        key = _insert_or_get_token_key(user)
+        cache.set(cache_key, key, settings.AUTH_TOKEN_CACHE_TIMEOUT)
+
+    return key
+
+
+def forget_token(sender, instance, **kwargs):
+    """Drop the cached token key when a token is deleted."""
+    cache = shared_cache()
+    if cache is not None:
+        cache.delete(token_cache_key(instance.user_id))
+
+
+def forget_user(sender, instance, **kwargs):
+    """Drop the cached user when it is saved or deleted."""
+    cache = shared_cache()
+    if cache is not None:
+        cache.delete(user_cache_key(instance.pk))
+
+
+def make_signed_token(user) -> str:
+    """Return a stateless token carrying the signed user id.
+
+    Args:
+        user (User): authenticated user.
+    """
+    return signing.dumps({'uid': user.pk}, salt=SIGNED_TOKEN_SALT)
+
+
+def load_signed_token(key: str) -> int:
+    """Return the user id of a signed token.
+
+    Raises:
+        signing.BadSignature: the token is tampered with or expired.
+    """
+    payload = signing.loads(
+        key,
+        salt=SIGNED_TOKEN_SALT,
+        max_age=settings.AUTH_SIGNED_TOKEN_MAX_AGE
+    )
+    return payload['uid']
+
+
+def is_signed_token(key: str) -> bool:
+    """Tell signed tokens apart from the hex keys stored in the database."""
+    return ':' in key
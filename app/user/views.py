@@ -1,7 +1,12 @@
-from rest_framework import generics, authentication, permissions
+from django.conf import settings
+from rest_framework import generics, permissions
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
+from core.throttling import LoginRateThrottle
+from user.authentication import TokenAuthentication
 from user.serializers import UserSerializer, AuthTokenSerializer
+from user.tokens import get_or_create_token, make_signed_token
 
 
 class CreateUserView(generics.CreateAPIView):
@@ -13,12 +18,30 @@ class CreateTokenView(ObtainAuthToken):
     """Create a new auth token for user."""
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    parser_classes = api_settings.DEFAULT_PARSER_CLASSES
+    throttle_classes = (LoginRateThrottle,)
+
+    def post(self, request, *args, **kwargs):
+        """Authenticate the user and return its token."""
+        serializer = self.serializer_class(
+            data=request.data,
+            context={'request': request}
+        )
+        serializer.is_valid(raise_exception=True)
+        user = serializer.validated_data['user']
+
+        if settings.AUTH_SIGNED_TOKENS:
+            key = make_signed_token(user)
+        else:
+            key = get_or_create_token(user)
+
+        return Response({'token': key})
 
 
 class ManageUserView(generics.RetrieveUpdateAPIView):
     """Manage the authenticated user"""
     serializer_class = UserSerializer
-    authentication_classes = (authentication.TokenAuthentication,)
+    authentication_classes = (TokenAuthentication,)
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_object(self):